@@ -0,0 +1,89 @@
+"""Run the benchmark suite and print (or save) the results as JSON.
+
+Run with `python -m benchmarks`, optionally followed by the names of the
+benchmarks to run (eg. `python -m benchmarks query_request encoding`). Use
+`--output` to write the results to a file, so that runs can be compared.
+"""
+
+import argparse
+import inspect
+import json
+import platform
+import sys
+import time
+from importlib import import_module
+from importlib.metadata import PackageNotFoundError, version
+
+BENCHMARKS = [
+    "query_request",
+    "encoding",
+    "artifacts",
+    "citations",
+    "testing",
+    "compression",
+    "helpers",
+    "fast",
+    "cache",
+    "limits",
+]
+
+
+def _version() -> str | None:
+    try:
+        return version("openbb-ai")
+    except PackageNotFoundError:
+        return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="benchmark",
+        help=f"The benchmarks to run, among: {', '.join(BENCHMARKS)}. "
+        "Default is all of them.",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=0.5,
+        help="The time, in seconds, spent timing each case. Default is 0.5.",
+    )
+    parser.add_argument("--output", help="Write the results to this file.")
+    args = parser.parse_args(argv)
+    if unknown := set(args.benchmarks) - set(BENCHMARKS):
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results: dict[str, list[dict] | str] = {}
+    for name in args.benchmarks or BENCHMARKS:
+        try:
+            module = import_module(f".{name}", __package__)
+        except ImportError as exc:
+            # eg. the `fast` benchmark without msgspec installed.
+            print(f"Skipping {name}: {exc}", file=sys.stderr)
+            results[name] = f"skipped: {exc}"
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        kwargs = {}
+        if "duration" in inspect.signature(module.run).parameters:
+            kwargs["duration"] = args.duration
+        results[name] = module.run(**kwargs)
+
+    report = {
+        "openbb_ai": _version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
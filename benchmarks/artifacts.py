@@ -0,0 +1,46 @@
+"""Time building and encoding `table` and `chart` artifacts, from 1k to 1M rows.
+
+Run with `python -m benchmarks.artifacts`.
+"""
+
+import json
+from functools import partial
+
+from openbb_ai.helpers import chart, table
+
+from .common import rows, seconds_per_call
+
+
+def run(duration: float = 0.5, max_rows: int = 1_000_000) -> list[dict]:
+    results = []
+    n_rows = 1_000
+    while n_rows <= max_rows:
+        data = rows(n_rows)
+        builders = {
+            "table": partial(table, data, name="Table"),
+            "chart": partial(
+                chart,
+                type="line",
+                data=data,
+                x_key="date",
+                y_keys=["close"],
+                name="Chart",
+            ),
+        }
+        for helper, build in builders.items():
+            event = build()
+            results.append(
+                {
+                    "helper": helper,
+                    "rows": n_rows,
+                    "build_seconds": seconds_per_call(build, duration),
+                    "encode_seconds": seconds_per_call(event.encode, duration),
+                    "encoded_bytes": len(event.encode()),
+                }
+            )
+        n_rows *= 10
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
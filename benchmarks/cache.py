@@ -0,0 +1,40 @@
+"""Time `QueryRequest` validation with and without the cross-turn cache.
+
+With a warm cache, only the request itself (and not its messages and context)
+is validated, so the time should stay flat as the history grows.
+
+Run with `python -m benchmarks.cache`.
+"""
+
+import json
+from functools import partial
+
+from openbb_ai.cache import ValidationCache
+from openbb_ai.models import QueryRequest
+
+from .common import query_request_body, seconds_per_call
+
+
+def run(duration: float = 0.5) -> list[dict]:
+    results = []
+    for n_messages in (10, 100, 1_000):
+        body = query_request_body(n_messages, with_context=True)
+        cache = ValidationCache()
+        cache.validate_request(body)
+        results.append(
+            {
+                "messages": n_messages,
+                "body_bytes": len(body),
+                "model_validate_json_seconds": seconds_per_call(
+                    partial(QueryRequest.model_validate_json, body), duration
+                ),
+                "warm_cache_seconds": seconds_per_call(
+                    partial(cache.validate_request, body), duration
+                ),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,63 @@
+"""Time `Citation` hashing and deduplication.
+
+Run with `python -m benchmarks.citations`.
+"""
+
+import json
+import uuid
+from functools import partial
+
+from openbb_ai.helpers import cite
+from openbb_ai.models import Citation, Widget, WidgetParam
+
+from .common import seconds_per_call
+
+
+def sample_citations(n: int, unique: int) -> list[Citation]:
+    """`n` widget citations, of which only `unique` are distinct."""
+    widget = Widget(
+        uuid=uuid.UUID(int=1),
+        origin="OpenBB API",
+        widget_id="eod_price",
+        name="Historical Stock Price",
+        description="Historical stock price data.",
+        params=[WidgetParam(name="symbol", type="ticker", description="Ticker")],
+    )
+    return [
+        cite(
+            widget,
+            {"symbol": f"TICKER{i % unique}", "start_date": "2024-01-01"},
+            extra_details={"Ticker": f"TICKER{i % unique}", "Interval": "1d"},
+        )
+        for i in range(n)
+    ]
+
+
+def _hash_all(citations: list[Citation]) -> None:
+    for citation in citations:
+        hash(citation)
+
+
+def _dedup(citations: list[Citation]) -> list[Citation]:
+    return list(dict.fromkeys(citations))
+
+
+def run(duration: float = 0.5) -> list[dict]:
+    results = []
+    for n in (100, 1_000, 10_000):
+        citations = sample_citations(n, unique=max(n // 10, 1))
+        results.append(
+            {
+                "citations": n,
+                "unique": len(_dedup(citations)),
+                "hash_seconds": seconds_per_call(
+                    partial(_hash_all, citations), duration
+                ),
+                "dedup_seconds": seconds_per_call(partial(_dedup, citations), duration),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
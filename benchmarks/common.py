@@ -0,0 +1,99 @@
+"""Shared helpers and synthetic data for the benchmarks."""
+
+import json
+import time
+import uuid
+from typing import Callable
+
+
+def rows(n: int) -> list[dict]:
+    """`n` rows of typical end-of-day price data."""
+    return [
+        {
+            "date": f"2024-01-{i % 28 + 1:02d}",
+            "symbol": "AAPL",
+            "open": 180.0 + i % 17,
+            "close": 181.5 + i % 13,
+            "volume": 1_000_000 + i * 7,
+        }
+        for i in range(n)
+    ]
+
+
+def query_request_body(n_messages: int, with_context: bool = False) -> bytes:
+    """A raw `QueryRequest` body with `n_messages` messages.
+
+    Every fourth message is a function call result with a small table. If
+    `with_context` is True, 10 widgets with about 100 kB of raw
+    context each are included.
+    """
+    messages: list[dict] = []
+    for i in range(n_messages):
+        if i % 4 == 3:
+            messages.append(
+                {
+                    "role": "tool",
+                    "function": "get_widget_data",
+                    "input_arguments": {"data_sources": []},
+                    "data": [
+                        {
+                            "items": [
+                                {
+                                    "content": json.dumps(
+                                        [{"date": "2024-01-01", "close": 180.0}] * 20
+                                    ),
+                                    "data_format": {
+                                        "data_type": "object",
+                                        "parse_as": "table",
+                                    },
+                                }
+                            ]
+                        }
+                    ],
+                }
+            )
+        else:
+            role = "human" if i % 2 == 0 else "ai"
+            messages.append({"role": role, "content": f"Message {i} " * 20})
+    body: dict = {
+        "messages": messages,
+        "widgets": {
+            "primary": [
+                {
+                    "origin": "OpenBB API",
+                    "widget_id": f"widget_{i}",
+                    "name": f"Widget {i}",
+                    "description": "A widget.",
+                    "params": [
+                        {"name": "symbol", "type": "ticker", "description": "Ticker"}
+                    ],
+                }
+                for i in range(5)
+            ]
+        },
+    }
+    if with_context:
+        body["context"] = [
+            {
+                "uuid": str(uuid.UUID(int=i)),
+                "name": f"Context {i}",
+                "description": "Raw context.",
+                "data": {"items": [{"content": json.dumps(rows(1_000))}]},
+            }
+            for i in range(10)
+        ]
+    return json.dumps(body).encode()
+
+
+def seconds_per_call(call: Callable[[], object], duration: float) -> float:
+    """The mean time of `call`, called repeatedly for about `duration` seconds.
+
+    `call` is always called at least once, however long it takes.
+    """
+    count = 0
+    start = time.perf_counter()
+    while True:
+        call()
+        count += 1
+        if (elapsed := time.perf_counter() - start) >= duration:
+            return elapsed / count
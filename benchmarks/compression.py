@@ -0,0 +1,96 @@
+"""Compare bytes on the wire and CPU time per event type for each encoding.
+
+Run with `python -m benchmarks.compression`.
+"""
+
+import json
+import time
+import uuid
+
+from openbb_ai.helpers import (
+    chart,
+    citations,
+    cite,
+    get_widget_data,
+    message_chunk,
+    reasoning_step,
+    table,
+)
+from openbb_ai.models import BaseSSE, Widget, WidgetParam, WidgetRequest
+from openbb_ai.responses import SSECompressor, available_encodings
+
+from .common import rows
+
+
+def _widget() -> Widget:
+    return Widget(
+        uuid=uuid.UUID(int=1),
+        origin="OpenBB API",
+        widget_id="eod_price",
+        name="Historical Stock Price",
+        description="Historical stock price data.",
+        params=[WidgetParam(name="symbol", type="ticker", description="Ticker")],
+    )
+
+
+def sample_events() -> dict[str, list[BaseSSE]]:
+    """A stream of typical events, grouped by event type."""
+    widget = _widget()
+    return {
+        "copilotMessageChunk": [message_chunk(f"token {i} ") for i in range(500)],
+        "copilotStatusUpdate": [
+            reasoning_step(f"Step {i}", details={"ticker": "AAPL", "step": i})
+            for i in range(50)
+        ],
+        "copilotFunctionCall": [
+            get_widget_data([WidgetRequest(widget=widget, input_arguments={})])
+        ],
+        "copilotCitationCollection": [
+            citations([cite(widget, {"symbol": "AAPL"}) for _ in range(10)])
+        ],
+        "copilotMessageArtifact (table, 10k rows)": [table(rows(10_000))],
+        "copilotMessageArtifact (chart, 1k rows)": [
+            chart(type="line", data=rows(1_000), x_key="date", y_keys=["close"])
+        ],
+    }
+
+
+def run() -> list[dict]:
+    results = []
+    for label, events in sample_events().items():
+        encoded = [(event.event, event.encode()) for event in events]
+        raw_bytes = sum(len(data) for _, data in encoded)
+        results.append(
+            {
+                "event_type": label,
+                "encoding": "identity",
+                "events": len(encoded),
+                "raw_bytes": raw_bytes,
+                "wire_bytes": raw_bytes,
+                "cpu_us_per_event": 0.0,
+            }
+        )
+        for encoding in available_encodings():
+            compressor = SSECompressor(encoding)
+            start = time.process_time()
+            wire_bytes = sum(
+                len(compressor.compress(event_type, data))
+                for event_type, data in encoded
+            )
+            wire_bytes += len(compressor.finish())
+            elapsed = time.process_time() - start
+            results.append(
+                {
+                    "event_type": label,
+                    "encoding": encoding,
+                    "events": len(encoded),
+                    "raw_bytes": raw_bytes,
+                    "wire_bytes": wire_bytes,
+                    "cpu_us_per_event": elapsed / len(encoded) * 1e6,
+                }
+            )
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,35 @@
+"""Measure SSE encoding throughput for each event type.
+
+Run with `python -m benchmarks.encoding`.
+"""
+
+import json
+import time
+
+from .compression import sample_events
+
+
+def run(duration: float = 0.5) -> list[dict]:
+    results = []
+    for label, events in sample_events().items():
+        count = 0
+        size = 0
+        start = time.perf_counter()
+        while True:
+            for event in events:
+                size += len(event.encode())
+            count += len(events)
+            if (elapsed := time.perf_counter() - start) >= duration:
+                break
+        results.append(
+            {
+                "event_type": label,
+                "events_per_second": count / elapsed,
+                "megabytes_per_second": size / elapsed / 1e6,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,55 @@
+"""Compare decoding and encoding time of the msgspec mirrors with pydantic.
+
+Requires msgspec (`pip install openbb-ai[fast]`).
+Run with `python -m benchmarks.fast`.
+"""
+
+import json
+from functools import partial
+from typing import Any
+
+from openbb_ai import fast
+from openbb_ai.helpers import reasoning_step, table
+from openbb_ai.models import QueryRequest
+
+from .common import query_request_body, seconds_per_call
+
+
+def run(duration: float = 0.5) -> list[dict]:
+    results: list[dict[str, Any]] = []
+    for n_messages in (10, 100, 1_000):
+        body = query_request_body(n_messages, with_context=True)
+        results.append(
+            {
+                "benchmark": f"decode QueryRequest ({n_messages} messages)",
+                "pydantic_seconds": seconds_per_call(
+                    partial(QueryRequest.model_validate_json, body), duration
+                ),
+                "msgspec_seconds": seconds_per_call(
+                    partial(fast.decode_query_request, body), duration
+                ),
+            }
+        )
+
+    rows = [{"date": "2024-01-01", "close": 180.0 + i} for i in range(1_000)]
+    events = {
+        "encode reasoning_step": reasoning_step("Step", details={"ticker": "AAPL"}),
+        "encode table (1k rows)": table(rows, name="Table"),
+    }
+    for name, event in events.items():
+        struct = fast.from_pydantic(event)
+        results.append(
+            {
+                "benchmark": name,
+                "pydantic_seconds": seconds_per_call(event.encode, duration),
+                "msgspec_seconds": seconds_per_call(struct.encode, duration),  # type: ignore[attr-defined]
+            }
+        )
+
+    for result in results:
+        result["speedup"] = result["pydantic_seconds"] / result["msgspec_seconds"]
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
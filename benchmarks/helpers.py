@@ -0,0 +1,64 @@
+"""Compare helper throughput (events per second) with trusted mode on and off.
+
+Run with `python -m benchmarks.helpers`.
+"""
+
+import json
+import uuid
+from typing import Callable
+
+from openbb_ai.helpers import (
+    chart,
+    citations,
+    message_chunk,
+    reasoning_step,
+    table,
+    trusted_mode,
+)
+from openbb_ai.models import BaseSSE, Citation, SourceInfo
+
+from .common import rows, seconds_per_call
+
+
+def builders() -> dict[str, Callable[[], BaseSSE]]:
+    data = rows(1_000)
+    citation_list = [
+        Citation(
+            source_info=SourceInfo(
+                type="widget", uuid=uuid.UUID(int=i), metadata={"input_args": {}}
+            )
+        )
+        for i in range(10)
+    ]
+    return {
+        "reasoning_step": lambda: reasoning_step(
+            "Fetching data", details={"ticker": "AAPL", "source": "x"}
+        ),
+        "message_chunk": lambda: message_chunk("token "),
+        "citations (10)": lambda: citations(citation_list),
+        "table (1k rows)": lambda: table(data, name="Table"),
+        "chart (1k rows)": lambda: chart(
+            type="line", data=data, x_key="date", y_keys=["close"], name="Chart"
+        ),
+    }
+
+
+def run(duration: float = 0.5) -> list[dict]:
+    results = []
+    for name, build in builders().items():
+        validated = 1 / seconds_per_call(build, duration)
+        with trusted_mode():
+            trusted = 1 / seconds_per_call(build, duration)
+        results.append(
+            {
+                "helper": name,
+                "validated_events_per_second": validated,
+                "trusted_events_per_second": trusted,
+                "speedup": trusted / validated,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,82 @@
+"""Time the `RequestLimits` guard on normal requests.
+
+The overhead of the limits is reported against plain
+`QueryRequest.model_validate_json`: for whole bodies validated by
+`validate_request`, which must stay within `MAX_OVERHEAD`, and for bodies
+read by `RequestReader`, which enforces them as the body is scanned.
+
+Run with `python -m benchmarks.limits`.
+"""
+
+import asyncio
+import json
+from functools import partial
+
+from openbb_ai.ingest import RequestReader, validate_request
+from openbb_ai.limits import RequestLimits
+from openbb_ai.models import QueryRequest
+
+from .common import query_request_body, seconds_per_call
+
+# The size of the chunks bodies are received in.
+CHUNK_SIZE = 65536
+# The maximum overhead of `validate_request` over `model_validate_json`.
+MAX_OVERHEAD = 0.25
+
+
+async def _read(body: bytes, limits: RequestLimits | None) -> QueryRequest:
+    reader = RequestReader(limits)
+    for start in range(0, len(body), CHUNK_SIZE):
+        reader.feed(body[start : start + CHUNK_SIZE])
+    reader.close()
+    return await reader.request()
+
+
+def _read_seconds(
+    loop: asyncio.AbstractEventLoop,
+    body: bytes,
+    limits: RequestLimits | None,
+    duration: float,
+) -> float:
+    return seconds_per_call(
+        lambda: loop.run_until_complete(_read(body, limits)), duration
+    )
+
+
+def run(duration: float = 0.5) -> list[dict]:
+    limits = RequestLimits()
+    loop = asyncio.new_event_loop()
+    results = []
+    try:
+        for with_context in (False, True):
+            for n_messages in (10, 100, 1_000):
+                body = query_request_body(n_messages, with_context=with_context)
+                validate_json = seconds_per_call(
+                    partial(QueryRequest.model_validate_json, body), duration
+                )
+                validate = seconds_per_call(
+                    partial(validate_request, body, limits), duration
+                )
+                overhead = validate / validate_json - 1
+                guarded_read = _read_seconds(loop, body, limits, duration)
+                results.append(
+                    {
+                        "messages": n_messages,
+                        "raw_context": with_context,
+                        "body_bytes": len(body),
+                        "model_validate_json_seconds": validate_json,
+                        "validate_request_seconds": validate,
+                        "validate_request_overhead": overhead,
+                        "within_max_overhead": overhead <= MAX_OVERHEAD,
+                        "reader_seconds": _read_seconds(loop, body, None, duration),
+                        "guarded_reader_seconds": guarded_read,
+                        "guarded_reader_overhead": guarded_read / validate_json - 1,
+                    }
+                )
+    finally:
+        loop.close()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
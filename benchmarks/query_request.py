@@ -0,0 +1,37 @@
+"""Time `QueryRequest` validation over synthetic conversation histories.
+
+Run with `python -m benchmarks.query_request`.
+"""
+
+import json
+from functools import partial
+
+from openbb_ai.models import QueryRequest
+
+from .common import query_request_body, seconds_per_call
+
+
+def run(duration: float = 0.5) -> list[dict]:
+    results = []
+    for with_context in (False, True):
+        for n_messages in (10, 100, 1_000):
+            body = query_request_body(n_messages, with_context=with_context)
+            data = json.loads(body)
+            results.append(
+                {
+                    "messages": n_messages,
+                    "raw_context": with_context,
+                    "body_bytes": len(body),
+                    "model_validate_seconds": seconds_per_call(
+                        partial(QueryRequest.model_validate, data), duration
+                    ),
+                    "model_validate_json_seconds": seconds_per_call(
+                        partial(QueryRequest.model_validate_json, body), duration
+                    ),
+                }
+            )
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,54 @@
+"""Time parsing large event streams with `openbb_ai.testing.CopilotResponse`.
+
+Run with `python -m benchmarks.testing`.
+"""
+
+import json
+from functools import partial
+
+from openbb_ai.helpers import message_chunk, reasoning_step, table
+from openbb_ai.models import BaseSSE
+from openbb_ai.testing import CopilotResponse
+
+from .common import rows, seconds_per_call
+
+
+def sample_stream(n_events: int, interleaved: bool = True) -> str:
+    """A raw SSE stream of `n_events` events, mostly message chunks.
+
+    If `interleaved` is False, the stream is a single long answer made only of
+    message chunks.
+    """
+    events: list[BaseSSE] = []
+    for i in range(n_events):
+        if not interleaved:
+            events.append(message_chunk(f"token {i} "))
+        elif i % 100 == 50:
+            events.append(table(rows(100), name=f"Table {i}"))
+        elif i % 20 == 10:
+            events.append(reasoning_step(f"Step {i}", details={"step": i}))
+        else:
+            events.append(message_chunk(f"token {i} "))
+    return b"".join(event.encode() for event in events).decode()
+
+
+def run(duration: float = 0.5) -> list[dict]:
+    results = []
+    for interleaved in (True, False):
+        for n_events in (1_000, 10_000, 100_000):
+            stream = sample_stream(n_events, interleaved)
+            results.append(
+                {
+                    "events": n_events,
+                    "interleaved": interleaved,
+                    "stream_bytes": len(stream.encode()),
+                    "parse_seconds": seconds_per_call(
+                        partial(CopilotResponse, stream), duration
+                    ),
+                }
+            )
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -1,11 +1,45 @@
-from .helpers import chart as chart
-from .helpers import citations as citations
-from .helpers import cite as cite
-from .helpers import get_widget_data as get_widget_data
-from .helpers import message_chunk as message_chunk
-from .helpers import prompt_suggestions as prompt_suggestions
-from .helpers import reasoning_step as reasoning_step
-from .helpers import table as table
-from .models import QueryRequest as QueryRequest
-from .models import Widget as Widget
-from .models import WidgetRequest as WidgetRequest
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .helpers import chart as chart
+    from .helpers import citations as citations
+    from .helpers import cite as cite
+    from .helpers import get_widget_data as get_widget_data
+    from .helpers import message_chunk as message_chunk
+    from .helpers import prompt_suggestions as prompt_suggestions
+    from .helpers import reasoning_step as reasoning_step
+    from .helpers import table as table
+    from .models import QueryRequest as QueryRequest
+    from .models import Widget as Widget
+    from .models import WidgetRequest as WidgetRequest
+
+# The public API is loaded lazily on first access, so that `import openbb_ai`
+# doesn't import pydantic and build the models until they are needed.
+_LAZY_ATTRIBUTES = {
+    "chart": ".helpers",
+    "citations": ".helpers",
+    "cite": ".helpers",
+    "get_widget_data": ".helpers",
+    "message_chunk": ".helpers",
+    "prompt_suggestions": ".helpers",
+    "reasoning_step": ".helpers",
+    "table": ".helpers",
+    "QueryRequest": ".models",
+    "Widget": ".models",
+    "WidgetRequest": ".models",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,225 @@
+"""A cross-turn cache of validated messages and context items.
+
+Agent backends are stateless, so OpenBB Workspace resends the whole history
+and context with every turn. `ValidationCache` remembers the validated
+`messages` and `context` items of previous turns, keyed by a hash of their raw
+content, so that only the new items of a turn are validated.
+
+Items are hashed from their pickle, which is much cheaper to produce than
+their JSON. Equal pickles always come from equal items, but equal items can
+have different pickles if they share objects differently (pickle references
+an object seen before instead of repeating it), which only causes a cache
+miss. Parsing raw bodies without caching strings means that the JSON of an
+item always gives the same pickle.
+
+Cached items with state are never handed out themselves: each request gets
+its own copy of them (see `_copy`), so that requests can't change each
+other's items (eg. by spilling them, or decoding their content), and decoded
+content isn't kept alive by the cache across turns. Items without state (eg.
+plain messages) are shared between requests, so must not be mutated.
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple, get_args
+
+import xxhash
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import from_json
+
+from .models import LlmMessage, QueryRequest, RawContext
+
+
+class _CopyPlan(NamedTuple):
+    # Whether the model has state (private attributes, payloads that `spill`
+    # replaces, or fields holding models with state), so is copied.
+    stateful: bool
+    # The fields that can hold models with state, so are copied.
+    fields: tuple[str, ...]
+    # The default values of the private attributes, if any.
+    private: dict[str, Any] | None
+
+
+# The copy plans of the models, and None for the types that aren't models.
+_plans: dict[type, _CopyPlan | None] = {}
+_setattr = object.__setattr__
+
+
+def _holds_state(annotation: Any) -> bool:
+    """Whether values of a field's type can hold models with state."""
+    if isinstance(annotation, type):
+        if not issubclass(annotation, BaseModel):
+            return False
+        plan = _plans.get(annotation) or _plan(annotation)
+        return plan is not None and plan.stateful
+    return any(_holds_state(arg) for arg in get_args(annotation))
+
+
+def _plan(cls: type) -> _CopyPlan | None:
+    if not issubclass(cls, BaseModel):
+        return None
+    private = {
+        name: attribute.get_default()
+        for name, attribute in cls.__private_attributes__.items()
+    }
+    spills = hasattr(cls, "spill")
+    # Without fields until they are known, in case the model is recursive.
+    _plans[cls] = _CopyPlan(bool(private) or spills, (), private or None)
+    fields = tuple(
+        name
+        for name, field in cls.model_fields.items()
+        if _holds_state(field.annotation)
+    )
+    plan = _plans[cls] = _CopyPlan(
+        bool(private or fields) or spills, fields, private or None
+    )
+    return plan
+
+
+def _copy(value: Any) -> Any:
+    """A copy of a cached item, for a request.
+
+    Models with state (eg. the decoded content of `SingleDataContent`, or
+    the payloads that `spill` replaces) are copied, with their private
+    attributes reset, along with the models, lists and dicts leading to them.
+    Other values are shared (eg. plain messages, `input_arguments` or
+    citations). Nothing is validated again.
+    """
+    cls = type(value)
+    try:
+        plan = _plans[cls]
+    except KeyError:
+        plan = _plans[cls] = _plan(cls)
+    if plan is None:
+        if cls is list:
+            return [_copy(item) for item in value]
+        if cls is dict:
+            return {key: _copy(item) for key, item in value.items()}
+        return value
+    if not plan.stateful:
+        return value
+    fields = value.__dict__.copy()
+    for name in plan.fields:
+        fields[name] = _copy(fields[name])
+    # As `BaseModel.__copy__` does, without copying the private attributes.
+    copy = object.__new__(cls)
+    _setattr(copy, "__dict__", fields)
+    _setattr(copy, "__pydantic_fields_set__", value.__pydantic_fields_set__.copy())
+    _setattr(copy, "__pydantic_extra__", value.__pydantic_extra__)
+    _setattr(
+        copy,
+        "__pydantic_private__",
+        None if plan.private is None else plan.private.copy(),
+    )
+    return copy
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class ValidationCache:
+    """A bounded LRU cache of validated messages and context items.
+
+    Each request built from the cache gets its own copy of the cached items
+    with state (eg. data content, which can be decoded or spilled), with their
+    state reset. Items without state (eg. plain messages) are shared between
+    requests, so they must be treated as immutable.
+
+    Parameters
+    ----------
+    maxsize: int
+        The maximum number of messages and context items kept.
+        Default is 4096.
+
+    Examples
+    --------
+    >>> cache = ValidationCache()
+    >>> @app.post("/query")
+    ... async def query(request: Request):
+    ...     query_request = cache.validate_request(await request.body())
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self._items: OrderedDict[tuple[str, int], Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._message_adapter: TypeAdapter[LlmMessage] | None = None
+
+    def _get(self, kind: str, raw: dict[str, Any]) -> Any:
+        key = (kind, xxhash.xxh3_128_intdigest(pickle.dumps(raw, protocol=5)))
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self._hits += 1
+                return _copy(item)
+            self._misses += 1
+
+        if kind == "message":
+            if self._message_adapter is None:
+                self._message_adapter = TypeAdapter(LlmMessage)  # type: ignore[arg-type]
+            item = self._message_adapter.validate_python(raw)
+        else:
+            item = RawContext.model_validate(raw)
+
+        with self._lock:
+            self._items[key] = item
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return _copy(item)
+
+    def message(self, raw: dict[str, Any]) -> LlmMessage:
+        """Validate a raw message, or return it from the cache."""
+        return self._get("message", raw)
+
+    def context(self, raw: dict[str, Any]) -> RawContext:
+        """Validate a raw context item, or return it from the cache."""
+        return self._get("context", raw)
+
+    def validate_request(self, data: bytes | str | dict[str, Any]) -> QueryRequest:
+        """Validate a request, reusing the messages and context of previous turns.
+
+        The result is the same as `QueryRequest.model_validate_json` (or
+        `model_validate`, for a dict), including the validation errors.
+        """
+        raw = data if isinstance(data, dict) else from_json(data, cache_strings=False)
+        if not isinstance(raw, dict):
+            return QueryRequest.model_validate(raw)
+        request = dict(raw)
+        messages = raw.get("messages")
+        context = raw.get("context")
+        try:
+            if isinstance(messages, list):
+                request["messages"] = [
+                    self.message(m) if isinstance(m, dict) else m for m in messages
+                ]
+            if isinstance(context, list):
+                request["context"] = [
+                    self.context(c) if isinstance(c, dict) else c for c in context
+                ]
+        except ValidationError:
+            # Validate the original request, to raise errors with their full
+            # location (eg. `messages.3.content`).
+            return QueryRequest.model_validate(raw)
+        # Validated items are instances of the field types, so pydantic accepts
+        # them as they are.
+        return QueryRequest.model_validate(request)
+
+    def info(self) -> CacheInfo:
+        """The hits, misses, maximum and current size of the cache."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._items))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._hits = self._misses = 0
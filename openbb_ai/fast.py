@@ -0,0 +1,709 @@
+"""msgspec-backed mirrors of the request and SSE models, for fast decoding.
+
+Requires the optional `msgspec` dependency (`pip install openbb-ai[fast]`).
+
+Every `Struct` in this module mirrors the pydantic model of the same name in
+`openbb_ai.models`, including its validators (eg. the function call parsing of
+`LlmClientMessage.content` and the deterministic UUIDs of `Widget`), and can be
+converted losslessly to and from it with `to_pydantic` and `from_pydantic`.
+
+Unions that msgspec cannot resolve natively (eg. the messages of a
+`QueryRequest`, or the discriminated data formats) are decoded as builtins and
+converted in `__post_init__`, using the same rules as pydantic.
+
+Two known differences with the pydantic models: `SingleFileReference.url` is
+kept as the original string (pydantic normalizes it as an `HttpUrl`, which
+`to_pydantic` still does), and widget validation errors are raised as
+`msgspec.ValidationError`.
+"""
+
+import json
+import uuid
+from typing import Any, Literal
+from uuid import UUID
+
+import msgspec
+from pydantic import BaseModel
+
+from . import models
+from .models import (
+    EXCLUDE_CITATION_DETAILS_FIELDS,
+    EXCLUDE_STATUS_UPDATE_DETAILS_FIELDS,
+    ArtifactTypes,
+    RoleEnum,
+    Undefined,
+)
+
+
+def _exclude_none(value: Any) -> Any:
+    # Mirrors pydantic's `exclude_none`, which only applies to model fields:
+    # dicts (eg. table rows) are left untouched and never walked.
+    if isinstance(value, msgspec.Struct):
+        return {
+            name: _exclude_none(field_value)
+            for name in value.__struct_fields__
+            if (field_value := getattr(value, name)) is not None
+        }
+    if isinstance(value, list) and value and isinstance(value[0], msgspec.Struct):
+        return [_exclude_none(item) for item in value]
+    return value
+
+
+class UserAPIKeys(msgspec.Struct, kw_only=True):
+    openai_api_key: str | None = None
+
+
+class LineChartParameters(msgspec.Struct, kw_only=True):
+    chartType: Literal["line"]
+    xKey: str
+    yKey: list[str]
+
+
+class BarChartParameters(msgspec.Struct, kw_only=True):
+    chartType: Literal["bar"]
+    xKey: str
+    yKey: list[str]
+
+
+class ScatterChartParameters(msgspec.Struct, kw_only=True):
+    chartType: Literal["scatter"]
+    xKey: str
+    yKey: list[str]
+
+
+class PieChartParameters(msgspec.Struct, kw_only=True):
+    chartType: Literal["pie"]
+    angleKey: str
+    calloutLabelKey: str
+
+
+class DonutChartParameters(msgspec.Struct, kw_only=True):
+    chartType: Literal["donut"]
+    angleKey: str
+    calloutLabelKey: str
+
+
+ChartParameters = (
+    LineChartParameters
+    | BarChartParameters
+    | ScatterChartParameters
+    | PieChartParameters
+    | DonutChartParameters
+)
+
+_CHART_PARAMETERS: dict[str, type[msgspec.Struct]] = {
+    "line": LineChartParameters,
+    "bar": BarChartParameters,
+    "scatter": ScatterChartParameters,
+    "pie": PieChartParameters,
+    "donut": DonutChartParameters,
+}
+
+
+def _convert_chart_parameters(value: Any) -> Any:
+    if value is None or isinstance(value, msgspec.Struct):
+        return value
+    chart_type = value.get("chartType") if isinstance(value, dict) else None
+    if chart_type not in _CHART_PARAMETERS:
+        raise ValueError(f"Invalid chartType: {chart_type!r}")
+    return msgspec.convert(value, _CHART_PARAMETERS[chart_type])
+
+
+def _check_chart_and_query_data_source(
+    condition: str,
+    type_: str,
+    chart_params: Any,
+    query_data_source: dict[str, Any] | None,
+) -> None:
+    # `condition` is a template for the error messages, eg. "when parse_as is
+    # {!r}", so that they match the ones of the pydantic models.
+    if type_ == "chart" and not chart_params:
+        raise ValueError(f"chart_params is required {condition.format('chart')}")
+    if type_ != "chart" and chart_params:
+        raise ValueError(f"chart_params is only allowed {condition.format('chart')}")
+    if type_ == "snowflake_query":
+        when = condition.format("snowflake_query")
+        if not isinstance(query_data_source, dict):
+            raise ValueError(f"query_data_source must be a dict {when}")
+        required_keys = {"origin", "id", "widget_uuid"}
+        if not required_keys.issubset(query_data_source.keys()):
+            raise ValueError(
+                f"query_data_source must contain the keys: {required_keys} {when}"
+            )
+
+
+class RawObjectDataFormat(msgspec.Struct, kw_only=True):
+    data_type: Literal["object"] = "object"
+    parse_as: ArtifactTypes = "table"
+    chart_params: Any = None
+    query_data_source: dict[str, Any] | None = None
+
+    def __post_init__(self) -> None:
+        self.chart_params = _convert_chart_parameters(self.chart_params)
+        _check_chart_and_query_data_source(
+            "when parse_as is {!r}",
+            self.parse_as,
+            self.chart_params,
+            self.query_data_source,
+        )
+
+
+class PdfDataFormat(msgspec.Struct, kw_only=True):
+    data_type: Literal["pdf"]
+    filename: str
+
+
+class ImageDataFormat(msgspec.Struct, kw_only=True):
+    data_type: Literal["jpg", "jpeg", "png"]
+    filename: str
+
+
+class SpreadsheetDataFormat(msgspec.Struct, kw_only=True):
+    data_type: Literal["xlsx", "xls", "csv"]
+    parse_as: Literal["text", "table"] = "table"
+    filename: str
+
+
+class PlaintextDataFormat(msgspec.Struct, kw_only=True):
+    data_type: Literal["txt", "md", "html"]
+    parse_as: Literal["text"] = "text"
+    filename: str
+
+
+class DocxDataFormat(msgspec.Struct, kw_only=True):
+    data_type: Literal["docx"]
+    filename: str
+
+
+DataFormat = (
+    RawObjectDataFormat
+    | PdfDataFormat
+    | ImageDataFormat
+    | SpreadsheetDataFormat
+    | PlaintextDataFormat
+    | DocxDataFormat
+)
+
+_DATA_FORMATS: dict[str, type[msgspec.Struct]] = {
+    "object": RawObjectDataFormat,
+    "pdf": PdfDataFormat,
+    "jpg": ImageDataFormat,
+    "jpeg": ImageDataFormat,
+    "png": ImageDataFormat,
+    "xlsx": SpreadsheetDataFormat,
+    "xls": SpreadsheetDataFormat,
+    "csv": SpreadsheetDataFormat,
+    "txt": PlaintextDataFormat,
+    "md": PlaintextDataFormat,
+    "html": PlaintextDataFormat,
+    "docx": DocxDataFormat,
+}
+
+
+def _convert_data_format(value: Any) -> Any:
+    if isinstance(value, msgspec.Struct):
+        return value
+    data_type = value.get("data_type") if isinstance(value, dict) else None
+    if data_type not in _DATA_FORMATS:
+        raise ValueError(f"Invalid data_type: {data_type!r}")
+    return msgspec.convert(value, _DATA_FORMATS[data_type])
+
+
+class SourceInfo(msgspec.Struct, frozen=True, kw_only=True):
+    type: Literal["widget", "direct retrieval", "web", "artifact"]
+    uuid: UUID | None = None
+    origin: str | None = None
+    widget_id: str | None = None
+    name: str | None = None
+    description: str | None = None
+    metadata: dict[str, Any] = msgspec.field(default_factory=dict)
+    citable: bool = True
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SourceInfo):
+            return False
+
+        # We only want to compare the input args of the metadata
+        this = _exclude_none(self)
+        this["metadata"] = {"input_args": self.metadata.get("input_args")}
+        that = _exclude_none(other)
+        that["metadata"] = {"input_args": other.metadata.get("input_args")}
+        return this == that
+
+    def __hash__(self) -> int:
+        return hash((self.type, self.uuid, self.origin, self.widget_id))
+
+
+class CitationHighlightBoundingBox(msgspec.Struct, kw_only=True):
+    text: str
+    page: int
+    x0: float
+    top: float
+    x1: float
+    bottom: float
+
+
+class Citation(msgspec.Struct, kw_only=True):
+    id: UUID = msgspec.field(default_factory=uuid.uuid4)
+    source_info: SourceInfo
+    details: list[dict[str, Any]] | None = None
+    quote_bounding_boxes: list[list[CitationHighlightBoundingBox]] | None = None
+
+    def __post_init__(self) -> None:
+        if self.details:
+            for detail in self.details:
+                for key in list(detail.keys()):
+                    if key.lower() in EXCLUDE_CITATION_DETAILS_FIELDS:
+                        detail.pop(key, None)
+
+    def __hash__(self) -> int:
+        return hash((str(self.source_info), str(self.details)))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Citation):
+            return False
+        return (
+            self.source_info == other.source_info
+            and self.details == other.details
+            and self.quote_bounding_boxes == other.quote_bounding_boxes
+        )
+
+
+class OptionsEndpointParam(msgspec.Struct, kw_only=True):
+    type: str | None = None
+    name: str
+    description: str | None = None
+    inherit_value_from: str
+
+    def __post_init__(self) -> None:
+        if self.type is None and self.inherit_value_from is not None:
+            self.type = self.inherit_value_from
+            raise ValueError("Type must be set if inherit_value_from is not set.")
+
+
+class WidgetParam(msgspec.Struct, kw_only=True):
+    name: str
+    type: Literal[
+        "string",
+        "text",
+        "number",
+        "integer",
+        "boolean",
+        "date",
+        "ticker",
+        "endpoint",
+        "tabs",
+    ]
+    description: str
+    # A missing default value is distinct from an explicit default of None.
+    default_value: Any = Undefined.UNDEFINED
+    current_value: Any = None
+    executed_value: Any = None
+    multi_select: bool = False
+    split_param_on_citation: bool = False
+    options: list[Any] | None = None
+    get_options: bool = False
+    options_params: list[OptionsEndpointParam] = msgspec.field(default_factory=list)
+    language: str | None = None
+
+
+class Widget(msgspec.Struct, kw_only=True):
+    uuid: UUID | None = None
+    origin: str
+    widget_id: str
+    name: str
+    description: str
+    params: list[WidgetParam]
+    source: str | None = None
+    category: str | None = None
+    sub_category: str | None = None
+    columns: list[str] | None = None
+    metadata: dict[str, Any] = msgspec.field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.uuid is None:
+            if self.origin and self.widget_id:
+                self.uuid = models.Widget._generate_uuid(self.origin, self.widget_id)
+            else:
+                self.uuid = uuid.uuid4()
+
+        param_names = [p.name for p in self.params]
+        if len(param_names) != len(set(param_names)):
+            raise ValueError("Parameter names must be unique.")
+        if sum(p.split_param_on_citation for p in self.params) > 1:
+            raise ValueError("Only one parameter can be split on citation.")
+        params_by_name = {p.name: p for p in self.params}
+        for widget_param in self.params:
+            if widget_param.get_options:
+                for options_param in widget_param.options_params:
+                    referenced = params_by_name.get(options_param.inherit_value_from)
+                    if referenced is None:
+                        raise ValueError(
+                            f"Parameter {options_param.inherit_value_from} not found in options, but {widget_param.name}'s options endpoint depends on it."  # noqa: E501
+                        )
+                    options_param.type = referenced.type
+
+    @property
+    def split_param(self) -> WidgetParam | None:
+        for param in self.params:
+            if param.split_param_on_citation:
+                return param
+        return None
+
+
+class WidgetCollection(msgspec.Struct, kw_only=True):
+    primary: list[Widget] = msgspec.field(default_factory=list)
+    secondary: list[Widget] = msgspec.field(default_factory=list)
+    extra: list[Widget] = msgspec.field(default_factory=list)
+
+
+class LlmClientFunctionCall(msgspec.Struct, kw_only=True):
+    function: str
+    input_arguments: dict[str, Any]
+
+
+def _parse_content(value: Any) -> Any:
+    # Same semantics as `models.LlmClientMessage.parse_content`.
+    if isinstance(value, str):
+        # Only a JSON object, or a JSON string containing one, can be parsed as
+        # a function call, so skip decoding plain text.
+        if value.lstrip()[:1] not in ("{", '"'):
+            return value
+        try:
+            parsed_content = json.loads(value)
+            if isinstance(parsed_content, str):
+                # Sometimes we need a second decode if the content is
+                # escaped and string-encoded
+                parsed_content = json.loads(parsed_content)
+            if not isinstance(parsed_content, dict):
+                return value
+            return msgspec.convert(parsed_content, LlmClientFunctionCall)
+        except (json.JSONDecodeError, TypeError, ValueError, msgspec.ValidationError):
+            return value
+    if isinstance(value, dict):
+        return msgspec.convert(value, LlmClientFunctionCall)
+    return value
+
+
+class LlmClientMessage(msgspec.Struct, kw_only=True):
+    role: RoleEnum
+    content: Any
+    agent_id: str | None = None
+
+    def __post_init__(self) -> None:
+        self.content = _parse_content(self.content)
+        if not isinstance(self.content, str | LlmClientFunctionCall):
+            raise ValueError("content must be a string or a function call.")
+
+
+class SingleFileReference(msgspec.Struct, kw_only=True):
+    url: str
+    data_format: Any
+    citable: bool = True
+
+    def __post_init__(self) -> None:
+        self.data_format = _convert_data_format(self.data_format)
+
+
+class DataFileReferences(msgspec.Struct, kw_only=True):
+    items: list[SingleFileReference]
+    extra_citations: list[Citation] = msgspec.field(default_factory=list)
+
+
+class SingleDataContent(msgspec.Struct, kw_only=True):
+    content: str
+    data_format: Any = msgspec.field(default_factory=RawObjectDataFormat)
+    citable: bool = True
+
+    def __post_init__(self) -> None:
+        self.data_format = _convert_data_format(self.data_format)
+
+
+class DataContent(msgspec.Struct, kw_only=True):
+    items: list[SingleDataContent]
+    extra_citations: list[Citation] = msgspec.field(default_factory=list)
+
+
+class ClientFunctionCallError(msgspec.Struct, kw_only=True):
+    error_type: str
+    content: str
+
+
+class ClientCommandResult(msgspec.Struct, kw_only=True):
+    status: Literal["success", "error", "warning"]
+    message: str | None = None
+    data: dict[str, Any] | None = None
+
+
+def _convert_function_call_result(value: Any) -> Any:
+    if isinstance(value, msgspec.Struct):
+        return value
+    if not isinstance(value, dict):
+        raise ValueError("Function call result data items must be objects.")
+    # Pick the same member of the union that pydantic would.
+    if "status" in value:
+        return msgspec.convert(value, ClientCommandResult)
+    if "error_type" in value:
+        return msgspec.convert(value, ClientFunctionCallError)
+    items = value.get("items") or []
+    if items and isinstance(items[0], dict) and "url" in items[0]:
+        return msgspec.convert(value, DataFileReferences)
+    return msgspec.convert(value, DataContent)
+
+
+class LlmClientFunctionCallResultMessage(msgspec.Struct, kw_only=True):
+    role: RoleEnum = RoleEnum.tool
+    function: str
+    input_arguments: dict[str, Any] = msgspec.field(default_factory=dict)
+    data: list[Any]
+    extra_state: dict[str, Any] = msgspec.field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self.data = [_convert_function_call_result(item) for item in self.data]
+
+
+LlmMessage = LlmClientFunctionCallResultMessage | LlmClientMessage
+
+
+def _convert_message(value: Any) -> Any:
+    if isinstance(value, msgspec.Struct):
+        return value
+    if isinstance(value, dict) and "content" in value and "data" not in value:
+        return msgspec.convert(value, LlmClientMessage)
+    return msgspec.convert(value, LlmClientFunctionCallResultMessage)
+
+
+class RawContext(msgspec.Struct, kw_only=True):
+    uuid: UUID
+    name: str
+    description: str
+    data: DataContent
+    metadata: dict[str, Any] | None = None
+
+
+class WidgetInfo(msgspec.Struct, kw_only=True):
+    widget_uuid: str
+    name: str
+
+
+class TabInfo(msgspec.Struct, kw_only=True):
+    tab_id: str = "__no_tab__"
+    widgets: list[WidgetInfo] | None = None
+
+
+class DashboardInfo(msgspec.Struct, kw_only=True):
+    id: str
+    name: str
+    current_tab_id: str
+    tabs: list[TabInfo] | None = None
+
+
+class AgentFeatureSelectOption(msgspec.Struct, kw_only=True):
+    label: str
+    value: str
+
+
+class AgentFeatureOption(msgspec.Struct, kw_only=True):
+    label: str
+    type: Literal["toggle", "text", "select"] | None = None
+    default: bool | str | None = None
+    description: str | None = None
+    placeholder: str | None = None
+    options: list[AgentFeatureSelectOption] | None = None
+
+
+class WorkspaceAgent(msgspec.Struct, kw_only=True):
+    holder_url: str | None = None
+    id: str
+    name: str
+    description: str | None = None
+    features: dict[str, bool | AgentFeatureOption] = msgspec.field(default_factory=dict)
+
+
+class WorkspaceState(msgspec.Struct, kw_only=True):
+    action_history: list[str] | None = None
+    agents: list[WorkspaceAgent] | None = None
+    current_dashboard_uuid: UUID | None = None
+    current_dashboard_info: DashboardInfo | None = None
+    current_page_context: str | None = None
+
+
+class AgentTool(msgspec.Struct, kw_only=True):
+    server_id: str | None = None
+    name: str
+    url: str
+    endpoint: str | None = None
+    description: str | None = None
+    input_schema: dict[str, Any] | None = None
+    auth_token: str | None = None
+
+
+class QueryRequest(msgspec.Struct, kw_only=True):
+    messages: list[Any]
+    context: list[RawContext] | None = None
+    widgets: WidgetCollection | None = None
+    urls: list[str] | None = None
+    api_keys: UserAPIKeys | None = None
+    force_web_search: bool | None = None
+    timezone: str = "UTC"
+    workspace_state: WorkspaceState | None = None
+    workspace_options: dict[str, Any] = msgspec.field(default_factory=dict)
+    tools: list[AgentTool] | None = None
+
+    def __post_init__(self) -> None:
+        if not self.messages:
+            raise ValueError("messages list cannot be empty.")
+        if self.urls and len(self.urls) > 4:
+            raise ValueError("urls list cannot have more than 4 elements.")
+        self.messages = [_convert_message(message) for message in self.messages]
+
+
+class ClientArtifact(msgspec.Struct, kw_only=True):
+    type: ArtifactTypes
+    name: str
+    description: str
+    uuid: UUID = msgspec.field(default_factory=uuid.uuid4)
+    content: str | list[dict]
+    chart_params: Any = None
+    query_data_source: dict[str, Any] | None = None
+
+    def __post_init__(self) -> None:
+        self.chart_params = _convert_chart_parameters(self.chart_params)
+        _check_chart_and_query_data_source(
+            "for type {!r}", self.type, self.chart_params, self.query_data_source
+        )
+
+
+class _BaseSSE(msgspec.Struct, kw_only=True):
+    event: str = ""
+    data: Any = None
+    id: int | None = None
+
+    def encode(self) -> bytes:
+        """Encode the event as ready-to-send Server-Sent Event wire bytes.
+
+        The output is identical to `BaseSSE.encode()` for the equivalent
+        pydantic event.
+        """
+        data = msgspec.json.encode(_exclude_none(self.data))
+        header = f"event: {self.event}\r\n".encode()
+        if self.id is not None:
+            header = f"id: {self.id}\r\n".encode() + header
+        return header + b"data: " + data + b"\r\n\r\n"
+
+
+class MessageChunkSSEData(msgspec.Struct, kw_only=True):
+    delta: str
+
+
+class MessageChunkSSE(_BaseSSE, kw_only=True):
+    event: Literal["copilotMessageChunk"] = "copilotMessageChunk"
+    data: MessageChunkSSEData
+
+
+class PromptSuggestionsSSEData(msgspec.Struct, kw_only=True):
+    suggestions: list[str]
+
+
+class PromptSuggestionsSSE(_BaseSSE, kw_only=True):
+    event: Literal["copilotPromptSuggestions"] = "copilotPromptSuggestions"
+    data: PromptSuggestionsSSEData
+
+
+class MessageArtifactSSE(_BaseSSE, kw_only=True):
+    event: Literal["copilotMessageArtifact"] = "copilotMessageArtifact"
+    data: ClientArtifact
+
+
+class FunctionCallSSEData(msgspec.Struct, kw_only=True):
+    function: Literal[
+        "get_widget_data",
+        "get_extra_widget_data",
+        "get_params_options",
+        "add_widget_to_dashboard",
+        "add_generative_widget",
+        "update_widget_in_dashboard",
+        "assign_tasks_to_agents",
+        "execute_agent_tool",
+        "manage_navigation_bar",
+        "get_skill_content",
+        "save_skill",
+    ]
+    input_arguments: dict
+    extra_state: dict | None = None
+
+
+class FunctionCallSSE(_BaseSSE, kw_only=True):
+    event: Literal["copilotFunctionCall"] = "copilotFunctionCall"
+    data: FunctionCallSSEData
+
+
+class CitationCollection(msgspec.Struct, kw_only=True):
+    citations: list[Citation]
+
+
+class CitationCollectionSSE(_BaseSSE, kw_only=True):
+    event: Literal["copilotCitationCollection"] = "copilotCitationCollection"
+    data: CitationCollection
+
+
+class StatusUpdateSSEData(msgspec.Struct, kw_only=True):
+    eventType: Literal["INFO", "WARNING", "ERROR"]
+    message: str
+    group: Literal["reasoning"] = "reasoning"
+    details: list[dict[str, Any] | str] | None = None
+    artifacts: list[ClientArtifact] | None = None
+    hidden: bool = False
+
+    def __post_init__(self) -> None:
+        for detail in self.details or []:
+            if isinstance(detail, dict):
+                for key in list(detail.keys()):
+                    if str(key).lower() in EXCLUDE_STATUS_UPDATE_DETAILS_FIELDS:
+                        detail.pop(key, None)
+
+
+class StatusUpdateSSE(_BaseSSE, kw_only=True):
+    event: Literal["copilotStatusUpdate"] = "copilotStatusUpdate"
+    data: StatusUpdateSSEData
+
+
+SSE = (
+    MessageChunkSSE
+    | PromptSuggestionsSSE
+    | MessageArtifactSSE
+    | FunctionCallSSE
+    | StatusUpdateSSE
+    | CitationCollectionSSE
+)
+
+_query_request_decoder = msgspec.json.Decoder(QueryRequest)
+_encoder = msgspec.json.Encoder()
+
+
+def decode_query_request(data: bytes | str) -> QueryRequest:
+    """Decode a raw JSON request body into a `QueryRequest` struct.
+
+    Raises `msgspec.ValidationError` (or `msgspec.DecodeError` for malformed
+    JSON) if the request is invalid.
+    """
+    return _query_request_decoder.decode(data)
+
+
+def encode(obj: msgspec.Struct) -> bytes:
+    """Encode a struct as JSON. SSE events should use their `encode` method."""
+    return _encoder.encode(obj)
+
+
+def to_pydantic(obj: msgspec.Struct) -> BaseModel:
+    """Convert a struct into the equivalent pydantic model from `models`."""
+    model: type[BaseModel] = getattr(models, type(obj).__name__)
+    return model.model_validate(msgspec.to_builtins(obj))
+
+
+def from_pydantic(model: BaseModel) -> msgspec.Struct:
+    """Convert a pydantic model from `models` into the equivalent struct."""
+    struct = globals().get(type(model).__name__)
+    if not (isinstance(struct, type) and issubclass(struct, msgspec.Struct)):
+        raise TypeError(f"No fast mirror for model {type(model).__name__}.")
+    return msgspec.json.decode(model.model_dump_json(), type=struct)
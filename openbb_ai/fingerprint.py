@@ -0,0 +1,152 @@
+"""Stable, cheap fingerprints of requests and their parts.
+
+Fingerprints are xxh3-128 hashes (as 32 hexadecimal digits) of a canonical
+JSON encoding of the models:
+
+- Models are dumped in JSON mode, so UUIDs are lowercase, hyphenated strings
+  (whatever their case or format in the request), and enums are dumped as
+  their values.
+- Fields that are None are dropped, so an optional field that is missing and
+  one that is null have the same fingerprint. The contents of dict fields (eg.
+  `metadata`) are kept as they are, including their None values.
+- Computed fields (eg. `Widget.split_param`) are dropped, since they derive
+  from the other fields. So is `Citation.id`, which is random by default, at
+  any depth (eg. in the `extra_citations` of context data): models are dumped
+  with a `{"fingerprint": True}` serialization context, for such fields.
+- Object keys are sorted, with no whitespace between tokens, and non-ASCII
+  characters are encoded as UTF-8 rather than escaped.
+
+A request's fingerprint is a Merkle tree: its messages are chained, so that
+the hash of the first N messages of a conversation is the same in every later
+turn, and the messages, context, widgets, tools and other fields are hashed
+separately, so that two fingerprints tell which parts of the requests differ.
+"""
+
+import json
+import weakref
+from functools import partial
+from typing import Iterable
+
+import xxhash
+from pydantic import BaseModel, Field
+
+
+def canonical_json(model: BaseModel, exclude: set[str] | None = None) -> bytes:
+    """The canonical JSON encoding of a model, as described above."""
+    exclude = {*(exclude or ()), *type(model).model_computed_fields}
+    dumped = model.model_dump(
+        mode="json",
+        exclude_none=True,
+        exclude=exclude,
+        context={"fingerprint": True},
+    )
+    return json.dumps(
+        dumped, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+
+def digest(data: bytes) -> bytes:
+    return xxhash.xxh3_128_digest(data)
+
+
+def model_digest(model: BaseModel, exclude: set[str] | None = None) -> bytes:
+    """The fingerprint of a model, as raw bytes."""
+    return digest(canonical_json(model, exclude))
+
+
+# Digests of models that are hashed again and again (the messages and context
+# of a conversation, which are resent every turn), by object identity. Models
+# are unhashable, so they are keyed by id, and dropped once collected.
+_memo: dict[int, tuple[weakref.ref, bytes]] = {}
+
+
+def memoized_digest(model: BaseModel) -> bytes:
+    """The digest of a model, memoized for as long as the model is alive.
+
+    The model must not be mutated after being fingerprinted. Models reused
+    across turns, eg. by `openbb_ai.cache.ValidationCache`, are only hashed once.
+    """
+    key = id(model)
+    entry = _memo.get(key)
+    if entry is not None and entry[0]() is model:
+        return entry[1]
+    value = model_digest(model)
+    _memo[key] = (weakref.ref(model, partial(_forget, key)), value)
+    return value
+
+
+def _forget(key: int, _: weakref.ref) -> None:
+    _memo.pop(key, None)
+
+
+def _combine(digests: Iterable[bytes]) -> bytes:
+    return digest(b"".join(digests))
+
+
+class RequestFingerprint(BaseModel):
+    """The fingerprint of a `QueryRequest`, and of its parts."""
+
+    digest: str = Field(description="The fingerprint of the whole request.")
+    messages: list[str] = Field(
+        description="The fingerprint of the first 1, 2, ... messages of the "
+        "request (ie. a hash chain), so that the last one is the fingerprint of "
+        "all the messages."
+    )
+    context: str = Field(description="The fingerprint of the context items.")
+    widgets: str = Field(description="The fingerprint of the widgets.")
+    tools: str = Field(description="The fingerprint of the tools.")
+    other: str = Field(description="The fingerprint of the other fields.")
+
+    def shared_prefix(self, other: "RequestFingerprint") -> int:
+        """The number of leading messages that both requests have in common."""
+        # Prefix hashes are chained, so once they differ they always differ.
+        low, high = 0, min(len(self.messages), len(other.messages))
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.messages[middle - 1] == other.messages[middle - 1]:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def extends(self, other: "RequestFingerprint") -> bool:
+        """Whether the messages of `other` are a prefix of the messages of this
+        request, eg. if this request is a later turn of the same conversation."""
+        return self.shared_prefix(other) == len(other.messages)
+
+
+_EMPTY = digest(b"")
+
+
+def request_fingerprint(
+    messages: Iterable[BaseModel],
+    context: Iterable[BaseModel],
+    widgets: dict[str, Iterable[BaseModel]],
+    tools: Iterable[BaseModel],
+    other: BaseModel,
+    exclude: set[str],
+) -> RequestFingerprint:
+    """Build a request's fingerprint from its parts. See `QueryRequest.fingerprint`."""
+    chain = []
+    prefix = _EMPTY
+    for message in messages:
+        prefix = digest(prefix + memoized_digest(message))
+        chain.append(prefix)
+    context_digest = _combine(memoized_digest(item) for item in context)
+    widgets_digest = _combine(
+        digest(tier.encode() + _combine(model_digest(w) for w in tier_widgets))
+        for tier, tier_widgets in widgets.items()
+    )
+    tools_digest = _combine(model_digest(tool) for tool in tools)
+    other_digest = model_digest(other, exclude)
+    root = _combine(
+        [prefix, context_digest, widgets_digest, tools_digest, other_digest]
+    )
+    return RequestFingerprint(
+        digest=root.hex(),
+        messages=[value.hex() for value in chain],
+        context=context_digest.hex(),
+        widgets=widgets_digest.hex(),
+        tools=tools_digest.hex(),
+        other=other_digest.hex(),
+    )
@@ -1,8 +1,13 @@
+import itertools
+import os
 import uuid
-from typing import Any, Literal
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Literal, TypeVar
 
 from .models import (
     BarChartParameters,
+    BaseSSE,
     ChartParameters,
     Citation,
     CitationCollection,
@@ -26,6 +31,71 @@ from .models import (
     Widget,
     WidgetRequest,
 )
+from .profiling import profiled
+
+T = TypeVar("T", bound=BaseSSE)
+
+
+def _trusted_mode_from_env() -> int | None:
+    if os.environ.get("OPENBB_AI_TRUSTED_MODE", "").lower() not in ("1", "true"):
+        return None
+    return int(os.environ.get("OPENBB_AI_TRUSTED_MODE_VALIDATE_EVERY", "0"))
+
+
+# None when trusted mode is disabled, otherwise the sampling interval used to
+# validate trusted events (0 disables sampling).
+_TRUSTED_MODE_DEFAULT = _trusted_mode_from_env()
+_TRUSTED_MODE: ContextVar[int | None] = ContextVar(
+    "openbb_ai_trusted_mode", default=_TRUSTED_MODE_DEFAULT
+)
+_trusted_event_counter = itertools.count(1)
+
+
+@contextmanager
+def trusted_mode(enabled: bool = True, validate_every: int = 0) -> Iterator[None]:
+    """Build helper-generated artifacts without re-running pydantic validation.
+
+    In trusted mode, `table` and `chart` construct their SSEs with
+    `model_construct`, skipping the validation (and copy) of every row of
+    data, as well as the `ClientArtifact` validators. Chart parameters are
+    still validated, since they are cheap to check.
+
+    Other helpers, such as `reasoning_step`, `message_chunk` and `citations`,
+    are unaffected: their events are small enough that validating them in
+    pydantic-core is faster than constructing them with `model_construct`.
+
+    Trusted mode can also be enabled for the whole process by setting the
+    `OPENBB_AI_TRUSTED_MODE=1` environment variable (and
+    `OPENBB_AI_TRUSTED_MODE_VALIDATE_EVERY` to sample events).
+
+    Parameters
+    ----------
+    enabled: bool
+        Whether to enable trusted mode.
+        Default is True.
+    validate_every: int
+        Fully validate one in every `validate_every` trusted events, raising a
+        `ValidationError` if it is invalid. Set to 0 to never validate.
+        Default is 0.
+
+    Examples
+    --------
+    >>> async def event_generator():
+    ...     with trusted_mode(validate_every=100):
+    ...         yield table(data=rows, name="Prices")
+    """
+    token = _TRUSTED_MODE.set(validate_every if enabled else None)
+    try:
+        yield
+    finally:
+        _TRUSTED_MODE.reset(token)
+
+
+def _trusted(event: T) -> T:
+    validate_every = _TRUSTED_MODE.get()
+    if validate_every and next(_trusted_event_counter) % validate_every == 0:
+        type(event).model_validate_json(event.model_dump_json(warnings=False))
+    return event
 
 
 def reasoning_step(
@@ -105,6 +175,7 @@ def prompt_suggestions(suggestions: list[str]) -> PromptSuggestionsSSE:
     return PromptSuggestionsSSE(data=PromptSuggestionsSSEData(suggestions=suggestions))
 
 
+@profiled("helper")
 def get_widget_data(widget_requests: list[WidgetRequest]) -> FunctionCallSSE:
     """Create a function call that retrieve data for a widget on the OpenBB Workspace
 
@@ -144,6 +215,7 @@ def get_widget_data(widget_requests: list[WidgetRequest]) -> FunctionCallSSE:
     )
 
 
+@profiled("helper")
 def cite(
     widget: Widget,
     input_arguments: dict[str, Any],
@@ -182,6 +254,7 @@ def cite(
     )
 
 
+@profiled("helper")
 def citations(citations: list[Citation]) -> CitationCollectionSSE:
     """Create a citation collection SSE.
 
@@ -202,6 +275,7 @@ def citations(citations: list[Citation]) -> CitationCollectionSSE:
     return CitationCollectionSSE(data=CitationCollection(citations=citations))
 
 
+@profiled("helper")
 def table(
     data: list[dict],
     name: str | None = None,
@@ -244,6 +318,17 @@ def table(
         The table artifact to be sent to the client.
     """
 
+    if _TRUSTED_MODE.get() is not None:
+        return _trusted(
+            MessageArtifactSSE.model_construct(
+                data=ClientArtifact.model_construct(
+                    type="table",
+                    name=name or f"Table_{uuid.uuid4().hex[:4]}",
+                    description=description or "A table of data",
+                    content=data,
+                )
+            )
+        )
     return MessageArtifactSSE(
         data=ClientArtifact(
             type="table",
@@ -254,6 +339,7 @@ def table(
     )
 
 
+@profiled("helper")
 def chart(
     type: Literal["line", "bar", "scatter", "pie", "donut"],
     data: list[dict],
@@ -368,6 +454,18 @@ def chart(
         case _:
             raise ValueError(f"Invalid chart type: {type}")
 
+    if _TRUSTED_MODE.get() is not None:
+        return _trusted(
+            MessageArtifactSSE.model_construct(
+                data=ClientArtifact.model_construct(
+                    type="chart",
+                    name=name or f"{type} chart",
+                    description=description or f"A {type} chart of data",
+                    content=data,
+                    chart_params=parameters,
+                )
+            )
+        )
     return MessageArtifactSSE(
         data=ClientArtifact(
             type="chart",
@@ -0,0 +1,973 @@
+"""Read `QueryRequest` bodies incrementally, as they stream in.
+
+Waiting for a whole body before validating it delays the first event of a
+stream by the time it takes to receive and validate every context item.
+`RequestReader` parses the body as it arrives instead: each field of the
+request is validated as soon as its JSON is complete, and can be awaited on
+its own, so that an agent can start planning from the messages and widgets
+while large context items are still arriving and being validated.
+
+Fields are only complete once their JSON is, so fields sent before `context`
+(as OpenBB Workspace does) are available before it. `messages` and `context`
+are validated one item at a time, as their items arrive.
+
+`JsonScanner`, the incremental scanner the reader is built on, doesn't parse
+values: it only finds where they start and end, and skips over strings with
+regular expressions, so that large strings (eg. context data) are cheap to
+scan.
+
+`RequestGuard` is a scanner that also enforces `RequestLimits` (see
+`openbb_ai.limits`) as the body is scanned, so that oversized or deeply
+nested requests are rejected before any of them is validated. For bodies
+that have already been received, `validate_request` enforces them on the
+parsed body instead, so that it is only parsed once.
+"""
+
+import asyncio
+import json
+import re
+import sys
+from itertools import chain
+from typing import (
+    Annotated,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Literal,
+    NamedTuple,
+    NoReturn,
+)
+
+from pydantic import (
+    AfterValidator,
+    BeforeValidator,
+    PlainValidator,
+    TypeAdapter,
+    ValidationError,
+    WrapValidator,
+)
+from pydantic_core import from_json
+
+from .limits import (
+    RequestLimits,
+    _body_too_large,
+    _string_too_long,
+    _too_deep,
+    _too_long,
+)
+from .models import LlmMessage, QueryRequest, RawContext
+
+# The next structural character of JSON, outside of strings.
+_STRUCTURAL = re.compile(rb'["{}\[\],:]')
+# The next string without escape sequences, or bracket or quote, in a nested
+# container.
+_NESTED = re.compile(rb'"[^"\\]*"|["{}\[\]]')
+# A quote that isn't preceded by a backslash, so closes a string.
+_UNESCAPED_QUOTE = re.compile(rb'"(?<!\\")')
+
+Path = tuple[str | int, ...]
+
+
+def _matches(pattern: tuple[str, ...], path: Path) -> bool:
+    """Whether `path` matches a dotted path pattern, split on its dots."""
+    return len(pattern) == len(path) and all(
+        part == "*" or part == str(key) for part, key in zip(pattern, path, strict=True)
+    )
+
+
+def _max_length(
+    string_limits: list[tuple[tuple[str, ...], int | None]],
+    default: int | None,
+    path: Path,
+) -> int | None:
+    """The maximum length of the string at `path`: its pattern's, or `default`."""
+    for pattern, maximum in string_limits:
+        if _matches(pattern, path):
+            return maximum
+    return default
+
+
+def _utf8_length(string: str) -> int:
+    return len(string.encode("utf-8", "surrogatepass"))
+
+
+def _string_end(buffer: bytearray, pos: int, start: int) -> int:
+    """The index of the quote closing a string, or -1 if it isn't received yet.
+
+    The string's content starts at `start`, and was searched up to `pos`.
+    """
+    match = _UNESCAPED_QUOTE.search(buffer, pos)
+    end = match.start() if match else len(buffer)
+    # A quote preceded by backslashes also closes the string if the
+    # backslashes are themselves escaped, ie. if there is an even number of
+    # them. This is rare, so it is checked separately from the fast search.
+    while (candidate := buffer.find(b'\\\\"', pos, end)) >= 0:
+        quote = candidate + 2
+        backslashes = 2
+        while quote - backslashes > start and buffer[quote - backslashes - 1] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return quote
+        pos = quote + 1
+    return end if match else -1
+
+
+class JsonValue(NamedTuple):
+    """A complete value found by `JsonScanner`, and where it is in the document."""
+
+    path: Path
+    start: int
+    end: int
+
+
+class JsonLimitError(ValueError):
+    """A JSON document exceeds a limit of the `JsonScanner` scanning it.
+
+    Attributes
+    ----------
+    limit: Literal["depth", "string_length"]
+        The limit that is exceeded.
+    maximum: int
+        The value of the limit.
+    path: Path
+        The full path of the value exceeding the limit.
+    position: int
+        The position, in bytes, where the limit is exceeded.
+    """
+
+    def __init__(
+        self,
+        limit: Literal["depth", "string_length"],
+        maximum: int,
+        path: Path,
+        position: int,
+    ):
+        super().__init__(
+            f"JSON {limit.replace('_', ' ')} exceeds the maximum of {maximum}, "
+            f"at byte {position}."
+        )
+        self.limit = limit
+        self.maximum = maximum
+        self.path = path
+        self.position = position
+
+
+# What a container expects next.
+_KEY, _COLON, _VALUE, _AFTER_VALUE = range(4)
+
+
+class _Frame:
+    __slots__ = ("is_object", "start", "key", "expects", "empty")
+
+    def __init__(self, is_object: bool, start: int):
+        self.is_object = is_object
+        self.start = start
+        # The key (or index) of the current member (or item) of the container.
+        self.key: str | int = "" if is_object else 0
+        self.expects = _KEY if is_object else _VALUE
+        self.empty = True
+
+
+class JsonScanner:
+    """Incrementally find the values of a JSON document, as its bytes arrive.
+
+    The scanner checks the structure of the document, down to `depth`, but
+    doesn't parse its values: it finds where they start and end, so that they
+    can be parsed (and fully checked) separately, as soon as they are
+    complete.
+
+    Parameters
+    ----------
+    depth: int
+        The depth of the values to report: 1 for the members of the
+        document's top-level object (or array), 2 for their members, etc.
+        Default is 2.
+    max_depth: int | None
+        The maximum nesting depth of containers: 1 for the document's
+        top-level object (or array) itself. If None, no limit.
+        Default is None.
+    max_string_length: int | None
+        The maximum length of strings (keys included), in bytes of UTF-8,
+        once their escape sequences are decoded. If None, no limit.
+        Default is None.
+    max_string_lengths: dict[str, int | None] | None
+        The maximum length of string values, by path, overriding
+        `max_string_length` (None for no limit). Paths are dotted keys and
+        indices, where `*` matches any key or index (eg. `messages.*.content`).
+        Default is None.
+
+    Raises
+    ------
+    JsonLimitError
+        From `feed`, as soon as the document exceeds a limit.
+
+    Examples
+    --------
+    >>> scanner = JsonScanner(depth=1)
+    >>> scanner.feed(b'{"a": [1, 2], "b"')
+    [JsonValue(path=('a',), start=6, end=12)]
+    >>> scanner.buffer[6:12]
+    bytearray(b'[1, 2]')
+    """
+
+    def __init__(
+        self,
+        depth: int = 2,
+        max_depth: int | None = None,
+        max_string_length: int | None = None,
+        max_string_lengths: dict[str, int | None] | None = None,
+    ):
+        self.depth = depth
+        self.max_depth = max_depth
+        self.max_string_length = max_string_length
+        self.max_string_lengths = max_string_lengths or {}
+        self._string_limits = [
+            (tuple(path.split(".")), maximum)
+            for path, maximum in self.max_string_lengths.items()
+        ]
+        # The limits as plain ints, so that checking them is a comparison.
+        self._max_depth = sys.maxsize if max_depth is None else max_depth
+        lengths = [max_string_length, *self.max_string_lengths.values()]
+        # The length above which strings are checked against their limit.
+        self._check_length = min(
+            (length for length in lengths if length is not None), default=sys.maxsize
+        )
+        self.buffer = bytearray()
+        # Whether the whole document has been received.
+        self.done = False
+        # Where the next token is searched from: the end of the previous one.
+        self._pos = 0
+        self._stack: list[_Frame] = []
+        # The start of the string being scanned, if any, and how far it was.
+        self._string_start: int | None = None
+        self._string_pos = 0
+        # How deep the scanner is in a container nested deeper than `depth`,
+        # which it skips over, and where that container starts.
+        self._nested = 0
+        self._nested_start = 0
+        # The containers of the nested container being skipped over, tracked
+        # up to `_path_pos` only when the path of one of its values is needed.
+        self._path_start = -1
+        self._path_pos = 0
+        self._path_frames: list[_Frame] = []
+
+    def feed(self, chunk: bytes) -> list[JsonValue]:
+        """Scan the next chunk of the document.
+
+        Returns
+        -------
+        list[JsonValue]
+            The values, up to `depth`, completed by the chunk. The document
+            itself is reported, with an empty path, once it is complete.
+
+        Raises
+        ------
+        ValueError
+            If the document isn't valid JSON.
+        """
+        self.buffer += chunk
+        values: list[JsonValue] = []
+        buffer = self.buffer
+        stack = self._stack
+        while not self.done:
+            if self._string_start is not None:
+                start = self._string_start + 1
+                end = _string_end(buffer, self._string_pos, start)
+                if (end if end >= 0 else len(buffer)) - start > self._check_length:
+                    self._check_string(self._string_start, end)
+                if end < 0:
+                    # The string continues in the next chunk, possibly in the
+                    # middle of an escape sequence.
+                    self._string_pos = max(start, len(buffer) - 2)
+                    break
+                self._pos = end + 1
+                if not self._nested:
+                    self._end_string(self._string_start, self._pos, values)
+                self._string_start = None
+                continue
+
+            if self._nested:
+                # Only brackets matter in nested containers: their content is
+                # checked when the values containing them are parsed.
+                match = _NESTED.search(buffer, self._pos)
+                if match is None:
+                    break
+                self._pos = match.end()
+                if self._pos - match.start() > 1:
+                    if self._pos - match.start() - 2 > self._check_length:
+                        self._check_string(match.start(), self._pos - 1)
+                    continue
+                char = buffer[match.start()]
+                if char == 0x22:  # '"', starting a string with escape sequences
+                    self._string_start = match.start()
+                    self._string_pos = self._pos
+                elif char in b"{[":
+                    self._nested += 1
+                    if len(stack) + self._nested > self._max_depth:
+                        self._limit("depth", self._max_depth, match.start())
+                else:
+                    self._nested -= 1
+                    if not self._nested:
+                        self._end_value(self._nested_start, self._pos, values)
+                continue
+
+            match = _STRUCTURAL.search(buffer, self._pos)
+            if match is None:
+                break
+            i = match.start()
+            char = buffer[i]
+            # Anything but whitespace since the previous token is a literal
+            # (eg. a number).
+            segment = bytes(buffer[self._pos : i]) if self._pos < i else b""
+            literal = segment.strip()
+            literal_start = self._pos + len(segment) - len(segment.lstrip())
+            self._pos = i + 1
+            if not stack:
+                if literal or char not in b"{[":
+                    self._error(i)
+                stack.append(_Frame(char == 0x7B, i))
+                if self._max_depth < 1:
+                    self._limit("depth", self._max_depth, i)
+                continue
+
+            frame = stack[-1]
+            if literal:
+                if (
+                    frame.expects != _VALUE
+                    or char not in b",}]"
+                    or len(literal.split()) > 1
+                ):
+                    self._error(i)
+                self._end_value(literal_start, literal_start + len(literal), values)
+
+            if char == 0x22:  # '"'
+                if frame.expects not in (_KEY, _VALUE):
+                    self._error(i)
+                self._string_start = i
+                self._string_pos = i + 1
+            elif char in b"{[":
+                if frame.expects != _VALUE:
+                    self._error(i)
+                if len(stack) < self.depth:
+                    stack.append(_Frame(char == 0x7B, i))
+                else:
+                    self._nested = 1
+                    self._nested_start = i
+                if len(stack) + self._nested > self._max_depth:
+                    self._limit("depth", self._max_depth, i)
+            elif char in b"}]":
+                closes = frame.expects == _AFTER_VALUE or (
+                    frame.empty
+                    and frame.expects == (_KEY if frame.is_object else _VALUE)
+                )
+                if not closes or frame.is_object != (char == 0x7D):
+                    self._error(i)
+                stack.pop()
+                self._end_value(frame.start, i + 1, values)
+                if not stack:
+                    self.done = True
+            elif char == 0x2C:  # ','
+                if frame.expects != _AFTER_VALUE:
+                    self._error(i)
+                if frame.is_object:
+                    frame.expects = _KEY
+                else:
+                    frame.key += 1  # type: ignore[operator]
+                    frame.expects = _VALUE
+            else:  # ':'
+                if frame.expects != _COLON:
+                    self._error(i)
+                frame.expects = _VALUE
+        if self.done and buffer[self._pos :].strip():
+            self._error(self._pos)
+        return values
+
+    def _error(self, position: int) -> NoReturn:
+        raise ValueError(f"Invalid JSON at byte {position}.")
+
+    def _limit(
+        self, limit: Literal["depth", "string_length"], maximum: int, position: int
+    ) -> NoReturn:
+        raise JsonLimitError(limit, maximum, self._path(position), position)
+
+    def _check_string(self, quote: int, end: int) -> None:
+        """Check the length of the string starting at `quote`, up to `end`.
+
+        `end` is the closing quote, or -1 if the string isn't complete yet.
+        """
+        complete = end >= 0
+        end = end if complete else len(self.buffer)
+        maximum = self.max_string_length
+        if self._string_limits:
+            maximum = _max_length(self._string_limits, maximum, self._path(quote))
+        if maximum is None or (length := end - quote - 1) <= maximum:
+            return
+        # Escape sequences decode to at most 5 bytes fewer than they take, per
+        # backslash, so only strings with escape sequences might need decoding.
+        backslashes = self.buffer.count(b"\\", quote + 1, end)
+        if backslashes and length - 5 * backslashes <= maximum:
+            if not complete:
+                return
+            length = _utf8_length(json.loads(self.buffer[quote : end + 1]))
+        if length > maximum:
+            self._limit("string_length", maximum, quote)
+
+    def _path(self, position: int) -> Path:
+        """The full path of the value starting at `position`.
+
+        For a key, the path of the object it is a key of.
+        """
+        frames = [frame for frame in self._stack if frame.start < position]
+        if self._nested:
+            frames += self._nested_frames(position)
+        path = [frame.key for frame in frames]
+        if frames and frames[-1].is_object and frames[-1].expects == _KEY:
+            path.pop()
+        return tuple(path)
+
+    def _nested_frames(self, position: int) -> list[_Frame]:
+        """The containers, in the nested container, that contain `position`.
+
+        Nested containers aren't tracked while they are skipped over, so they
+        are scanned again, up to `position`. This only happens for values
+        exceeding a limit, or strings longer than the shortest string limit,
+        so it is rare, and each container is scanned at most once.
+        """
+        if self._path_start != self._nested_start:
+            self._path_start = self._path_pos = self._nested_start
+            self._path_frames = []
+        buffer = self.buffer
+        frames = self._path_frames
+        pos = self._path_pos
+        while (match := _STRUCTURAL.search(buffer, pos, position)) is not None:
+            i = match.start()
+            char = buffer[i]
+            pos = i + 1
+            if char == 0x22:  # '"'
+                pos = _string_end(buffer, pos, pos) + 1
+                if frames[-1].expects == _KEY:
+                    frames[-1].key = json.loads(buffer[i:pos])
+            elif char in b"{[":
+                frames.append(_Frame(char == 0x7B, i))
+            elif char in b"}]":
+                frames.pop()
+            elif char == 0x2C:  # ','
+                if frames[-1].is_object:
+                    frames[-1].expects = _KEY
+                else:
+                    frames[-1].key += 1  # type: ignore[operator]
+            else:  # ':'
+                frames[-1].expects = _VALUE
+        self._path_pos = pos
+        return frames
+
+    def _report(self, start: int, end: int, values: list[JsonValue]) -> None:
+        """Report a value of the current member of the innermost container."""
+        if len(self._stack) <= self.depth:
+            path = tuple(frame.key for frame in self._stack)
+            values.append(JsonValue(path, start, end))
+
+    def _end_value(self, start: int, end: int, values: list[JsonValue]) -> None:
+        self._report(start, end, values)
+        if self._stack:
+            self._stack[-1].expects = _AFTER_VALUE
+            self._stack[-1].empty = False
+
+    def _end_string(self, start: int, end: int, values: list[JsonValue]) -> None:
+        frame = self._stack[-1]
+        if frame.expects == _KEY:
+            key = self.buffer[start + 1 : end - 1]
+            frame.key = (
+                key.decode() if 0x5C not in key else json.loads(self.buffer[start:end])
+            )
+            frame.expects = _COLON
+            frame.empty = False
+        else:
+            self._end_value(start, end, values)
+
+
+class RequestGuard(JsonScanner):
+    """A `JsonScanner` of request bodies, that enforces `RequestLimits`.
+
+    The limits are checked as the body is scanned (the size of the body before
+    each chunk is scanned, and the number of messages and context items as
+    they are complete), so that `feed` fails as soon as one is exceeded.
+
+    Parameters
+    ----------
+    limits: RequestLimits
+        The limits to enforce.
+
+    Raises
+    ------
+    ValidationError
+        From `feed`, as soon as the body exceeds a limit.
+    """
+
+    def __init__(self, limits: RequestLimits):
+        super().__init__(
+            depth=2,
+            max_depth=limits.max_depth,
+            max_string_length=limits.max_string_length,
+            max_string_lengths=limits.max_string_lengths,
+        )
+        self.limits = limits
+        self._max_items = {
+            "messages": limits.max_messages,
+            "context": limits.max_context_items,
+        }
+
+    def feed(self, chunk: bytes) -> list[JsonValue]:
+        max_body_bytes = self.limits.max_body_bytes
+        if (
+            max_body_bytes is not None
+            and len(self.buffer) + len(chunk) > max_body_bytes
+        ):
+            raise _body_too_large(max_body_bytes)
+        try:
+            values = super().feed(chunk)
+        except JsonLimitError as exc:
+            if exc.limit == "depth":
+                raise _too_deep(exc.maximum, exc.path) from None
+            raise _string_too_long(exc.maximum, exc.path) from None
+        for value in values:
+            if len(value.path) != 2:
+                continue
+            name, index = value.path
+            maximum = self._max_items.get(str(name))
+            if maximum is not None and isinstance(index, int) and index >= maximum:
+                raise _too_long(str(name), maximum)
+        return values
+
+
+def _check_size(body: bytes, limits: RequestLimits) -> None:
+    if limits.max_body_bytes is not None and len(body) > limits.max_body_bytes:
+        raise _body_too_large(limits.max_body_bytes)
+
+
+def _within(body: Any, max_depth: int, max_chars: int) -> bool:
+    """Whether a parsed body is at most `max_depth` deep, with strings (keys
+    included) of at most `max_chars` characters.
+
+    The containers are walked level by level, without tracking their paths,
+    so that the walk costs a fraction of validating the body.
+    """
+    level = [body]
+    for _ in range(max_depth):
+        nested = []
+        objects = []
+        for value in level:
+            if type(value) is dict:
+                objects.append(value)
+                value = value.values()
+            for item in value:
+                if type(item) is str:
+                    if len(item) > max_chars:
+                        return False
+                elif type(item) is dict or type(item) is list:
+                    nested.append(item)
+        if objects and max(map(len, chain.from_iterable(objects))) > max_chars:
+            return False
+        if not nested:
+            return True
+        level = nested
+    return False
+
+
+def _check_parsed(body: Any, limits: RequestLimits) -> None:
+    """Check a parsed request body against `limits`, but its size.
+
+    The counts of messages and context items are checked first. Then, if the
+    body might exceed the depth or string limits, its containers are walked
+    again, with their paths, to check them like `RequestGuard` does (long
+    strings might be exempt, by their path).
+    """
+    if not isinstance(body, dict):
+        return
+    for name, max_items in (
+        ("messages", limits.max_messages),
+        ("context", limits.max_context_items),
+    ):
+        items = body.get(name)
+        if max_items is not None and isinstance(items, list) and len(items) > max_items:
+            raise _too_long(name, max_items)
+
+    max_depth = sys.maxsize if limits.max_depth is None else limits.max_depth
+    lengths = [limits.max_string_length, *limits.max_string_lengths.values()]
+    # A character is at most 4 bytes of UTF-8, so strings of up to
+    # `max_chars` characters are within every limit.
+    max_chars = (
+        min((length for length in lengths if length is not None), default=sys.maxsize)
+        // 4
+    )
+    if max_depth >= 1 and _within(body, max_depth, max_chars):
+        return
+
+    string_limits = [
+        (tuple(path.split(".")), maximum)
+        for path, maximum in limits.max_string_lengths.items()
+    ]
+
+    def check(string: str, path: Path) -> None:
+        maximum = _max_length(string_limits, limits.max_string_length, path)
+        if maximum is not None and (
+            len(string) > maximum
+            or (len(string) * 4 > maximum and _utf8_length(string) > maximum)
+        ):
+            raise _string_too_long(maximum, path)
+
+    # Walk the body in document order, so that the first value exceeding a
+    # limit is reported, like `RequestGuard` does. Keys are checked with the
+    # path of their object.
+    stack: list[tuple[Any, Path]] = [(body, ())]
+    while stack:
+        value, path = stack.pop()
+        if type(value) is str:
+            check(value, path)
+            continue
+        if len(path) >= max_depth:
+            raise _too_deep(max_depth, path)
+        children: list[tuple[Any, Path]] = []
+        items = value.items() if type(value) is dict else enumerate(value)
+        for key, item in items:
+            if type(key) is str and len(key) > max_chars:
+                children.append((key, path))
+            if type(item) is str:
+                if len(item) > max_chars:
+                    children.append((item, (*path, key)))
+            elif type(item) is dict or type(item) is list:
+                children.append((item, (*path, key)))
+        stack.extend(reversed(children))
+
+
+def check_request(body: bytes | str, limits: RequestLimits) -> None:
+    """Check a whole request body against `limits`, without validating it.
+
+    The body is parsed to be checked: use `validate_request` to validate it
+    too, without parsing it again. Invalid JSON isn't reported: validating
+    the body reports it.
+
+    Raises
+    ------
+    ValidationError
+        If the body exceeds a limit.
+
+    Examples
+    --------
+    >>> check_request(body, RequestLimits())
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    _check_size(body, limits)
+    try:
+        parsed = from_json(body)
+    except ValueError:
+        return
+    _check_parsed(parsed, limits)
+
+
+def validate_request(body: bytes | str, limits: RequestLimits) -> QueryRequest:
+    """Validate a whole request body, within `limits`.
+
+    The body is parsed once: the limits are checked on the parsed body (see
+    `check_request`), which is then validated, so that enforcing them costs
+    a fraction of validating the body, rather than another pass over it.
+
+    Raises
+    ------
+    ValidationError
+        If the body exceeds a limit (with the error of the limit), or is
+        invalid (with the same errors as `QueryRequest.model_validate_json`).
+
+    Examples
+    --------
+    >>> request = validate_request(body, RequestLimits())
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    _check_size(body, limits)
+    try:
+        parsed = from_json(body)
+    except ValueError:
+        # Report invalid JSON like validating the body does.
+        return QueryRequest.model_validate_json(body)
+    _check_parsed(parsed, limits)
+    return QueryRequest.model_validate(parsed)
+
+
+_MISSING: Any = object()
+_ADAPTERS: dict[str, TypeAdapter] = {}
+_VALIDATORS = {
+    "before": BeforeValidator,
+    "after": AfterValidator,
+    "wrap": WrapValidator,
+    "plain": PlainValidator,
+}
+
+
+def _adapter(name: str) -> TypeAdapter:
+    """The adapter validating a field of `QueryRequest`, or an item of
+    `messages` (for `messages.*`).
+
+    Fields are validated with their constraints and the field validators of
+    `QueryRequest`, as they are when the whole request is validated.
+    """
+    adapter = _ADAPTERS.get(name)
+    if adapter is None:
+        if name == "messages.*":
+            adapter = TypeAdapter(LlmMessage)  # type: ignore[arg-type]
+        else:
+            field = QueryRequest.model_fields[name]
+            validators = [
+                _VALIDATORS[validator.info.mode](validator.func)
+                for validator in (
+                    QueryRequest.__pydantic_decorators__.field_validators.values()
+                )
+                if name in validator.info.fields or "*" in validator.info.fields
+            ]
+            metadata = [*field.metadata, *validators]
+            adapter = TypeAdapter(
+                Annotated[(field.annotation, *metadata)]  # type: ignore[arg-type]
+                if metadata
+                else field.annotation
+            )
+        _ADAPTERS[name] = adapter
+    return adapter
+
+
+class RequestReader:
+    """Read a `QueryRequest` body incrementally, as it streams in.
+
+    Feed the body to the reader as it arrives (or let `read` do it), and await
+    the fields of the request as soon as they are complete: `field` for any
+    field of the request, `context` for the context items, one at a time, and
+    `request` for the whole request.
+
+    Each part of the request is validated on its own, as soon as it is
+    complete. If any part is invalid, the whole body is validated again, so
+    that `request` raises the same `ValidationError` as
+    `QueryRequest.model_validate_json` would.
+
+    Parameters
+    ----------
+    limits: RequestLimits | None
+        The limits the body must stay within (see `RequestGuard`). A body
+        exceeding one is rejected as soon as it does: the rest of it isn't
+        read, and `request` raises the `ValidationError` of the limit. If
+        None, no limits.
+        Default is None.
+
+    Examples
+    --------
+    >>> @app.post("/query")
+    ... async def query(request: Request):
+    ...     reader = RequestReader()
+    ...     asyncio.create_task(reader.read(request.stream()))
+    ...     messages = await reader.field("messages")
+    ...     widgets = await reader.field("widgets")
+    ...     # Start planning, then wait for the context items, or the request.
+    ...     async for context in reader.context():
+    ...         ...
+    """
+
+    def __init__(self, limits: RequestLimits | None = None):
+        self._scanner = JsonScanner(depth=2) if limits is None else RequestGuard(limits)
+        # The values of the complete fields of the request.
+        self._values: dict[str, Any] = {}
+        # The items of `messages` and `context` validated so far. Items that
+        # failed validation are their `ValidationError`.
+        self._items: dict[str, list[Any]] = {"messages": [], "context": []}
+        self._failed = False
+        self._request: QueryRequest | None = None
+        self._error: BaseException | None = None
+        self._waiters: dict[tuple[str, Any], asyncio.Future] = {}
+        # Whether the whole body has been read (or failed to).
+        self.done = False
+
+    def feed(self, chunk: bytes) -> None:
+        """Read the next chunk of the body.
+
+        Chunks received once the request has been read (eg. whitespace after
+        the end of the body) are ignored.
+        """
+        if self.done:
+            return
+        try:
+            values = self._scanner.feed(chunk)
+        except ValidationError as exc:
+            # A limit is exceeded: don't validate the body.
+            self._finish(exc)
+            return
+        except ValueError:
+            self._finish()
+            return
+        for value in values:
+            self._read_value(value)
+
+    def close(self) -> None:
+        """Signal the end of the body."""
+        if not self.done:
+            self._finish()
+
+    async def read(self, chunks: AsyncIterable[bytes]) -> QueryRequest:
+        """Read the whole body from `chunks`, and return the request."""
+        try:
+            async for chunk in chunks:
+                self.feed(chunk)
+                if self.done:
+                    break
+        except BaseException as exc:
+            self._finish(exc)
+            raise
+        self.close()
+        return await self.request()
+
+    async def field(self, name: str) -> Any:
+        """The validated value of a field of the request, once it is complete.
+
+        Fields are validated as they are in `QueryRequest` (with their
+        constraints and field validators). Fields missing from the body have
+        their default value, once the whole body has been read. Once the
+        request has failed, this raises its error, whatever the field.
+        """
+        if name not in QueryRequest.model_fields:
+            raise ValueError(f"QueryRequest has no field '{name}'.")
+        return await self._wait(("field", name))
+
+    async def context_item(self, index: int) -> RawContext:
+        """The validated context item at `index`, once it is complete.
+
+        Raises IndexError if the request has fewer context items.
+        """
+        return await self._wait(("context", index))
+
+    async def context(self) -> AsyncIterator[RawContext]:
+        """The validated context items of the request, as they are complete."""
+        index = 0
+        while True:
+            try:
+                item = await self.context_item(index)
+            except IndexError:
+                return
+            yield item
+            index += 1
+
+    async def request(self) -> QueryRequest:
+        """The validated request, once the whole body has been read."""
+        return await self._wait(("request", None))
+
+    def _read_value(self, value: JsonValue) -> None:
+        if not value.path:
+            self._finish()
+            return
+        name = value.path[0]
+        if name not in QueryRequest.model_fields:
+            return
+        assert isinstance(name, str)
+        buffer = self._scanner.buffer
+        if len(value.path) == 2:
+            if name in self._items:
+                item: Any
+                raw = buffer[value.start : value.end]
+                try:
+                    if name == "context":
+                        item = RawContext.model_validate_json(raw)
+                    else:
+                        item = _adapter("messages.*").validate_json(raw)
+                except ValidationError as exc:
+                    self._failed = True
+                    item = exc
+                self._items[name].append(item)
+                self._notify((name, len(self._items[name]) - 1))
+            return
+
+        if name in self._items and buffer[value.start] == 0x5B:  # '['
+            items = self._items[name]
+            self._items[name] = []
+            try:
+                # The items are validated already: this checks the list.
+                self._values[name] = _adapter(name).validate_python(items)
+            except ValidationError:
+                self._failed = True
+                return
+            if name == "context":
+                # Waiters for items past the end get an IndexError.
+                for key in [key for key in self._waiters if key[0] == "context"]:
+                    self._notify(key)
+        elif name == "messages":
+            # Not a list: full validation reports the error.
+            self._failed = True
+            return
+        else:
+            try:
+                self._values[name] = _adapter(name).validate_json(
+                    buffer[value.start : value.end]
+                )
+            except ValidationError:
+                self._failed = True
+                return
+        self._notify(("field", name))
+
+    def _finish(self, error: BaseException | None = None) -> None:
+        self.done = True
+        if error is not None:
+            self._error = error
+        elif self._scanner.done and not self._failed:
+            try:
+                self._request = QueryRequest.model_validate(self._values)
+            except ValidationError:
+                pass
+        if self._request is None and self._error is None:
+            try:
+                # Raise the same error as validating the whole body would.
+                self._request = QueryRequest.model_validate_json(
+                    bytes(self._scanner.buffer)
+                )
+            except ValidationError as exc:
+                self._error = exc
+        for key in list(self._waiters):
+            self._notify(key)
+
+    def _lookup(self, key: tuple[str, Any]) -> Any:
+        """The value for `key`, if known yet, or `_MISSING`.
+
+        Once the request has failed, every lookup raises its error.
+        """
+        if self._error is not None:
+            raise self._error
+        kind, name = key
+        request = self._request
+        if kind == "field":
+            if request is not None:
+                return getattr(request, name)
+            if name in self._values:
+                return self._values[name]
+        elif kind == "context":
+            if request is not None:
+                return (request.context or [])[name]
+            items = self._items["context"]
+            if "context" in self._values:
+                items = self._values["context"] or []
+            if name < len(items):
+                if isinstance(items[name], ValidationError):
+                    raise items[name]
+                return items[name]
+            if "context" in self._values:
+                raise IndexError(name)
+        elif request is not None:
+            return request
+        return _MISSING
+
+    async def _wait(self, key: tuple[str, Any]) -> Any:
+        while (value := self._lookup(key)) is _MISSING:
+            waiter = self._waiters.get(key)
+            if waiter is None:
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters[key] = waiter
+            await waiter
+        return value
+
+    def _notify(self, key: tuple[str, Any]) -> None:
+        waiter = self._waiters.pop(key, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
@@ -0,0 +1,404 @@
+"""Per-stream latency and throughput instrumentation for agent event streams."""
+
+import time
+from typing import Any, AsyncGenerator, AsyncIterable, Callable, NamedTuple
+
+from pydantic import BaseModel, Field
+
+from .models import BaseSSE
+from .responses import encode_event, event_type_of
+
+
+class StreamStats(BaseModel):
+    stream_id: str | None = Field(default=None, description="ID of the stream.")
+    started_at: float = Field(
+        default_factory=time.time, description="Wall-clock start time of the stream."
+    )
+    time_to_first_event: float | None = Field(
+        default=None, description="Seconds from the start to the first event."
+    )
+    time_to_first_chunk: float | None = Field(
+        default=None, description="Seconds from the start to the first message chunk."
+    )
+    time_to_first_artifact: float | None = Field(
+        default=None, description="Seconds from the start to the first artifact."
+    )
+    time_to_last_function_call: float | None = Field(
+        default=None,
+        description="Seconds from the start to the last function call.",
+    )
+    duration: float | None = Field(
+        default=None, description="Seconds from the start to the end of the stream."
+    )
+    events: dict[str, int] = Field(
+        default_factory=dict, description="Number of events, by event type."
+    )
+    bytes: dict[str, int] = Field(
+        default_factory=dict,
+        description="Bytes of encoded events, by event type. SSE models are only "
+        "measured if the stream is instrumented with `encode=True`.",
+    )
+    max_gap: float = Field(
+        default=0.0, description="Longest time between two consecutive events."
+    )
+    completed: bool = Field(
+        default=False,
+        description="Whether the stream ran to its end (ie. without an error, and "
+        "without the client disconnecting).",
+    )
+    error: str | None = Field(
+        default=None, description="The error that ended the stream, if any."
+    )
+
+
+class InstrumentationSink:
+    """Receives the measurements of instrumented streams.
+
+    Subclass it and override the hooks you need. The hooks are called inline
+    with the stream, so they should be fast and must not raise.
+    """
+
+    def on_stream_start(self, stats: StreamStats) -> None:
+        """Called before the first event is requested from the generator."""
+
+    def on_event(
+        self,
+        stats: StreamStats,
+        event_type: str,
+        size: int,
+        elapsed: float,
+        gap: float,
+        first: bool = False,
+        first_of_type: bool = False,
+    ) -> None:
+        """Called for every event, with its encoded size (0 if it wasn't
+        measured, see `instrument`), the time since the start of the stream,
+        and the time the generator took to produce it (ie. since the previous
+        event was consumed). `first` is True for the first event of the
+        stream, and `first_of_type` for the first event of its type."""
+
+    def on_stream_end(self, stats: StreamStats) -> None:
+        """Called once the stream has ended, failed or been closed."""
+
+
+class CallbackSink(InstrumentationSink):
+    """Calls `on_end` with the stats of every stream once it has ended."""
+
+    def __init__(self, on_end: Callable[[StreamStats], Any]):
+        self.on_end = on_end
+
+    def on_stream_end(self, stats: StreamStats) -> None:
+        self.on_end(stats)
+
+
+class InstrumentedEvent(NamedTuple):
+    stream_id: str | None
+    event_type: str
+    size: int
+    elapsed: float
+    gap: float
+    first: bool = False
+    first_of_type: bool = False
+
+
+class InMemorySink(InstrumentationSink):
+    """Keeps every measurement in memory. Meant for tests."""
+
+    def __init__(self):
+        self.streams: list[StreamStats] = []
+        self.events: list[InstrumentedEvent] = []
+
+    def on_event(
+        self,
+        stats: StreamStats,
+        event_type: str,
+        size: int,
+        elapsed: float,
+        gap: float,
+        first: bool = False,
+        first_of_type: bool = False,
+    ) -> None:
+        self.events.append(
+            InstrumentedEvent(
+                stats.stream_id, event_type, size, elapsed, gap, first, first_of_type
+            )
+        )
+
+    def on_stream_end(self, stats: StreamStats) -> None:
+        self.streams.append(stats)
+
+
+class PrometheusSink(InstrumentationSink):
+    """Records into Prometheus-style metrics, eg. from `prometheus_client`.
+
+    Any object with the same interface as `prometheus_client` metrics can be
+    used, so `prometheus_client` isn't a dependency.
+
+    Parameters
+    ----------
+    latency: Any
+        A histogram with a `phase` label, observing the time to the first event
+        ("first_event"), first message chunk ("first_chunk"), first artifact
+        ("first_artifact"), last function call ("last_function_call") and the
+        duration of the stream ("duration").
+    events: Any | None
+        A counter with an `event_type` label, counting events.
+        Default is None.
+    bytes: Any | None
+        A counter with an `event_type` label, counting bytes of encoded events.
+        Default is None.
+    gaps: Any | None
+        A histogram observing the time between consecutive events.
+        Default is None.
+
+    Examples
+    --------
+    >>> from prometheus_client import Counter, Histogram
+    >>> sink = PrometheusSink(
+    ...     latency=Histogram("agent_stream_latency_seconds", "", ["phase"]),
+    ...     events=Counter("agent_stream_events", "", ["event_type"]),
+    ...     bytes=Counter("agent_stream_bytes", "", ["event_type"]),
+    ...     gaps=Histogram("agent_stream_gap_seconds", ""),
+    ... )
+    """
+
+    def __init__(
+        self,
+        latency: Any,
+        events: Any | None = None,
+        bytes: Any | None = None,
+        gaps: Any | None = None,
+    ):
+        self.latency = latency
+        self.events = events
+        self.bytes = bytes
+        self.gaps = gaps
+
+    def on_event(
+        self,
+        stats: StreamStats,
+        event_type: str,
+        size: int,
+        elapsed: float,
+        gap: float,
+        first: bool = False,
+        first_of_type: bool = False,
+    ) -> None:
+        if self.events is not None:
+            self.events.labels(event_type=event_type).inc()
+        if self.bytes is not None:
+            self.bytes.labels(event_type=event_type).inc(size)
+        if self.gaps is not None and not first:
+            self.gaps.observe(gap)
+
+    def on_stream_end(self, stats: StreamStats) -> None:
+        phases = {
+            "first_event": stats.time_to_first_event,
+            "first_chunk": stats.time_to_first_chunk,
+            "first_artifact": stats.time_to_first_artifact,
+            "last_function_call": stats.time_to_last_function_call,
+            "duration": stats.duration,
+        }
+        for phase, value in phases.items():
+            if value is not None:
+                self.latency.labels(phase=phase).observe(value)
+
+
+_FIRST_MILESTONES = {
+    "copilotMessageChunk": "first_chunk",
+    "copilotMessageArtifact": "first_artifact",
+}
+
+
+class SpanSink(InstrumentationSink):
+    """Records each stream as an OpenTelemetry-style span.
+
+    Any tracer with the same interface as an OpenTelemetry `Tracer` can be
+    used, so `opentelemetry` isn't a dependency. The span gets an event for
+    the first event, message chunk and artifact and the last function call,
+    and the stream stats as attributes.
+
+    Parameters
+    ----------
+    tracer: Any
+        The tracer, eg. `opentelemetry.trace.get_tracer(__name__)`.
+    name: str
+        The name of the span.
+        Default is "openbb_ai.stream".
+    """
+
+    def __init__(self, tracer: Any, name: str = "openbb_ai.stream"):
+        self.tracer = tracer
+        self.name = name
+        self._spans: dict[int, Any] = {}
+
+    def on_stream_start(self, stats: StreamStats) -> None:
+        self._spans[id(stats)] = self.tracer.start_span(
+            self.name, attributes={"openbb_ai.stream_id": stats.stream_id or ""}
+        )
+
+    def on_event(
+        self,
+        stats: StreamStats,
+        event_type: str,
+        size: int,
+        elapsed: float,
+        gap: float,
+        first: bool = False,
+        first_of_type: bool = False,
+    ) -> None:
+        milestones = []
+        if first:
+            milestones.append("first_event")
+        if event_type == "copilotFunctionCall":
+            milestones.append("function_call")
+        elif first_of_type and event_type in _FIRST_MILESTONES:
+            milestones.append(_FIRST_MILESTONES[event_type])
+        span = self._spans[id(stats)]
+        for milestone in milestones:
+            span.add_event(
+                milestone, attributes={"event_type": event_type, "elapsed": elapsed}
+            )
+
+    def on_stream_end(self, stats: StreamStats) -> None:
+        span = self._spans.pop(id(stats))
+        for key, value in stats.model_dump(exclude_none=True).items():
+            if isinstance(value, dict):
+                for event_type, count in value.items():
+                    span.set_attribute(f"openbb_ai.{key}.{event_type}", count)
+            else:
+                span.set_attribute(f"openbb_ai.{key}", value)
+        span.end()
+
+
+_sink: InstrumentationSink | None = None
+
+
+def set_sink(sink: InstrumentationSink | None) -> None:
+    """Set the sink used by `instrument` by default. None disables it."""
+    global _sink
+    _sink = sink
+
+
+def get_sink() -> InstrumentationSink | None:
+    """Return the sink used by `instrument` by default, if any."""
+    return _sink
+
+
+def instrument(
+    events: AsyncIterable[Any],
+    sink: InstrumentationSink | None = None,
+    stream_id: str | None = None,
+    encode: bool = False,
+) -> AsyncIterable[Any]:
+    """Measure the latency and throughput of an agent's event stream.
+
+    Records the time to the first event, first message chunk, first artifact
+    and last function call, the number of events and bytes per event type, and
+    the gaps between events, and reports them to `sink`.
+
+    If there's no sink (ie. `sink` is None and no default sink was set with
+    `set_sink`), `events` is returned as is, so instrumentation has no overhead
+    when disabled.
+
+    Parameters
+    ----------
+    events: AsyncIterable[Any]
+        The agent's event stream, typically an async generator of SSEs.
+    sink: InstrumentationSink | None
+        The sink to report to. If None, the default sink is used.
+        Default is None.
+    stream_id: str | None
+        An ID for the stream, passed to the sink in the stats.
+        Default is None.
+    encode: bool
+        If True, events are yielded encoded as bytes (eg. for `SSEResponse`),
+        and their size is measured from those bytes. If False, events are
+        passed through as they are, and SSE models aren't measured, as that
+        would encode them a second time.
+        Default is False.
+
+    Examples
+    --------
+    >>> set_sink(CallbackSink(lambda stats: logger.info(stats.model_dump())))
+    >>> return SSEResponse(instrument(event_generator(), encode=True))
+
+    Returns
+    -------
+    AsyncIterable[Any]
+        The event stream, unchanged (or encoded, if `encode` is True).
+    """
+    sink = sink or _sink
+    if sink is None:
+        return events
+    return _instrumented(events, sink, stream_id, encode)
+
+
+def _size(event: Any) -> int:
+    if isinstance(event, bytes):
+        return len(event)
+    if isinstance(event, dict):
+        return len(str(event.get("data", "")).encode())
+    # Not encoded yet: it would have to be encoded again just to be measured.
+    return 0
+
+
+async def _instrumented(
+    events: AsyncIterable[Any],
+    sink: InstrumentationSink,
+    stream_id: str | None,
+    encode: bool,
+) -> AsyncGenerator[Any, None]:
+    stats = StreamStats(stream_id=stream_id)
+    clock = time.perf_counter
+    start = previous = clock()
+    sink.on_stream_start(stats)
+    iterator = aiter(events)
+    try:
+        async for event in iterator:
+            now = clock()
+            elapsed, gap = now - start, now - previous
+            previous = now
+            if encode and isinstance(event, BaseSSE | dict):
+                event = encode_event(event)
+            event_type = event_type_of(event)
+            size = _size(event)
+
+            count = stats.events[event_type] = stats.events.get(event_type, 0) + 1
+            if size:
+                stats.bytes[event_type] = stats.bytes.get(event_type, 0) + size
+            first = stats.time_to_first_event is None
+            if first:
+                stats.time_to_first_event = elapsed
+            elif gap > stats.max_gap:
+                stats.max_gap = gap
+            if event_type == "copilotMessageChunk":
+                if stats.time_to_first_chunk is None:
+                    stats.time_to_first_chunk = elapsed
+            elif event_type == "copilotMessageArtifact":
+                if stats.time_to_first_artifact is None:
+                    stats.time_to_first_artifact = elapsed
+            elif event_type == "copilotFunctionCall":
+                stats.time_to_last_function_call = elapsed
+            sink.on_event(
+                stats,
+                event_type,
+                size,
+                elapsed,
+                gap,
+                first=first,
+                first_of_type=count == 1,
+            )
+
+            yield event
+            # Don't count the time the consumer took to handle the event.
+            previous = clock()
+        stats.completed = True
+    except Exception as exc:
+        stats.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        stats.duration = clock() - start
+        sink.on_stream_end(stats)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
@@ -0,0 +1,110 @@
+"""Resource limits for `QueryRequest` bodies.
+
+Validating a request costs time and memory in proportion to its size and its
+nesting, and free-form fields (eg. `input_arguments`, `metadata` or
+`details`) are validated whatever their content. A single pathological
+request (eg. hundreds of MB of JSON, or dicts nested thousands of levels
+deep) can therefore pin a core of the worker.
+
+`RequestLimits` is a profile of limits that requests must stay within. It is
+enforced by `openbb_ai.ingest.RequestGuard` as the body is scanned, before any
+of it is validated, so that requests exceeding a limit are rejected as soon as
+they do, without being parsed, or by `openbb_ai.ingest.validate_request` on a
+whole body, once it is parsed and before it is validated. Limits are reported
+as a `ValidationError`, with one error for the first limit exceeded, like
+pydantic reports its own constraints.
+"""
+
+from pydantic import BaseModel, Field, ValidationError
+from pydantic_core import InitErrorDetails, PydanticCustomError
+
+
+class RequestLimits(BaseModel):
+    """A profile of limits that request bodies must stay within.
+
+    The defaults are far above what OpenBB Workspace sends, and only reject
+    pathological requests. Any limit can be set to None, for no limit.
+
+    Examples
+    --------
+    >>> limits = RequestLimits(max_messages=200, max_depth=16)
+    >>> validate_request(body, limits)  # See `openbb_ai.ingest.validate_request`.
+    """
+
+    max_body_bytes: int | None = Field(
+        default=64 * 1024**2,
+        description="The maximum size of a request body, in bytes.",
+    )
+    max_messages: int | None = Field(
+        default=5_000, description="The maximum number of messages."
+    )
+    max_context_items: int | None = Field(
+        default=1_000, description="The maximum number of context items."
+    )
+    max_depth: int | None = Field(
+        default=32,
+        description="The maximum nesting depth of the JSON body, where the request object itself is 1.",  # noqa: E501
+    )
+    max_string_length: int | None = Field(
+        default=1024**2,
+        description="The maximum length of strings, in bytes of UTF-8 (once escape sequences are decoded).",  # noqa: E501
+    )
+    max_string_lengths: dict[str, int | None] = Field(
+        default={
+            "messages.*.content": None,
+            "messages.*.data.*.items.*.content": None,
+            "context.*.data.items.*.content": None,
+        },
+        description="The maximum length of strings, by path, overriding `max_string_length` (None for no limit but the body size). Paths are dotted keys and indices, where `*` matches any key or index (eg. `context.*.name`). By default, the content of messages and of their and the context's data has no limit.",  # noqa: E501
+    )
+
+
+def _error(
+    error_type: str, message: str, context: dict, loc: tuple[str | int, ...]
+) -> ValidationError:
+    return ValidationError.from_exception_data(
+        "QueryRequest",
+        [
+            InitErrorDetails(
+                type=PydanticCustomError(error_type, message, context),
+                loc=loc,
+                input=None,
+            )
+        ],
+    )
+
+
+def _body_too_large(max_bytes: int) -> ValidationError:
+    return _error(
+        "body_too_large",
+        "Request body should be at most {max_bytes} bytes",
+        {"max_bytes": max_bytes},
+        (),
+    )
+
+
+def _too_long(field: str, max_length: int) -> ValidationError:
+    return _error(
+        "too_long",
+        "List should have at most {max_length} items",
+        {"max_length": max_length},
+        (field,),
+    )
+
+
+def _too_deep(max_depth: int, loc: tuple[str | int, ...]) -> ValidationError:
+    return _error(
+        "too_deep",
+        "JSON should be nested at most {max_depth} levels deep",
+        {"max_depth": max_depth},
+        loc,
+    )
+
+
+def _string_too_long(max_length: int, loc: tuple[str | int, ...]) -> ValidationError:
+    return _error(
+        "string_too_long",
+        "String should have at most {max_length} bytes",
+        {"max_length": max_length},
+        loc,
+    )
@@ -0,0 +1,379 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, Callable, Sequence
+
+from pydantic import BaseModel, Field
+
+from .models import (
+    ClientFunctionCallError,
+    DataContent,
+    DataFileReferences,
+    QueryRequest,
+    SingleDataContent,
+)
+from .responses import Message, Receive, Scope, Send
+from .testing import SSEParser
+
+ASGIApp = Callable[[Scope, Receive, Send], Any]
+
+WidgetData = DataContent | DataFileReferences | ClientFunctionCallError
+
+
+def default_widget_data(data_source: dict[str, Any]) -> WidgetData:
+    """Canned widget data: a small table, whatever the data source."""
+    rows = [{"date": f"2024-01-{day:02d}", "value": float(day)} for day in range(1, 11)]
+    return DataContent(items=[SingleDataContent(content=json.dumps(rows))])
+
+
+class Percentiles(BaseModel):
+    count: int = Field(default=0, description="Number of samples.")
+    p50: float | None = Field(default=None, description="Median, in seconds.")
+    p90: float | None = Field(default=None, description="90th percentile, in seconds.")
+    p99: float | None = Field(default=None, description="99th percentile, in seconds.")
+    max: float | None = Field(default=None, description="Maximum, in seconds.")
+
+    @classmethod
+    def of(cls, samples: Sequence[float]) -> "Percentiles":
+        if not samples:
+            return cls()
+        ordered = sorted(samples)
+
+        def rank(q: float) -> float:
+            return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+        return cls(
+            count=len(ordered),
+            p50=rank(0.5),
+            p90=rank(0.9),
+            p99=rank(0.99),
+            max=ordered[-1],
+        )
+
+
+class TurnMetrics(BaseModel):
+    """Metrics of a single agent turn, including its widget data round trips."""
+
+    status: int | None = Field(
+        default=None, description="HTTP status of the last response."
+    )
+    round_trips: int = Field(
+        default=0,
+        description="Number of `get_widget_data` calls answered with canned data.",
+    )
+    time_to_first_event: float | None = Field(
+        default=None,
+        description="Seconds from the start of the turn to the first event.",
+    )
+    time_to_first_chunk: float | None = Field(
+        default=None,
+        description="Seconds from the start of the turn to the first message chunk.",
+    )
+    chunk_intervals: list[float] = Field(
+        default_factory=list,
+        description="Seconds between consecutive message chunks of a response.",
+    )
+    events: int = Field(default=0, description="Number of events received.")
+    bytes_by_event_type: dict[str, int] = Field(
+        default_factory=dict,
+        description="Bytes of SSE data received, by event type.",
+    )
+    duration: float = Field(default=0.0, description="Duration of the turn.")
+    error: str | None = Field(
+        default=None, description="The error that ended the turn, if any."
+    )
+
+
+class LoadTestReport(BaseModel):
+    turns: int = Field(description="Number of agent turns run.")
+    concurrency: int = Field(description="Number of turns run concurrently.")
+    errors: int = Field(description="Number of turns that failed.")
+    duration: float = Field(description="Wall-clock duration of the run.")
+    time_to_first_event: Percentiles
+    time_to_first_chunk: Percentiles
+    chunk_inter_arrival: Percentiles
+    bytes_by_event_type: dict[str, int]
+    total_bytes: int
+    turns_per_second: float
+    events_per_second: float
+    bytes_per_second: float
+    results: list[TurnMetrics] = Field(description="Metrics of every turn.")
+
+
+async def _post(
+    app: ASGIApp,
+    path: str,
+    body: bytes,
+    headers: list[tuple[bytes, bytes]],
+    on_body: Callable[[bytes], None],
+) -> int | None:
+    status: int | None = None
+    response_done = asyncio.Event()
+    request_sent = False
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            on_body(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"accept", b"text/event-stream"),
+            *headers,
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    try:
+        await app(scope, receive, send)
+    finally:
+        response_done.set()
+    return status
+
+
+class _ResponseRecorder:
+    def __init__(self, metrics: TurnMetrics, start: float):
+        self.metrics = metrics
+        self.start = start
+        self.parser = SSEParser()
+        self.function_calls: list[dict[str, Any]] = []
+        self._last_chunk: float | None = None
+
+    def feed(self, chunk: bytes) -> None:
+        self._record(self.parser.feed(chunk))
+
+    def close(self) -> None:
+        self._record(self.parser.close())
+
+    def _record(self, events: list[tuple[str, str]]) -> None:
+        metrics = self.metrics
+        now = time.perf_counter() - self.start
+        for event_type, data in events:
+            metrics.events += 1
+            metrics.bytes_by_event_type[event_type] = metrics.bytes_by_event_type.get(
+                event_type, 0
+            ) + len(data.encode())
+            if metrics.time_to_first_event is None:
+                metrics.time_to_first_event = now
+            if event_type == "copilotMessageChunk":
+                if metrics.time_to_first_chunk is None:
+                    metrics.time_to_first_chunk = now
+                if self._last_chunk is not None:
+                    metrics.chunk_intervals.append(now - self._last_chunk)
+                self._last_chunk = now
+            elif event_type == "copilotFunctionCall":
+                self.function_calls.append(json.loads(data))
+
+
+async def run_turn(
+    app: ASGIApp,
+    request: QueryRequest | dict[str, Any],
+    path: str = "/query",
+    headers: dict[str, str] | None = None,
+    widget_data: Callable[[dict[str, Any]], WidgetData] = default_widget_data,
+    max_round_trips: int = 5,
+) -> TurnMetrics:
+    """Run a single agent turn against an ASGI app, in-process.
+
+    If the agent calls `get_widget_data`, the call is answered like OpenBB
+    Workspace does: with a follow-up request containing the function call and
+    its result, built from `widget_data` for each data source.
+    """
+    payload = (
+        request.model_dump(mode="json", exclude_none=True)
+        if isinstance(request, QueryRequest)
+        else request
+    )
+    raw_headers = [
+        (key.lower().encode("latin-1"), value.encode("latin-1"))
+        for key, value in (headers or {}).items()
+    ]
+    metrics = TurnMetrics()
+    start = time.perf_counter()
+
+    try:
+        while True:
+            recorder = _ResponseRecorder(metrics, start)
+            metrics.status = await _post(
+                app, path, json.dumps(payload).encode(), raw_headers, recorder.feed
+            )
+            recorder.close()
+            if metrics.status is None or metrics.status >= 400:
+                metrics.error = f"HTTP status {metrics.status}"
+                break
+            widget_calls = [
+                call
+                for call in recorder.function_calls
+                if call["function"] == "get_widget_data"
+            ]
+            if not widget_calls or metrics.round_trips >= max_round_trips:
+                break
+            call = widget_calls[-1]
+            metrics.round_trips += 1
+            payload = {
+                **payload,
+                "messages": [
+                    *payload["messages"],
+                    {
+                        "role": "ai",
+                        "content": json.dumps(
+                            {
+                                "function": call["function"],
+                                "input_arguments": call["input_arguments"],
+                            }
+                        ),
+                    },
+                    {
+                        "role": "tool",
+                        "function": call["function"],
+                        "input_arguments": call["input_arguments"],
+                        "data": [
+                            widget_data(data_source).model_dump(mode="json")
+                            for data_source in call["input_arguments"].get(
+                                "data_sources", []
+                            )
+                        ],
+                        "extra_state": call.get("extra_state") or {},
+                    },
+                ],
+            }
+    except Exception as exc:
+        metrics.error = f"{type(exc).__name__}: {exc}"
+    metrics.duration = time.perf_counter() - start
+    return metrics
+
+
+async def run_load_test(
+    app: ASGIApp,
+    corpus: Sequence[QueryRequest | dict[str, Any]],
+    concurrency: int = 10,
+    turns: int | None = None,
+    path: str = "/query",
+    headers: dict[str, str] | None = None,
+    widget_data: Callable[[dict[str, Any]], WidgetData] = default_widget_data,
+    max_round_trips: int = 5,
+) -> LoadTestReport:
+    """Load-test an agent's ASGI app in-process, without any network.
+
+    Requests from `corpus` are sent `concurrency` at a time, until `turns`
+    agent turns have run. `get_widget_data` calls are answered with canned data
+    from `widget_data` (see `run_turn`).
+
+    Parameters
+    ----------
+    app: ASGIApp
+        The agent's ASGI app, eg. a FastAPI app.
+    corpus: Sequence[QueryRequest | dict[str, Any]]
+        The requests to send. They are cycled through if `turns` is larger.
+    concurrency: int
+        The number of turns run concurrently.
+        Default is 10.
+    turns: int | None
+        The number of turns to run. If None, every request of the corpus is
+        sent once.
+        Default is None.
+    path: str
+        The path of the agent's query endpoint.
+        Default is "/query".
+    headers: dict[str, str] | None
+        Extra HTTP headers to send with every request.
+        Default is None.
+    widget_data: Callable[[dict[str, Any]], WidgetData]
+        Returns the widget data for a data source of a `get_widget_data` call.
+        Default is a small table for every data source.
+    max_round_trips: int
+        The maximum number of `get_widget_data` calls answered per turn.
+        Default is 5.
+
+    Examples
+    --------
+    >>> report = asyncio.run(run_load_test(app, corpus, concurrency=50))
+    >>> report.time_to_first_chunk.p90
+    0.012
+
+    Returns
+    -------
+    LoadTestReport
+        Latency percentiles, bytes per event type and throughput of the run.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+    if not corpus:
+        raise ValueError("corpus cannot be empty.")
+    total = len(corpus) if turns is None else turns
+    requests = itertools.islice(itertools.cycle(corpus), total)
+    results: list[TurnMetrics] = []
+
+    async def worker() -> None:
+        for request in requests:
+            results.append(
+                await run_turn(
+                    app, request, path, headers, widget_data, max_round_trips
+                )
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    duration = time.perf_counter() - start
+
+    bytes_by_event_type: dict[str, int] = {}
+    for result in results:
+        for event_type, size in result.bytes_by_event_type.items():
+            bytes_by_event_type[event_type] = (
+                bytes_by_event_type.get(event_type, 0) + size
+            )
+    total_bytes = sum(bytes_by_event_type.values())
+    return LoadTestReport(
+        turns=len(results),
+        concurrency=concurrency,
+        errors=sum(result.error is not None for result in results),
+        duration=duration,
+        time_to_first_event=Percentiles.of(
+            [
+                r.time_to_first_event
+                for r in results
+                if r.time_to_first_event is not None
+            ]
+        ),
+        time_to_first_chunk=Percentiles.of(
+            [
+                r.time_to_first_chunk
+                for r in results
+                if r.time_to_first_chunk is not None
+            ]
+        ),
+        chunk_inter_arrival=Percentiles.of(
+            [interval for r in results for interval in r.chunk_intervals]
+        ),
+        bytes_by_event_type=bytes_by_event_type,
+        total_bytes=total_bytes,
+        turns_per_second=len(results) / duration,
+        events_per_second=sum(r.events for r in results) / duration,
+        bytes_per_second=total_bytes / duration,
+        results=results,
+    )
@@ -0,0 +1,249 @@
+"""Memory accounting for `QueryRequest` payloads.
+
+Reports the retained size of a request by field path: messages by role and
+function, context items by widget, widgets by collection tier, tools, and the
+rest of the request's fields. Sizes are measured with `sys.getsizeof` over the
+object graph, counting objects shared between fields only once.
+"""
+
+import json
+import logging
+import os
+import sys
+from enum import Enum
+from typing import Any, Iterable
+
+from pydantic import BaseModel, Field
+
+from .models import QueryRequest
+from .spill import SpilledPayload
+
+logger = logging.getLogger(__name__)
+
+
+class SizeEntry(BaseModel):
+    path: str = Field(
+        description="The field path, eg. `messages[tool:get_widget_data]`, "
+        "`context[Price]` or `widgets.primary`."
+    )
+    count: int = Field(description="Number of items at the path.")
+    bytes: int = Field(description="Retained size of the items, in bytes.")
+
+
+class MemoryReport(BaseModel):
+    total: int = Field(description="Retained size of the request, in bytes.")
+    body_bytes: int | None = Field(
+        default=None, description="Size of the raw JSON body, if given."
+    )
+    entries: list[SizeEntry] = Field(
+        description="Retained size by field path, by decreasing size."
+    )
+
+    def top(self, n: int = 10) -> list[SizeEntry]:
+        """The `n` largest entries."""
+        return self.entries[:n]
+
+    def format(self, n: int = 10) -> str:
+        """A plain-text summary of the largest entries, eg. for logging."""
+        lines = [f"request retains {self.total / 1024:.1f} KiB"]
+        if self.body_bytes is not None:
+            lines[0] += f" (body: {self.body_bytes / 1024:.1f} KiB)"
+        for entry in self.top(n):
+            share = entry.bytes / self.total if self.total else 0.0
+            lines.append(
+                f"{entry.path:<48}{entry.count:>6}"
+                f"{entry.bytes / 1024:>12.1f} KiB{share:>7.1%}"
+            )
+        return "\n".join(lines)
+
+
+def _sizeof(obj: Any, seen: set[int]) -> int:
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if item is None or isinstance(item, bool | Enum) or id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, str | bytes | int | float):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, list | tuple | set | frozenset):
+            stack.extend(item)
+        elif isinstance(item, BaseModel):
+            stack.append(item.__dict__)
+            if item.__pydantic_extra__:
+                stack.append(item.__pydantic_extra__)
+            # Private attributes, eg. the decoded `SingleDataContent` content.
+            if item.__pydantic_private__:
+                stack.append(item.__pydantic_private__)
+        elif hasattr(item, "__dict__"):
+            stack.append(item.__dict__)
+    return size
+
+
+def _strings_length(obj: Any) -> int:
+    """The total length of the strings (keys included) and bytes of an object
+    graph, and the size of its spilled payloads, without reading them: a lower
+    bound of the size of its JSON, close to it for large requests."""
+    length = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str | bytes):
+            length += len(item)
+        elif isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, list | tuple):
+            stack.extend(item)
+        elif isinstance(item, BaseModel):
+            stack.append(item.__dict__)
+        elif isinstance(item, SpilledPayload):
+            length += item.size
+    return length
+
+
+def _get(obj: Any, key: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return getattr(obj, key, None)
+
+
+def _message_key(message: Any) -> str:
+    role = _get(message, "role")
+    role = role.value if isinstance(role, Enum) else str(role)
+    function = _get(message, "function")
+    return f"{role}:{function}" if function else role
+
+
+def _name_key(item: Any) -> str:
+    return str(_get(item, "name") or _get(item, "uuid"))
+
+
+def memory_report(
+    request: QueryRequest | dict[str, Any] | bytes | str,
+    body_bytes: int | None = None,
+) -> MemoryReport:
+    """Report the retained size of a request, by field path.
+
+    Parameters
+    ----------
+    request: QueryRequest | dict[str, Any] | bytes | str
+        The parsed request, or its raw JSON body. A raw body is measured as
+        decoded JSON (without validating it), which is smaller than, but
+        proportional to, the size of the parsed `QueryRequest`.
+    body_bytes: int | None
+        The size of the raw JSON body of a parsed request, if known, to report
+        along with it.
+        Default is None.
+
+    Examples
+    --------
+    >>> report = memory_report(await request.body())
+    >>> report.top(3)
+    [SizeEntry(path='context[Prices]', count=1, bytes=8412554), ...]
+
+    Returns
+    -------
+    MemoryReport
+        The total retained size, and the size of each field path.
+    """
+    if isinstance(request, bytes | str):
+        body_bytes = len(request)
+        request = json.loads(request)
+
+    seen: set[int] = set()
+    sizes: dict[str, list[int]] = {}
+
+    def account(path: str, items: Iterable[Any]) -> None:
+        entry = sizes.setdefault(path, [0, 0])
+        for item in items:
+            entry[0] += 1
+            entry[1] += _sizeof(item, seen)
+
+    grouped = {"messages", "context", "widgets", "tools"}
+    for message in _get(request, "messages") or []:
+        account(f"messages[{_message_key(message)}]", [message])
+    for item in _get(request, "context") or []:
+        account(f"context[{_name_key(item)}]", [item])
+    widgets = _get(request, "widgets")
+    if widgets is not None:
+        for tier in ("primary", "secondary", "extra"):
+            account(f"widgets.{tier}", _get(widgets, tier) or [])
+    for tool in _get(request, "tools") or []:
+        account(f"tools[{_name_key(tool)}]", [tool])
+
+    fields = request if isinstance(request, dict) else request.__dict__
+    for key, value in fields.items():
+        if key not in grouped and value is not None:
+            account(key, [value])
+
+    entries = [
+        SizeEntry(path=path, count=count, bytes=size)
+        for path, (count, size) in sizes.items()
+        if count
+    ]
+    entries.sort(key=lambda entry: entry.bytes, reverse=True)
+    # The rest: the request itself and its containers (eg. the messages list).
+    total = sum(entry.bytes for entry in entries) + _sizeof(request, seen)
+    return MemoryReport(total=total, body_bytes=body_bytes, entries=entries)
+
+
+def _threshold_from_env() -> int:
+    return int(os.environ.get("OPENBB_AI_MEMORY_REPORT_THRESHOLD", 50 * 1024**2))
+
+
+def log_memory_report(
+    request: QueryRequest | dict[str, Any] | bytes | str,
+    threshold: int | None = None,
+    n: int = 10,
+    body_bytes: int | None = None,
+) -> MemoryReport | None:
+    """Log a memory report of the request, if it is larger than `threshold`.
+
+    Requests are compared with `threshold` by the size of their JSON before
+    their object graph is measured: raw bodies smaller than `threshold` are
+    skipped without being decoded, and parsed requests by `body_bytes`, or
+    else by the total length of their strings (a lower bound of the size of
+    their JSON, which large requests are made of), without serializing them
+    or reading their spilled payloads, so this can be called on every request.
+
+    Parameters
+    ----------
+    request: QueryRequest | dict[str, Any] | bytes | str
+        The parsed request, or its raw JSON body.
+    threshold: int | None
+        The size of the JSON body above which the report is logged, in bytes.
+        If None, the `OPENBB_AI_MEMORY_REPORT_THRESHOLD` environment variable
+        is used, or 50 MiB.
+        Default is None.
+    n: int
+        The number of entries to log.
+        Default is 10.
+    body_bytes: int | None
+        The size of the raw JSON body of a parsed request, if known (eg. from
+        the `Content-Length` of the HTTP request).
+        Default is None.
+
+    Returns
+    -------
+    MemoryReport | None
+        The report, if it was logged.
+    """
+    if threshold is None:
+        threshold = _threshold_from_env()
+    if isinstance(request, bytes | str):
+        size = len(request)
+    elif body_bytes is not None:
+        size = body_bytes
+    else:
+        size = _strings_length(request)
+    if size < threshold:
+        return None
+    report = memory_report(request, body_bytes)
+    logger.warning("Large request:\n%s", report.format(n))
+    return report
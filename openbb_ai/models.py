@@ -1,20 +1,81 @@
+import binascii
 import json
+import re
 import uuid
 from enum import Enum
-from typing import Annotated, Any, AsyncGenerator, Callable, Literal
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    AsyncGenerator,
+    Callable,
+    ClassVar,
+    Iterator,
+    Literal,
+    TypeVar,
+)
 from uuid import UUID, uuid4
 
-import xxhash
 from pydantic import (
     BaseModel,
     Field,
     HttpUrl,
+    PrivateAttr,
+    SerializationInfo,
+    SerializerFunctionWrapHandler,
     ValidationError,
     computed_field,
     field_validator,
+    model_serializer,
     model_validator,
 )
 
+from .profiling import get_profile, profile_validation, profiled
+from .spill import (
+    PLACEHOLDER_PATTERN,
+    SPILL_CONTEXT,
+    Spillable,
+    SpilledPayload,
+    SpillStore,
+)
+
+if TYPE_CHECKING:
+    # Imported where they are used, as `openbb_ai.fingerprint` (and xxhash) is
+    # only needed to hash models, not to validate or encode them.
+    from .fingerprint import RequestFingerprint
+
+
+_ProfiledModelT = TypeVar("_ProfiledModelT", bound="ProfiledModel")
+
+
+class ProfiledModel(BaseModel):
+    """Base of the models whose validation is timed while profiling.
+
+    Only the `model_validate*` calls are timed, so that validation has no
+    hook when no profile is active: models validated as part of another one
+    (eg. the widgets of a `QueryRequest`) are timed as part of it. See
+    `openbb_ai.profiling`.
+    """
+
+    @classmethod
+    def model_validate(
+        cls: type[_ProfiledModelT], *args: Any, **kwargs: Any
+    ) -> _ProfiledModelT:
+        return profile_validation(cls, super().model_validate, *args, **kwargs)
+
+    @classmethod
+    def model_validate_json(
+        cls: type[_ProfiledModelT], *args: Any, **kwargs: Any
+    ) -> _ProfiledModelT:
+        return profile_validation(cls, super().model_validate_json, *args, **kwargs)
+
+    @classmethod
+    def model_validate_strings(
+        cls: type[_ProfiledModelT], *args: Any, **kwargs: Any
+    ) -> _ProfiledModelT:
+        return profile_validation(cls, super().model_validate_strings, *args, **kwargs)
+
+
 EXCLUDE_CITATION_DETAILS_FIELDS = [
     "lastupdated",
     "source",
@@ -46,14 +107,22 @@ EXCLUDE_STATUS_UPDATE_DETAILS_FIELDS = [
 
 
 class UserAPIKeys(BaseModel):
+    model_config = {"defer_build": True}
+
     openai_api_key: str | None = Field(
         default=None, description="Use a custom OpenAI API key for the request."
     )
 
 
 class Pdf(BaseModel):
+    model_config = {"defer_build": True}
+
     filename: str
-    content: bytes
+    content: Spillable[bytes]
+
+    def spill(self, store: SpillStore) -> None:
+        """Spill the content to `store`, if it is larger than its threshold."""
+        self.content = store.spill(self.content)
 
 
 class RoleEnum(str, Enum):
@@ -120,6 +189,8 @@ ArtifactTypes = Literal[
 
 
 class RawObjectDataFormat(BaseModel):
+    model_config = {"defer_build": True}
+
     data_type: Literal["object"] = "object"
     parse_as: ArtifactTypes = "table"
     chart_params: ChartParameters | None = None
@@ -145,28 +216,38 @@ class RawObjectDataFormat(BaseModel):
 
 
 class PdfDataFormat(BaseModel):
+    model_config = {"defer_build": True}
+
     data_type: Literal["pdf"]
     filename: str
 
 
 class ImageDataFormat(BaseModel):
+    model_config = {"defer_build": True}
+
     data_type: Literal["jpg", "jpeg", "png"]
     filename: str
 
 
 class SpreadsheetDataFormat(BaseModel):
+    model_config = {"defer_build": True}
+
     data_type: Literal["xlsx", "xls", "csv"]
     parse_as: Literal["text", "table"] = "table"
     filename: str
 
 
 class PlaintextDataFormat(BaseModel):
+    model_config = {"defer_build": True}
+
     data_type: Literal["txt", "md", "html"]
     parse_as: Literal["text"] = "text"
     filename: str
 
 
 class DocxDataFormat(BaseModel):
+    model_config = {"defer_build": True}
+
     data_type: Literal["docx"]
     filename: str
 
@@ -232,7 +313,7 @@ class CitationHighlightBoundingBox(BaseModel):
     bottom: float
 
 
-class Citation(BaseModel):
+class Citation(ProfiledModel):
     id: UUID = Field(
         default_factory=uuid4,
         description="A unique identifier for the citation.",
@@ -265,8 +346,29 @@ class Citation(BaseModel):
 
         return True
 
+    def fingerprint(self) -> str:
+        """A stable hash of the citation's content (ie. without its `id`).
+
+        See `openbb_ai.fingerprint` for how models are hashed.
+        """
+        from .fingerprint import model_digest
+
+        return model_digest(self).hex()
+
+    @model_serializer(mode="wrap")
+    def _drop_id_from_fingerprint(
+        self, handler: SerializerFunctionWrapHandler, info: SerializationInfo
+    ):
+        # The id is random by default, so it is left out of fingerprints,
+        # wherever the citation is (eg. in the `extra_citations` of data).
+        data = handler(self)
+        if info.context and info.context.get("fingerprint"):
+            data.pop("id", None)
+        return data
+
     @model_validator(mode="before")
     @classmethod
+    @profiled("validate", "Citation.exclude_fields")
     def exclude_fields(cls, values):
         # Exclude these fields from being in the "details" field.  (since this
         # pollutes the JSON output)
@@ -366,18 +468,22 @@ class WidgetParam(BaseModel):
 
 
 class WidgetParamOption(BaseModel):
+    model_config = {"defer_build": True}
+
     label: str
     value: str
 
 
 class WidgetParamOptions(BaseModel):
+    model_config = {"defer_build": True}
+
     widget_origin: str
     widget_id: str
     param_name: str
     options: list[WidgetParamOption] = Field(default_factory=list)
 
 
-class Widget(BaseModel):
+class Widget(ProfiledModel):
     uuid: UUID = Field(
         description="UUID of the widget. Used to identify widgets present on the dashboard. If an `extra` widget, this will be generated.",  # noqa: E501
         default_factory=uuid.uuid4,
@@ -412,6 +518,8 @@ class Widget(BaseModel):
     def _generate_uuid(origin: str, widget_id: str) -> UUID:
         """Generate a UUID for the widget based on its origin and widget_id."""
         seed = f"origin={origin}&widget_id={widget_id}"
+        import xxhash
+
         hash_value = xxhash.xxh64(seed.encode()).hexdigest()
         # Multiply by 2 because xxh64 returns
         # 64 bits -> 8 bytes -> 16 hexadecimal digits
@@ -419,6 +527,15 @@ class Widget(BaseModel):
         namespace = hash_value[:16] * 2
         return UUID(hex=namespace)
 
+    def fingerprint(self) -> str:
+        """A stable hash of the widget.
+
+        See `openbb_ai.fingerprint` for how models are hashed.
+        """
+        from .fingerprint import model_digest
+
+        return model_digest(self).hex()
+
     @computed_field  # type: ignore[misc]
     @property
     def split_param(self) -> WidgetParam | None:
@@ -480,6 +597,8 @@ class Widget(BaseModel):
 
 
 class WidgetCollection(BaseModel):
+    model_config = {"defer_build": True}
+
     primary: list[Widget] = Field(
         default_factory=list, description="Explicitly-added widgets with top priority."
     )
@@ -493,11 +612,18 @@ class WidgetCollection(BaseModel):
 
 
 class LlmClientFunctionCall(BaseModel):
+    model_config = {"defer_build": True}
+
     function: str
     input_arguments: dict[str, Any]
 
 
+_JSON_OBJECT_OR_STRING = re.compile(r'\s*[{"]')
+
+
 class LlmClientMessage(BaseModel):
+    model_config = {"defer_build": True}
+
     role: RoleEnum = Field(
         description="The role of the entity that is creating the message"
     )
@@ -514,7 +640,9 @@ class LlmClientMessage(BaseModel):
 
     @field_validator("content", mode="before", check_fields=False)
     def parse_content(cls, v):
-        if isinstance(v, str):
+        # Only JSON objects (or strings, when double encoded) can be function
+        # calls: plain text messages skip decoding altogether.
+        if isinstance(v, str) and _JSON_OBJECT_OR_STRING.match(v):
             try:
                 parsed_content = json.loads(v)
                 if isinstance(parsed_content, str):
@@ -528,6 +656,8 @@ class LlmClientMessage(BaseModel):
 
 
 class SingleFileReference(BaseModel):
+    model_config = {"defer_build": True}
+
     url: HttpUrl = Field(
         description="The file reference to the data file. A URL to a file."  # noqa: E501
     )
@@ -541,6 +671,8 @@ class SingleFileReference(BaseModel):
 
 
 class DataFileReferences(BaseModel):
+    model_config = {"defer_build": True}
+
     items: list[SingleFileReference] = Field(description="A list of file references.")
     extra_citations: list[Citation] = Field(
         default_factory=list,
@@ -548,8 +680,26 @@ class DataFileReferences(BaseModel):
     )
 
 
+def _decode_content(content: str | bytes | SpilledPayload, data_type: str) -> Any:
+    """Decode data content: JSON objects, or base64 files into bytes."""
+    if isinstance(content, SpilledPayload):
+        if data_type == "object":
+            return _decode_content(content.read(), data_type)
+        # Decoded straight from the memory mapped file.
+        with content.buffer() as buffer:
+            return binascii.a2b_base64(buffer)
+    if data_type == "object":
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            return content if isinstance(content, str) else content.decode()
+    return binascii.a2b_base64(content)
+
+
 class SingleDataContent(BaseModel):
-    content: str = Field(
+    model_config = {"defer_build": True}
+
+    content: Spillable[str] = Field(
         description="The data content, either as a raw string, JSON string, or as a base64 encoded string."  # noqa: E501
     )
     data_format: DataFormat = Field(
@@ -561,22 +711,93 @@ class SingleDataContent(BaseModel):
         description="Whether to cite derivatives of the data source.",
     )
 
+    # The decoded content, with the content string it was decoded from, so
+    # that it is decoded again if `content` is replaced.
+    _decoded: tuple[str | SpilledPayload, Any] | None = PrivateAttr(default=None)
+
+    def decoded(self) -> Any:
+        """The decoded content, decoded on first access and then cached.
+
+        Objects (`data_type="object"`) are decoded from JSON (or returned as
+        is, if the content isn't JSON). Files (eg. PDFs, images, spreadsheets)
+        are decoded from base64 into bytes, without intermediate strings.
+        Call `release` to drop the decoded copy once it is no longer needed.
+        """
+        cached = self._decoded
+        if cached is not None and cached[0] is self.content:
+            return cached[1]
+        value = _decode_content(self.content, self.data_format.data_type)
+        self._decoded = (self.content, value)
+        return value
+
+    def buffer(self) -> memoryview:
+        """The decoded content of a file, as a read-only buffer.
+
+        Slices of the buffer don't copy the data.
+        """
+        value = self.decoded()
+        if not isinstance(value, bytes):
+            raise ValueError(
+                f"Content of data type '{self.data_format.data_type}' is not binary."
+            )
+        return memoryview(value)
+
+    def release(self) -> None:
+        """Drop the cached decoded content."""
+        self._decoded = None
+
+    def spill(self, store: SpillStore) -> None:
+        """Spill the content to `store`, if it is larger than its threshold.
+
+        The cached decoded content is dropped along with it.
+        """
+        content = store.spill(self.content)
+        if content is not self.content:
+            self.content = content
+            self._decoded = None
+
+    def __eq__(self, other: object) -> bool:
+        # The decoded content is a cache, not part of the item's value.
+        if not isinstance(other, BaseModel):
+            return NotImplemented
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
 
 class DataContent(BaseModel):
+    model_config = {"defer_build": True}
+
     items: list[SingleDataContent] = Field(description="A list of data content items.")
     extra_citations: list[Citation] = Field(
         default_factory=list,
         description="The citations for the data content.",
     )
 
+    def decoded(self) -> list[Any]:
+        """The decoded content of every item. See `SingleDataContent.decoded`."""
+        return [item.decoded() for item in self.items]
+
+    def release(self) -> None:
+        """Drop the cached decoded content of every item."""
+        for item in self.items:
+            item.release()
+
+    def spill(self, store: SpillStore) -> None:
+        """Spill the content of the items larger than the threshold of `store`."""
+        for item in self.items:
+            item.spill(store)
+
 
 class ClientFunctionCallError(BaseModel):
+    model_config = {"defer_build": True}
+
     # TODO: Turn the error_type into an enum when we have more types of errors
     error_type: str = Field(description="The type of error that occurred.")
     content: str = Field(description="The error message of the function call.")
 
 
 class ClientCommandResult(BaseModel):
+    model_config = {"defer_build": True}
+
     status: Literal["success", "error", "warning"]
     message: str | None = None
     data: dict[str, Any] | None = None
@@ -585,6 +806,8 @@ class ClientCommandResult(BaseModel):
 class LlmClientFunctionCallResultMessage(BaseModel):
     """Contains the result of a function call made against a client."""
 
+    model_config = {"defer_build": True}
+
     role: RoleEnum = RoleEnum.tool
     function: str = Field(description="The name of the called function.")
     input_arguments: dict[str, Any] = Field(
@@ -600,8 +823,34 @@ class LlmClientFunctionCallResultMessage(BaseModel):
         description="Extra state to be passed between the client and this service.",
     )
 
+    def decoded(self) -> list[Any]:
+        """The results of the function call, with data content decoded.
+
+        Each `DataContent` result is replaced by the decoded content of its
+        items (see `SingleDataContent.decoded`), and other results are returned
+        as they are. Content is decoded on first access, and then cached.
+        """
+        return [
+            result.decoded() if isinstance(result, DataContent) else result
+            for result in self.data
+        ]
+
+    def release(self) -> None:
+        """Drop the cached decoded content of every result."""
+        for result in self.data:
+            if isinstance(result, DataContent):
+                result.release()
+
+    def spill(self, store: SpillStore) -> None:
+        """Spill the data content larger than the threshold of `store`."""
+        for result in self.data:
+            if isinstance(result, DataContent):
+                result.spill(store)
+
+
+class RawContext(ProfiledModel):
+    model_config = {"defer_build": True}
 
-class RawContext(BaseModel):
     uuid: UUID = Field(description="The UUID of the widget.")
     name: str = Field(description="The name of the widget.")
     description: str = Field(
@@ -613,11 +862,22 @@ class RawContext(BaseModel):
         description="Additional widget metadata (eg. the selected ticker, etc)",
     )
 
+    def fingerprint(self) -> str:
+        """A stable hash of the context item.
+
+        See `openbb_ai.fingerprint` for how models are hashed.
+        """
+        from .fingerprint import model_digest
+
+        return model_digest(self).hex()
+
 
 LlmMessage = LlmClientFunctionCallResultMessage | LlmClientMessage
 
 
 class DataSourceRequestPayload(BaseModel):
+    model_config = {"defer_build": True}
+
     widget_uuid: str
     origin: str
     id: str
@@ -629,6 +889,8 @@ class DataSourceRequestPayload(BaseModel):
 
 
 class DataSourceParamOptionsRequestPayload(BaseModel):
+    model_config = {"defer_build": True}
+
     origin: str = Field(description="The origin of the data source.")
     id: str = Field(description="The widget id of the data source.")
     param: str = Field(description="The parameter to get options for.")
@@ -638,6 +900,8 @@ class DataSourceParamOptionsRequestPayload(BaseModel):
 
 
 class WidgetInfo(BaseModel):
+    model_config = {"defer_build": True}
+
     widget_uuid: str = Field(
         description="The ID of the widget. Used to identify the widget in the workspace."  # noqa: E501
     )
@@ -647,6 +911,8 @@ class WidgetInfo(BaseModel):
 
 
 class TabInfo(BaseModel):
+    model_config = {"defer_build": True}
+
     tab_id: str = Field(
         default="__no_tab__",
         description="The ID of the tab. Used to identify the tab in the workspace.",
@@ -658,6 +924,8 @@ class TabInfo(BaseModel):
 
 
 class DashboardInfo(BaseModel):
+    model_config = {"defer_build": True}
+
     id: str = Field(
         description="The ID of the dashboard. Used to identify the dashboard in the workspace."  # noqa: E501
     )
@@ -674,11 +942,15 @@ class DashboardInfo(BaseModel):
 
 
 class AgentFeatureSelectOption(BaseModel):
+    model_config = {"defer_build": True}
+
     label: str
     value: str
 
 
 class AgentFeatureOption(BaseModel):
+    model_config = {"defer_build": True}
+
     label: str
     type: Literal["toggle", "text", "select"] | None = None
     default: bool | str | None = None
@@ -691,6 +963,8 @@ AgentFeature = bool | AgentFeatureOption
 
 
 class WorkspaceAgent(BaseModel):
+    model_config = {"defer_build": True}
+
     holder_url: str | None = Field(
         default=None,
         description=(
@@ -713,6 +987,8 @@ class WorkspaceAgent(BaseModel):
 
 
 class WorkspaceState(BaseModel):
+    model_config = {"defer_build": True}
+
     action_history: list[str] | None = Field(
         default=None,
         description="A list of actions taken in the workspace. Used to track the history of actions in the workspace.",  # noqa: E501
@@ -736,6 +1012,8 @@ class WorkspaceState(BaseModel):
 class AgentTool(BaseModel):
     """Tool that can be executed by an agent."""
 
+    model_config = {"defer_build": True}
+
     server_id: str | None = Field(
         None,
         description="The ID of the server to execute the tool on",
@@ -760,7 +1038,12 @@ class AgentTool(BaseModel):
     )
 
 
-class QueryRequest(BaseModel):
+class QueryRequest(ProfiledModel):
+    # Like the other models that are only used to parse requests, the schema
+    # is built on first use rather than at import time, to keep cold starts
+    # fast.
+    model_config = {"defer_build": True}
+
     messages: list[LlmClientFunctionCallResultMessage | LlmClientMessage] = Field(
         description="A list of messages to submit to the copilot."
     )
@@ -800,6 +1083,55 @@ class QueryRequest(BaseModel):
         description="Tools that can be used to execute the request.",
     )
 
+    def fingerprint(self) -> "RequestFingerprint":
+        """A stable hash of the request, and of its parts.
+
+        Messages are hashed as a chain, so the fingerprint of a turn extends
+        the fingerprints of the previous turns of the conversation (see
+        `RequestFingerprint.shared_prefix`). The hashes of messages and context
+        items are memoized, so messages reused across turns (eg. with
+        `openbb_ai.cache.ValidationCache`) are only hashed once, and must not be
+        mutated after being fingerprinted. See `openbb_ai.fingerprint` for how
+        models are hashed.
+
+        Examples
+        --------
+        >>> previous = previous_request.fingerprint()
+        >>> current = request.fingerprint()
+        >>> current.extends(previous)
+        True
+        >>> current.shared_prefix(previous)
+        12
+        """
+        from .fingerprint import request_fingerprint
+
+        widgets = self.widgets or WidgetCollection()
+        return request_fingerprint(
+            messages=self.messages,
+            context=self.context or [],
+            widgets={
+                "primary": widgets.primary,
+                "secondary": widgets.secondary,
+                "extra": widgets.extra,
+            },
+            tools=self.tools or [],
+            other=self,
+            exclude={"messages", "context", "widgets", "tools"},
+        )
+
+    def spill(self, store: SpillStore) -> None:
+        """Spill the data content larger than the threshold of `store`.
+
+        The data content of function call results and of context items is
+        moved to temporary files, which are deleted when the store is closed.
+        See `openbb_ai.spill`.
+        """
+        for message in self.messages:
+            if isinstance(message, LlmClientFunctionCallResultMessage):
+                message.spill(store)
+        for context in self.context or []:
+            context.data.spill(store)
+
     @field_validator("messages", mode="before", check_fields=False)
     def check_messages_not_empty(cls, value):
         if not value:
@@ -831,14 +1163,14 @@ class FunctionCallResponse(BaseModel):
     )
 
 
-class ClientArtifact(BaseModel):
+class ClientArtifact(ProfiledModel):
     """A piece of output data that is returned to the client."""
 
     type: ArtifactTypes
     name: str
     description: str
     uuid: UUID = Field(default_factory=uuid.uuid4)
-    content: str | list[dict]
+    content: Spillable[str | list[dict]]
     chart_params: ChartParameters | None = None
     query_data_source: dict[str, Any] | None = None
 
@@ -861,16 +1193,128 @@ class ClientArtifact(BaseModel):
                 )
         return self
 
+    def spill(self, store: SpillStore) -> None:
+        """Spill the content to `store`, if it is larger than its threshold.
+
+        Spilled content is streamed from its file when the artifact's SSE is
+        encoded with `BaseSSE.encode_chunks`.
+        """
+        self.content = store.spill(self.content)
+
+
+def _sse_event_header(event: str) -> bytes:
+    return f"event: {event}\r\n".encode()
+
+
+_SSE_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+
+def _sse_data_lines(payload: str) -> bytes:
+    # JSON payloads never contain raw line breaks, so the common case is a
+    # single `data:` line.  Anything else must be split into one `data:` line
+    # per line, otherwise the client would treat the break as a new field.
+    if "\n" not in payload and "\r" not in payload:
+        return b"data: " + payload.encode() + b"\r\n"
+    # Only the line breaks of SSEs: `str.splitlines` also splits on other
+    # characters (eg. "\u2028"), which would not survive the round trip.
+    return b"".join(
+        b"data: " + line.encode() + b"\r\n" for line in _SSE_LINE_BREAK.split(payload)
+    )
+
 
 class BaseSSE(BaseModel):
     event: Any
     data: Any
+    id: int | None = Field(
+        default=None,
+        description="Optional, monotonically increasing ID of the event within its stream. Used by clients to resume a stream with `Last-Event-ID`.",  # noqa: E501
+    )
+
+    # Pre-encoded `event:` line, computed once per subclass from the default
+    # of its `event` field.
+    _sse_header: ClassVar[bytes | None] = None
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        event = cls.model_fields["event"].default
+        cls._sse_header = _sse_event_header(event) if isinstance(event, str) else None
 
     def model_dump(self, *args, **kwargs) -> dict:
-        return {
+        profile = get_profile()
+        if profile is not None:
+            with profile.timed("encode", type(self).__name__):
+                return self._model_dump()
+        return self._model_dump()
+
+    def _model_dump(self) -> dict:
+        dumped = {
             "event": self.event,
             "data": self.data.model_dump_json(exclude_none=True),
         }
+        if self.id is not None:
+            dumped["id"] = str(self.id)
+        return dumped
+
+    def encode(self) -> bytes:
+        """Encode the event as ready-to-send Server-Sent Event wire bytes.
+
+        The output is a complete SSE message (terminated by a blank line) that
+        can be written directly to the transport, without going through an
+        intermediate `dict` or a third-party SSE library.
+        """
+        profile = get_profile()
+        if profile is not None:
+            with profile.timed("encode", type(self).__name__):
+                return self._encode()
+        return self._encode()
+
+    def _header(self) -> bytes:
+        header = self._sse_header
+        if header is None or self.event != type(self).model_fields["event"].default:
+            header = _sse_event_header(self.event)
+        if self.id is not None:
+            header = f"id: {self.id}\r\n".encode() + header
+        return header
+
+    def _encode(self) -> bytes:
+        return (
+            self._header()
+            + _sse_data_lines(self.data.model_dump_json(exclude_none=True))
+            + b"\r\n"
+        )
+
+    def has_spilled_payloads(self) -> bool:
+        """Whether the event holds payloads spilled by a `SpillStore`.
+
+        Such events are encoded with `encode_chunks`, so that their payloads
+        are streamed from their files.
+        """
+        return False
+
+    def encode_chunks(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """Encode the event like `encode`, in chunks.
+
+        Spilled payloads (see `openbb_ai.spill`) are streamed from their files,
+        in chunks of `chunk_size` bytes, rather than read back into memory.
+        Events without spilled payloads are encoded in a single chunk.
+        """
+        payloads: list[SpilledPayload] = []
+        data = self.data.model_dump_json(
+            exclude_none=True, context={SPILL_CONTEXT: payloads}
+        )
+        if not payloads:
+            yield self._header() + _sse_data_lines(data) + b"\r\n"
+            return
+        # Serialized payloads never contain raw line breaks either: the data is
+        # a single `data:` line.
+        yield self._header() + b"data: "
+        for i, part in enumerate(PLACEHOLDER_PATTERN.split(data)):
+            if i % 2:
+                yield from payloads[int(part)].iter_json(chunk_size)
+            elif part:
+                yield part.encode()
+        yield b"\r\n\r\n"
 
 
 class MessageChunkSSEData(BaseModel):
@@ -895,6 +1339,9 @@ class MessageArtifactSSE(BaseSSE):
     event: Literal["copilotMessageArtifact"] = "copilotMessageArtifact"
     data: ClientArtifact
 
+    def has_spilled_payloads(self) -> bool:
+        return isinstance(self.data.content, SpilledPayload)
+
 
 class FunctionCallSSEData(BaseModel):
     function: Literal[
@@ -943,6 +1390,7 @@ class StatusUpdateSSEData(BaseModel):
 
     @model_validator(mode="before")
     @classmethod
+    @profiled("validate", "StatusUpdateSSEData.exclude_fields")
     def exclude_fields(cls, values):
         # Exclude these fields from being in the "details" field.
         # (since this pollutes the JSON output)
@@ -961,6 +1409,12 @@ class StatusUpdateSSE(BaseSSE):
     event: Literal["copilotStatusUpdate"] = "copilotStatusUpdate"
     data: StatusUpdateSSEData
 
+    def has_spilled_payloads(self) -> bool:
+        return any(
+            isinstance(artifact.content, SpilledPayload)
+            for artifact in self.data.artifacts or []
+        )
+
 
 SSE = (
     MessageChunkSSE
@@ -0,0 +1,266 @@
+"""Validate requests and decode data content in a process pool.
+
+Validating a request with many multi-MB context items or function call
+results, and decoding their data, can block the event loop for hundreds of
+milliseconds, stalling every other stream of the worker. `OffloadPool` moves
+that work to a process pool.
+
+Large buffers never go through the pool's pipe: the raw body (or content) is
+copied into shared memory, and the worker writes its result (the pickled
+request or decoded data) into shared memory too, so that only their names
+are pickled. Work on inputs smaller than the pool's threshold stays in the
+calling process, where it is cheaper than the round trip.
+"""
+
+import asyncio
+import pickle
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Iterator
+
+from .models import (
+    DataContent,
+    LlmClientFunctionCallResultMessage,
+    QueryRequest,
+    SingleDataContent,
+    _decode_content,
+)
+from .spill import SpilledPayload
+
+# A buffer in shared memory: its name and size.
+_Shared = tuple[str, int]
+
+
+def _buffer(shm: SharedMemory) -> memoryview:
+    assert shm.buf is not None
+    return shm.buf
+
+
+def _share(data: bytes | memoryview) -> SharedMemory:
+    shm = SharedMemory(create=True, size=max(len(data), 1))
+    _buffer(shm)[: len(data)] = data
+    return shm
+
+
+def _share_result(data: bytes) -> _Shared:
+    shm = _share(data)
+    shm.close()
+    return shm.name, len(data)
+
+
+def _read(shared: _Shared, load: Callable[[memoryview], Any] = bytes) -> Any:
+    """Load a shared buffer, with `load`, without copying it first."""
+    name, size = shared
+    shm = SharedMemory(name=name)
+    try:
+        with _buffer(shm)[:size] as buffer:
+            return load(buffer)
+    finally:
+        shm.close()
+
+
+def _unlink(shared: _Shared) -> None:
+    shm = SharedMemory(name=shared[0])
+    shm.close()
+    shm.unlink()
+
+
+def _validate_request(body: _Shared, decode_threshold: int | None) -> _Shared:
+    request = QueryRequest.model_validate_json(_read(body))
+    if decode_threshold is not None:
+        for item in _items(request):
+            if _size(item) >= decode_threshold:
+                item.decoded()
+    # The decoded content of items is pickled along with them.
+    return _share_result(pickle.dumps(request, protocol=5))
+
+
+def _decode(content: _Shared, data_type: str) -> _Shared:
+    value = _decode_content(_read(content), data_type)
+    if data_type == "object":
+        return _share_result(pickle.dumps(value, protocol=5))
+    return _share_result(value)
+
+
+def _size(item: SingleDataContent) -> int:
+    content = item.content
+    return content.size if isinstance(content, SpilledPayload) else len(content)
+
+
+def _items(
+    data: QueryRequest
+    | LlmClientFunctionCallResultMessage
+    | DataContent
+    | SingleDataContent,
+) -> Iterator[SingleDataContent]:
+    if isinstance(data, SingleDataContent):
+        yield data
+    elif isinstance(data, DataContent):
+        yield from data.items
+    elif isinstance(data, LlmClientFunctionCallResultMessage):
+        for result in data.data:
+            if isinstance(result, DataContent):
+                yield from result.items
+    else:
+        for message in data.messages:
+            if isinstance(message, LlmClientFunctionCallResultMessage):
+                yield from _items(message)
+        for context in data.context or []:
+            yield from context.data.items
+
+
+class OffloadPool:
+    """Validate large requests and decode large data content in a process pool.
+
+    Parameters
+    ----------
+    max_workers: int | None
+        The number of worker processes. If None, one per CPU.
+        Default is None.
+    threshold: int
+        The size, in bytes, of the smallest body or content that is handled in
+        the pool. Smaller ones are handled in the calling process.
+        Default is 1 MiB.
+    mp_context: BaseContext | None
+        The multiprocessing context used to start the workers.
+        Default is None.
+
+    Examples
+    --------
+    >>> pool = OffloadPool()
+    >>> @app.post("/query")
+    ... async def query(request: Request):
+    ...     query_request = await pool.validate_request(await request.body())
+    ...     await pool.decode(query_request)
+    ...     return SSEResponse(agent(query_request))
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        threshold: int = 1024**2,
+        mp_context: BaseContext | None = None,
+    ):
+        self.max_workers = max_workers
+        self.threshold = threshold
+        self.mp_context = mp_context
+        self._executor: Executor | None = None
+
+    def __enter__(self) -> "OffloadPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    @property
+    def executor(self) -> Executor:
+        """The process pool, started on first use."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=self.mp_context
+            )
+        return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    async def _run(
+        self,
+        data: bytes | memoryview,
+        load: Callable[[memoryview], Any],
+        function,
+        *args,
+    ) -> Any:
+        """Run `function` on `data` in the pool, and load its result."""
+        shm = _share(data)
+        try:
+            future = self.executor.submit(function, (shm.name, len(data)), *args)
+            try:
+                shared = await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                # Free the result once the worker is done with it.
+                future.add_done_callback(_discard_result)
+                raise
+            try:
+                return _read(shared, load)
+            finally:
+                _unlink(shared)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    async def validate_request(
+        self, body: bytes | str, decode: bool = False
+    ) -> QueryRequest:
+        """Validate a raw request body, in the pool if it is large.
+
+        Parameters
+        ----------
+        body: bytes | str
+            The raw JSON body of the request.
+        decode: bool
+            Whether to also decode the data content items of the request that
+            are larger than the threshold (see `SingleDataContent.decoded`).
+            Default is False.
+
+        Returns
+        -------
+        QueryRequest
+            The validated request.
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        if len(body) < self.threshold:
+            return QueryRequest.model_validate_json(body)
+        return await self._run(
+            body, _loads, _validate_request, self.threshold if decode else None
+        )
+
+    async def decode(
+        self,
+        data: QueryRequest
+        | LlmClientFunctionCallResultMessage
+        | DataContent
+        | SingleDataContent,
+    ) -> None:
+        """Decode every data content item of `data`, large ones in the pool.
+
+        The decoded content is cached on the items, as if
+        `SingleDataContent.decoded` had been called on them. Items that are
+        already decoded are skipped.
+        """
+        tasks = []
+        for item in _items(data):
+            if item._decoded is not None and item._decoded[0] is item.content:
+                continue
+            if _size(item) < self.threshold:
+                item.decoded()
+            else:
+                tasks.append(self._decode(item))
+        await asyncio.gather(*tasks)
+
+    async def _decode(self, item: SingleDataContent) -> None:
+        content = item.content
+        data_type = item.data_format.data_type
+        load = _loads if data_type == "object" else bytes
+        if isinstance(content, SpilledPayload):
+            # Copied into shared memory straight from the memory mapped file.
+            with content.buffer() as buffer:
+                value = await self._run(buffer, load, _decode, data_type)
+        else:
+            value = await self._run(content.encode(), load, _decode, data_type)
+        item._decoded = (content, value)
+
+
+def _loads(buffer: memoryview) -> Any:
+    # Results are pickled by our own workers.
+    return pickle.loads(buffer)  # noqa: S301
+
+
+def _discard_result(future: Future) -> None:
+    if not future.cancelled() and future.exception() is None:
+        _unlink(future.result())
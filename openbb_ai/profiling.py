@@ -0,0 +1,237 @@
+"""Opt-in profiling of the time spent validating, encoding and building events.
+
+The hooks in `openbb_ai.models` and `openbb_ai.helpers` only record anything
+while a profile is active, either for a block of code (eg. a request) with
+`profile`, or for the whole process with the `OPENBB_AI_PROFILE=1`
+environment variable. Otherwise they cost a single context variable lookup.
+"""
+
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Literal, TypeVar
+
+from pydantic import BaseModel, Field
+
+F = TypeVar("F", bound=Callable[..., Any])
+T = TypeVar("T")
+
+Phase = Literal["validate", "encode", "helper"]
+
+
+class _Timing:
+    __slots__ = ("count", "cumulative", "own")
+
+    def __init__(self):
+        self.count = 0
+        self.cumulative = 0.0
+        self.own = 0.0
+
+
+class ProfileEntry(BaseModel):
+    phase: str = Field(
+        description="What was timed: model validation (`validate`), event "
+        "encoding (`encode`) or a helper building an event (`helper`)."
+    )
+    name: str = Field(description="The model class, validator or helper timed.")
+    count: int = Field(description="Number of calls.")
+    cumulative: float = Field(
+        description="Total seconds, including the other entries called inside it "
+        "(eg. the validation of the widgets of a `QueryRequest`)."
+    )
+    own: float = Field(
+        description="Total seconds, excluding the other entries called inside it."
+    )
+
+
+class ProfileReport(BaseModel):
+    duration: float = Field(description="Seconds the profile was active.")
+    profiled: float = Field(
+        description="Seconds spent in the profiled SDK code (ie. the sum of the "
+        "`own` time of every entry)."
+    )
+    other: float = Field(
+        description="Seconds spent elsewhere, eg. in the agent's own code."
+    )
+    entries: list[ProfileEntry] = Field(
+        description="Timings by phase and name, by decreasing cumulative time."
+    )
+
+    def top(
+        self,
+        phase: Phase | None = None,
+        n: int = 10,
+        by: Literal["cumulative", "own", "count"] = "cumulative",
+    ) -> list[ProfileEntry]:
+        """The `n` entries (of `phase`, if given) with the most time or calls."""
+        entries = [e for e in self.entries if phase is None or e.phase == phase]
+        return sorted(entries, key=lambda e: getattr(e, by), reverse=True)[:n]
+
+    def format(self, n: int = 10) -> str:
+        """A plain-text summary of the top entries, eg. for logging."""
+        lines = [
+            f"profiled {self.profiled * 1000:.2f} ms of {self.duration * 1000:.2f} ms"
+            f" ({self.other * 1000:.2f} ms elsewhere)",
+            f"{'phase':<9}{'name':<48}{'calls':>8}{'cum ms':>10}{'own ms':>10}",
+        ]
+        for entry in self.top(n=n):
+            lines.append(
+                f"{entry.phase:<9}{entry.name:<48}{entry.count:>8}"
+                f"{entry.cumulative * 1000:>10.2f}{entry.own * 1000:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+# Timed sections never span an `await`, so a per-thread stack is enough to
+# attribute nested time, even if a profile is shared by concurrent tasks.
+_local = threading.local()
+
+
+class Profile:
+    """Timings collected while a profile is active."""
+
+    def __init__(self):
+        self.timings: dict[tuple[str, str], _Timing] = {}
+        self.start = time.perf_counter()
+        self.end: float | None = None
+
+    def record(self, phase: str, name: str, cumulative: float, own: float) -> None:
+        timing = self.timings.get((phase, name))
+        if timing is None:
+            timing = self.timings[(phase, name)] = _Timing()
+        timing.count += 1
+        timing.cumulative += cumulative
+        timing.own += own
+
+    @contextmanager
+    def timed(self, phase: str, name: str) -> Iterator[None]:
+        """Time a block of code, excluding nested timed blocks from its own time."""
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.record(phase, name, elapsed, elapsed - nested)
+
+    def reset(self) -> None:
+        self.timings.clear()
+        self.start = time.perf_counter()
+        self.end = None
+
+    def report(self) -> ProfileReport:
+        duration = (self.end or time.perf_counter()) - self.start
+        entries = [
+            ProfileEntry(
+                phase=phase,
+                name=name,
+                count=timing.count,
+                cumulative=timing.cumulative,
+                own=timing.own,
+            )
+            for (phase, name), timing in list(self.timings.items())
+        ]
+        entries.sort(key=lambda e: e.cumulative, reverse=True)
+        profiled = sum(entry.own for entry in entries)
+        return ProfileReport(
+            duration=duration,
+            profiled=profiled,
+            other=max(duration - profiled, 0.0),
+            entries=entries,
+        )
+
+
+def _process_profile_from_env() -> Profile | None:
+    if os.environ.get("OPENBB_AI_PROFILE", "").lower() not in ("1", "true"):
+        return None
+    return Profile()
+
+
+_PROCESS_PROFILE = _process_profile_from_env()
+_PROFILE: ContextVar[Profile | None] = ContextVar(
+    "openbb_ai_profile", default=_PROCESS_PROFILE
+)
+
+
+def get_profile() -> Profile | None:
+    """The active profile, if any."""
+    return _PROFILE.get()
+
+
+def process_profile() -> Profile | None:
+    """The process-wide profile, if enabled with `OPENBB_AI_PROFILE=1`."""
+    return _PROCESS_PROFILE
+
+
+@contextmanager
+def profile(sample_rate: float = 1.0) -> Iterator[Profile | None]:
+    """Profile the validation, encoding and helpers run inside the block.
+
+    Parameters
+    ----------
+    sample_rate: float
+        The probability of profiling the block, eg. to profile a sample of
+        production requests. If the block isn't sampled, None is yielded and
+        nothing is recorded.
+        Default is 1.0.
+
+    Examples
+    --------
+    >>> @app.post("/query")
+    ... async def query(request: Request):
+    ...     with profile(sample_rate=0.01) as p:
+    ...         body = QueryRequest.model_validate_json(await request.body())
+    ...         events = [event.encode() async for event in agent(body)]
+    ...     if p is not None:
+    ...         logger.info(p.report().format())
+    """
+    if sample_rate < 1.0 and random.random() >= sample_rate:  # noqa: S311
+        yield None
+        return
+    active = Profile()
+    token = _PROFILE.set(active)
+    try:
+        yield active
+    finally:
+        active.end = time.perf_counter()
+        _PROFILE.reset(token)
+
+
+def profiled(phase: Phase, name: str | None = None) -> Callable[[F], F]:
+    """Decorate a function to time it while a profile is active."""
+
+    def decorator(func: F) -> F:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            active = _PROFILE.get()
+            if active is None:
+                return func(*args, **kwargs)
+            with active.timed(phase, label):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def profile_validation(
+    cls: type, validate: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """Call `validate`, timed as the validation of `cls` while profiling."""
+    active = _PROFILE.get()
+    if active is None:
+        return validate(*args, **kwargs)
+    with active.timed("validate", cls.__name__):
+        return validate(*args, **kwargs)
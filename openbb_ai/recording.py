@@ -0,0 +1,292 @@
+"""Record agent event streams to a compact binary log, and replay them.
+
+The log is append-only, so that a stream can be recorded as it is produced:
+
+- A header: the magic bytes `OBBREC` and the format version (`<6sH`).
+- The request: its length and its zlib-compressed JSON (`<I`, then bytes).
+- One record per event: a tag, the length of the payload and the time of the
+  event in seconds since the start of the recording (`<cId`), then the
+  encoded SSE. The tag is `E` for a raw payload, or `Z` for a zlib-compressed
+  one (used for large events, eg. artifacts).
+- When the recording is closed, an index record (tag `X`) with the offset of
+  every event record (`<Q` each), and a trailer with the offset of the index
+  and the magic bytes (`<Q6s`).
+
+A log without an index (eg. if the process died while recording) can still
+be read: the reader then scans the records to rebuild the index.
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import AsyncGenerator, AsyncIterable, Iterator, NamedTuple
+
+from .models import BaseSSE, QueryRequest
+from .responses import encode_event, event_type_of
+from .testing import CopilotResponse
+
+MAGIC = b"OBBREC"
+VERSION = 1
+
+_HEADER = struct.Struct("<6sH")
+_LENGTH = struct.Struct("<I")
+_RECORD = struct.Struct("<cId")
+_TRAILER = struct.Struct("<Q6s")
+
+_TAG_EVENT = b"E"
+_TAG_COMPRESSED_EVENT = b"Z"
+_TAG_INDEX = b"X"
+
+# Smaller events (eg. message chunks) don't compress well on their own.
+_COMPRESS_MIN_SIZE = 1024
+
+
+class RecordedEvent(NamedTuple):
+    time: float
+    data: bytes
+
+    @property
+    def event_type(self) -> str:
+        return event_type_of(self.data)
+
+
+def _request_json(request: QueryRequest | dict | bytes | None) -> bytes:
+    if request is None:
+        return b""
+    if isinstance(request, QueryRequest):
+        return request.model_dump_json(exclude_none=True).encode()
+    if isinstance(request, dict):
+        return json.dumps(request).encode()
+    return request
+
+
+class StreamRecorder:
+    """Write an agent's request and events to a recording file.
+
+    Prefer `record`, which wraps an event generator. If used directly, the
+    recorder must be closed (or used as a context manager) to write the index.
+
+    Parameters
+    ----------
+    path: str | os.PathLike
+        The file to write the recording to. It is overwritten if it exists.
+    request: QueryRequest | dict | bytes | None
+        The request that the events answer, or its raw JSON body.
+        Default is None.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        request: QueryRequest | dict | bytes | None = None,
+    ):
+        self._file = open(path, "wb")
+        self._offsets = array("Q")
+        self._start = time.monotonic()
+        compressed = zlib.compress(_request_json(request))
+        self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self._file.write(_LENGTH.pack(len(compressed)) + compressed)
+        self._offset = _HEADER.size + _LENGTH.size + len(compressed)
+
+    def write(self, event: BaseSSE | dict | bytes) -> None:
+        """Append an event, timestamped with the time since the start."""
+        data = encode_event(event)
+        tag = _TAG_EVENT
+        if len(data) >= _COMPRESS_MIN_SIZE:
+            compressed = zlib.compress(data)
+            if len(compressed) < len(data):
+                tag, data = _TAG_COMPRESSED_EVENT, compressed
+        self._offsets.append(self._offset)
+        record = _RECORD.pack(tag, len(data), time.monotonic() - self._start)
+        self._file.write(record + data)
+        self._offset += len(record) + len(data)
+
+    def close(self) -> None:
+        """Write the index and close the file."""
+        if self._file.closed:
+            return
+        offsets = self._offsets
+        if sys.byteorder == "big":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+        index = offsets.tobytes()
+        self._file.write(_RECORD.pack(_TAG_INDEX, len(index), 0.0) + index)
+        self._file.write(_TRAILER.pack(self._offset, MAGIC))
+        self._file.close()
+
+    def __enter__(self) -> "StreamRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+async def record(
+    events: AsyncIterable[BaseSSE | dict | bytes],
+    path: str | os.PathLike,
+    request: QueryRequest | dict | bytes | None = None,
+) -> AsyncGenerator[BaseSSE | dict | bytes, None]:
+    """Record an agent's event stream to a file, while passing it through.
+
+    Examples
+    --------
+    >>> @app.post("/query")
+    ... async def query(request: QueryRequest):
+    ...     events = record(event_generator(request), "session.obbrec", request)
+    ...     return SSEResponse(events)
+    """
+    iterator = aiter(events)
+    with StreamRecorder(path, request) as recorder:
+        try:
+            async for event in iterator:
+                recorder.write(event)
+                yield event
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+
+class StreamRecording:
+    """A recorded agent stream, memory-mapped for random access.
+
+    Events are only read (and decompressed) when accessed, so recordings
+    larger than memory can be iterated over, or indexed directly.
+
+    Parameters
+    ----------
+    path: str | os.PathLike
+        The recording file, as written by `StreamRecorder` or `record`.
+
+    Examples
+    --------
+    >>> with StreamRecording("session.obbrec") as recording:
+    ...     response = await CopilotResponse.from_async_chunks(
+    ...         recording.replay(speed=10.0)
+    ...     )
+    ...     response.starts("copilotStatusUpdate").then("copilotMessage")
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size + _LENGTH.size:
+            raise ValueError(f"{path} is not a stream recording.")
+        magic, version = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a stream recording.")
+        if version != VERSION:
+            raise ValueError(f"Unsupported stream recording version: {version}.")
+        (self._request_size,) = _LENGTH.unpack_from(self._mmap, _HEADER.size)
+        self._offsets = self._read_index()
+
+    def _read_index(self) -> array:
+        size = len(self._mmap)
+        first = _HEADER.size + _LENGTH.size + self._request_size
+        if size >= first + _TRAILER.size:
+            index_offset, magic = _TRAILER.unpack_from(self._mmap, size - _TRAILER.size)
+            if magic == MAGIC:
+                _, length, _ = _RECORD.unpack_from(self._mmap, index_offset)
+                start = index_offset + _RECORD.size
+                offsets = array("Q")
+                offsets.frombytes(self._mmap[start : start + length])
+                if sys.byteorder == "big":
+                    offsets.byteswap()
+                return offsets
+
+        # No index: the recording wasn't closed, so scan its complete records.
+        offsets = array("Q")
+        offset = first
+        while offset + _RECORD.size <= size:
+            tag, length, _ = _RECORD.unpack_from(self._mmap, offset)
+            end = offset + _RECORD.size + length
+            if tag not in (_TAG_EVENT, _TAG_COMPRESSED_EVENT) or end > size:
+                break
+            offsets.append(offset)
+            offset = end
+        return offsets
+
+    @property
+    def request(self) -> QueryRequest | None:
+        """The recorded request, if any."""
+        data = self.request_json
+        return QueryRequest.model_validate_json(data) if data else None
+
+    @property
+    def request_json(self) -> bytes:
+        """The recorded request, as raw JSON."""
+        start = _HEADER.size + _LENGTH.size
+        compressed = self._mmap[start : start + self._request_size]
+        return zlib.decompress(compressed) if compressed else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def time(self, index: int) -> float:
+        """The time of an event, in seconds since the start of the recording."""
+        return _RECORD.unpack_from(self._mmap, self._offsets[index])[2]
+
+    def __getitem__(self, index: int) -> RecordedEvent:
+        offset = self._offsets[index]
+        tag, length, timestamp = _RECORD.unpack_from(self._mmap, offset)
+        start = offset + _RECORD.size
+        data = self._mmap[start : start + length]
+        if tag == _TAG_COMPRESSED_EVENT:
+            data = zlib.decompress(data)
+        return RecordedEvent(timestamp, data)
+
+    def __iter__(self) -> Iterator[RecordedEvent]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def seek(self, timestamp: float) -> int:
+        """The index of the first event at or after `timestamp`."""
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.time(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    async def replay(
+        self, speed: float | None = 1.0, start: int = 0
+    ) -> AsyncGenerator[bytes, None]:
+        """Replay the encoded events, from the event at index `start`.
+
+        Events are spaced out as they were recorded, `speed` times faster. If
+        `speed` is None, events are replayed without any delay. The replayed
+        events can be sent with `SSEResponse`, or parsed with
+        `CopilotResponse.from_async_chunks`.
+        """
+        if start >= len(self):
+            return
+        loop = asyncio.get_running_loop()
+        base = self.time(start)
+        replay_start = loop.time()
+        for index in range(start, len(self)):
+            event = self[index]
+            if speed:
+                delay = (event.time - base) / speed - (loop.time() - replay_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield event.data
+
+    def response(self) -> CopilotResponse:
+        """Parse the whole recording, without delays, into a `CopilotResponse`."""
+        return CopilotResponse.from_chunks(event.data for event in self)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "StreamRecording":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,276 @@
+"""Cache and replay the event streams of deterministic agent turns.
+
+Some turns always produce the same stream for the same request, eg. the
+function-call round of an agent answering a canned dashboard question, which
+always emits the same `get_widget_data` call. `ResponseCache` stores the
+encoded stream of such turns, keyed by the request's fingerprint, and replays
+it on later identical requests instead of running the agent.
+
+Caching is opt-in, per agent, and per kind of turn:
+
+- `function_call`: the turn only emits reasoning steps and function calls (eg.
+  `get_widget_data`), and ends waiting for their results.
+- `answer`: the turn emits a message or artifacts.
+
+Turns whose generator raised, or that emitted an error reasoning step, are
+never cached.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import (
+    AsyncGenerator,
+    AsyncIterable,
+    Callable,
+    Collection,
+    Literal,
+    NamedTuple,
+)
+
+import xxhash
+from pydantic import BaseModel, Field
+
+from .models import BaseSSE, QueryRequest, StatusUpdateSSE
+from .responses import encode_event, event_type_of
+
+TurnKind = Literal["function_call", "answer"]
+
+_FUNCTION_CALL_EVENTS = {"copilotStatusUpdate", "copilotFunctionCall"}
+
+
+class CacheRule(BaseModel):
+    """Which turns of an agent may be cached, and for how long."""
+
+    kinds: set[TurnKind] = Field(
+        default={"function_call"}, description="The kinds of turns to cache."
+    )
+    ttl: float = Field(
+        default=300.0, description="Seconds a cached turn can be replayed for."
+    )
+
+
+class _CachedTurn(NamedTuple):
+    expires_at: float
+    events: list[tuple[float, bytes]]
+    size: int
+
+
+def turn_kind(event_types: Collection[str]) -> TurnKind | None:
+    """The kind of a turn, from the types of the events it emitted.
+
+    None if the turn is empty.
+    """
+    types = set(event_types)
+    if not types:
+        return None
+    if types <= _FUNCTION_CALL_EVENTS and "copilotFunctionCall" in types:
+        return "function_call"
+    return "answer"
+
+
+def _is_error(event: BaseSSE | dict | bytes) -> bool:
+    """Whether a status update event reports an error."""
+    if isinstance(event, StatusUpdateSSE):
+        return event.data.eventType == "ERROR"
+    if isinstance(event, BaseSSE):
+        return False
+    if isinstance(event, dict):
+        data = str(event["data"])
+    else:
+        data = "\n".join(
+            line[5:].removeprefix(b" ").decode()
+            for line in event.splitlines()
+            if line.startswith(b"data:")
+        )
+    return json.loads(data).get("eventType") == "ERROR"
+
+
+class _Recording:
+    """The events of a turn being run, while it can still be cached."""
+
+    def __init__(self, rule: CacheRule, max_bytes: int):
+        self.rule = rule
+        self.max_bytes = max_bytes
+        self.events: list[tuple[float, bytes]] = []
+        self.types: set[str] = set()
+        self.size = 0
+        self.start = time.monotonic()
+
+    def add(self, event: BaseSSE | dict | bytes, data: bytes) -> bool:
+        """Record an event. False once the turn can no longer be cached."""
+        event_type = event_type_of(event)
+        if event_type == "copilotStatusUpdate" and _is_error(event):
+            return False
+        if event_type not in _FUNCTION_CALL_EVENTS and "answer" not in self.rule.kinds:
+            return False
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            return False
+        self.types.add(event_type)
+        self.events.append((time.monotonic() - self.start, data))
+        return True
+
+
+class ResponseCache:
+    """A TTL- and size-bounded cache of agent turns, replayed on later requests.
+
+    Parameters
+    ----------
+    rules: dict[str, CacheRule]
+        The caching rule of each agent, by agent ID. Turns of other agents are
+        never cached.
+    max_bytes: int
+        The maximum total size of the cached streams. The least recently used
+        turns are evicted first.
+        Default is 64 MiB.
+
+    Examples
+    --------
+    >>> cache = ResponseCache(rules={"dashboard-agent": CacheRule(ttl=600)})
+    >>> @app.post("/query")
+    ... async def query(request: QueryRequest):
+    ...     return SSEResponse(
+    ...         cache.stream(
+    ...             request, "dashboard-agent", lambda: agent(request), user.id
+    ...         )
+    ...     )
+    """
+
+    def __init__(self, rules: dict[str, CacheRule], max_bytes: int = 64 * 1024**2):
+        self.rules = rules
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._turns: OrderedDict[str, _CachedTurn] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    @staticmethod
+    def key(request: QueryRequest, agent_id: str, scope: str) -> str:
+        """The cache key of a request: its messages, widgets and context.
+
+        `scope` identifies whoever the request is from (eg. a user or tenant
+        ID), as in `singleflight.request_key`, so that a turn cached for one
+        user is never replayed to another.
+        """
+        fingerprint = request.fingerprint()
+        hasher = xxhash.xxh3_128(agent_id.encode() + b"\0")
+        hasher.update(scope.encode() + b"\0")
+        last_message = fingerprint.messages[-1] if fingerprint.messages else ""
+        for part in (last_message, fingerprint.widgets, fingerprint.context):
+            hasher.update(part.encode())
+        return hasher.hexdigest()
+
+    def get(self, key: str) -> list[tuple[float, bytes]] | None:
+        """The cached events of a turn, with their times, if any."""
+        turn = self._turns.get(key)
+        if turn is None:
+            return None
+        if turn.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._turns.move_to_end(key)
+        return turn.events
+
+    def put(
+        self,
+        key: str,
+        agent_id: str,
+        events: list[tuple[float, bytes]],
+        event_types: Collection[str],
+    ) -> bool:
+        """Cache a turn, if the agent's rule allows it. Returns whether it did.
+
+        `event_types` are the types of the events of the turn, which decide its
+        kind (see `turn_kind`). Turns that reported an error must not be put.
+        """
+        rule = self.rules.get(agent_id)
+        if rule is None or turn_kind(event_types) not in rule.kinds:
+            return False
+        size = sum(len(data) for _, data in events)
+        if size > self.max_bytes:
+            return False
+        self._remove(key)
+        self._turns[key] = _CachedTurn(time.monotonic() + rule.ttl, events, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._turns)))
+        return True
+
+    def _remove(self, key: str) -> None:
+        turn = self._turns.pop(key, None)
+        if turn is not None:
+            self.size -= turn.size
+
+    def clear(self) -> None:
+        self._turns.clear()
+        self.size = 0
+
+    async def stream(
+        self,
+        request: QueryRequest,
+        agent_id: str,
+        events: Callable[[], AsyncIterable[BaseSSE | dict | bytes]],
+        scope: str,
+        speed: float | None = None,
+    ) -> AsyncGenerator[bytes, None]:
+        """Replay the cached turn of a request, or run and cache it.
+
+        Parameters
+        ----------
+        request: QueryRequest
+            The request.
+        agent_id: str
+            The agent answering it, whose rule decides if the turn is cached.
+        events: Callable[[], AsyncIterable[BaseSSE | dict | bytes]]
+            Starts the agent's event generator, on a cache miss.
+        scope: str
+            Identifies whoever the request is from, eg. a user or tenant ID.
+            Turns are only replayed within the same scope (see
+            `ResponseCache.key`).
+        speed: float | None
+            How a cached turn is replayed: `speed` times faster than it was
+            recorded, or without any delay if None.
+            Default is None.
+
+        Returns
+        -------
+        AsyncGenerator[bytes, None]
+            The encoded events of the turn.
+        """
+        key = None
+        recording = None
+        if agent_id in self.rules:
+            key = self.key(request, agent_id, scope)
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                start = time.monotonic()
+                for offset, data in cached:
+                    if speed:
+                        delay = offset / speed - (time.monotonic() - start)
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    yield data
+                return
+            self.misses += 1
+            recording = _Recording(self.rules[agent_id], self.max_bytes)
+
+        iterator = aiter(events())
+        try:
+            async for event in iterator:
+                data = encode_event(event)
+                # Stop recording as soon as the turn can't be cached.
+                if recording is not None and not recording.add(event, data):
+                    recording = None
+                yield data
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+        # Only reached if the turn ran to its end, without errors.
+        if key is not None and recording is not None:
+            self.put(key, agent_id, recording.events, recording.types)
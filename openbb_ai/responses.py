@@ -0,0 +1,428 @@
+import asyncio
+import zlib
+from contextlib import suppress
+from typing import Any, AsyncIterable, Awaitable, Callable, Literal, MutableMapping
+
+from .models import BaseSSE, _sse_data_lines, _sse_event_header
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore[assignment]
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+PING_MESSAGE = b": ping\r\n\r\n"
+
+Encoding = Literal["gzip", "deflate", "zstd"]
+
+# Small, latency-sensitive events are sync-flushed with the write that carries
+# them.  Anything else (eg. large artifacts) is left in the compressor, unless a
+# latency-sensitive event follows it in the same write, so that it compresses
+# together with whatever follows it.
+SYNC_FLUSH_EVENTS = frozenset(
+    {
+        "copilotMessageChunk",
+        "copilotStatusUpdate",
+        "copilotFunctionCall",
+        "copilotCitationCollection",
+        "copilotPromptSuggestions",
+    }
+)
+
+
+def encode_event(event: BaseSSE | dict | bytes) -> bytes:
+    """Encode an agent event into Server-Sent Event wire bytes.
+
+    Accepts SSE models, the `dict` returned by `BaseSSE.model_dump()` (as used
+    with `sse_starlette`), or bytes that are already encoded.
+    """
+    if isinstance(event, BaseSSE):
+        return event.encode()
+    if isinstance(event, bytes):
+        return event
+    if isinstance(event, dict):
+        header = _sse_event_header(event["event"])
+        if event.get("id") is not None:
+            header = f"id: {event['id']}\r\n".encode() + header
+        return header + _sse_data_lines(str(event["data"])) + b"\r\n"
+    raise TypeError(f"Cannot encode event of type {type(event).__name__} as an SSE.")
+
+
+def event_type_of(event: BaseSSE | dict | bytes) -> str:
+    """Return the SSE event type of an agent event, or "" if it has none."""
+    if isinstance(event, BaseSSE):
+        return event.event
+    if isinstance(event, dict):
+        return event.get("event", "")
+    start = event.find(b"\r\n") + 2 if event.startswith(b"id: ") else 0
+    if not event.startswith(b"event: ", start):
+        return ""
+    return event[start + 7 : event.find(b"\r\n", start)].decode()
+
+
+def available_encodings() -> list[Encoding]:
+    """Return the supported content encodings, in order of preference."""
+    encodings: list[Encoding] = ["gzip", "deflate"]
+    if zstandard is not None:
+        encodings.insert(0, "zstd")
+    return encodings
+
+
+def _qvalue(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def negotiate_encoding(accept_encoding: str) -> Encoding | None:
+    """Pick a content encoding from the value of an `Accept-Encoding` header.
+
+    Codings with a weight of `q=0` are refused, and never picked, even if the
+    header also has a `*` wildcard. The wildcard only stands for the codings
+    that aren't listed by name (RFC 9110, section 12.5.3). `identity` is
+    never picked, as it means no encoding: None is returned instead.
+    """
+    accepted: set[str] = set()
+    refused: set[str] = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if coding:
+            (accepted if _qvalue(params) > 0 else refused).add(coding)
+    listed = accepted | refused
+    for encoding in available_encodings():
+        if encoding in accepted or ("*" in accepted and encoding not in listed):
+            return encoding
+    return None
+
+
+class SSECompressor:
+    """A streaming compressor for Server-Sent Event streams.
+
+    The whole stream is compressed as a single gzip, deflate or zstd stream, so
+    that later events benefit from repetition in earlier ones (eg. the same
+    column names across table artifacts). The flush policy is event-aware: a
+    batch of events is sync-flushed once, after the last event listed in
+    `sync_flush_events`, so the client can decode those immediately, while
+    other events after it (by default, `copilotMessageArtifact`) are compressed
+    without a flush and only emitted on the next flush.
+
+    Parameters
+    ----------
+    encoding: Literal["gzip", "deflate", "zstd"]
+        The content encoding to use. "zstd" requires the `zstandard` package.
+    level: int | None
+        The compression level. If None, a level suited to streaming is used.
+        Default is None.
+    sync_flush_events: frozenset[str]
+        The event types that are flushed with the batch they are compressed in.
+        Default is every event type except `copilotMessageArtifact`.
+    """
+
+    def __init__(
+        self,
+        encoding: Encoding,
+        level: int | None = None,
+        sync_flush_events: frozenset[str] = SYNC_FLUSH_EVENTS,
+    ):
+        self.encoding = encoding
+        self.sync_flush_events = sync_flush_events
+        self._pending = False
+        match encoding:
+            case "gzip" | "deflate":
+                self._compressor: Any = zlib.compressobj(
+                    6 if level is None else level,
+                    zlib.DEFLATED,
+                    31 if encoding == "gzip" else 15,
+                )
+            case "zstd":
+                if zstandard is None:
+                    raise ImportError(
+                        "The 'zstandard' package is required for zstd compression. "
+                        "Install it with `pip install openbb-ai[zstd]`."
+                    )
+                self._compressor = zstandard.ZstdCompressor(
+                    level=3 if level is None else level
+                ).compressobj()
+            case _:
+                raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def _sync_flush(self) -> bytes:
+        if self.encoding == "zstd":
+            return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def compress(self, event_type: str, data: bytes) -> bytes:
+        """Compress an encoded event, flushing it if its event type requires."""
+        return self.compress_batch([(event_type, data)])
+
+    def compress_batch(self, parts: list[tuple[str, bytes]]) -> bytes:
+        """Compress a batch of encoded events, as `(event_type, data)` pairs.
+
+        The batch is sync-flushed once, after its last latency-sensitive event,
+        and any events after that are left pending until the next flush.
+        """
+        last = -1
+        for index, (event_type, _) in enumerate(parts):
+            if event_type in self.sync_flush_events:
+                last = index
+        output = [self._compressor.compress(data) for _, data in parts[: last + 1]]
+        if last >= 0:
+            output.append(self._sync_flush())
+            self._pending = False
+        for _, data in parts[last + 1 :]:
+            output.append(self._compressor.compress(data))
+            self._pending = True
+        return b"".join(output)
+
+    def flush(self) -> bytes:
+        """Flush any compressed data that is still held by the compressor."""
+        if not self._pending:
+            return b""
+        self._pending = False
+        return self._sync_flush()
+
+    def finish(self) -> bytes:
+        """Finish the compressed stream. The compressor can't be used after."""
+        self._pending = False
+        return self._compressor.flush()
+
+
+async def _wait_for_disconnect(receive: Receive) -> None:
+    # Request body messages may still be pending if the endpoint did not read
+    # the body, so skip anything that isn't the disconnect itself.
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class SSEResponse:
+    """An ASGI response that streams agent events as Server-Sent Events.
+
+    Events are encoded with `BaseSSE.encode()` as they are produced, and any
+    events that queue up while a previous write is still in flight are sent
+    together in a single `http.response.body` message.
+
+    Client disconnects are detected by awaiting the ASGI `receive` channel
+    alongside the event queue, so no separate polling task is needed. When the
+    client goes away, the event generator is closed.
+
+    Parameters
+    ----------
+    events: AsyncIterable[BaseSSE | dict | bytes]
+        The agent's event stream, typically an async generator of SSEs.
+    status_code: int
+        The HTTP status code of the response.
+        Default is 200.
+    headers: dict[str, str] | None
+        Extra HTTP headers to send with the response.
+        Default is None.
+    ping_interval: float | None
+        Send an SSE comment if no event was sent for this many seconds, to keep
+        idle connections alive through proxies. Set to None to disable.
+        Default is 15.0.
+    max_batch_bytes: int
+        The maximum size of a single batched `http.response.body` message.
+        Default is 65536.
+    max_queue_size: int
+        The maximum number of encoded events buffered ahead of the client.
+        Default is 256.
+    compression: Literal["auto", "gzip", "deflate", "zstd"] | None
+        Compress the stream with an `SSECompressor`. If "auto", the encoding is
+        negotiated from the request's `Accept-Encoding` header, preferring zstd
+        (when installed), then gzip, then deflate. If None, the stream is sent
+        uncompressed.
+        Default is None.
+
+    Examples
+    --------
+    >>> @app.post("/query")
+    ... async def query(request: QueryRequest):
+    ...     return SSEResponse(event_generator(request))
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        events: AsyncIterable[BaseSSE | dict | bytes],
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+        ping_interval: float | None = 15.0,
+        max_batch_bytes: int = 65536,
+        max_queue_size: int = 256,
+        compression: Literal["auto"] | Encoding | None = None,
+    ):
+        self.events = events
+        self.status_code = status_code
+        self.ping_interval = ping_interval
+        self.max_batch_bytes = max_batch_bytes
+        self.max_queue_size = max_queue_size
+        self.compression = compression
+        self.headers = {
+            "content-type": f"{self.media_type}; charset=utf-8",
+            "cache-control": "no-cache",
+            "connection": "keep-alive",
+            "x-accel-buffering": "no",
+            **{key.lower(): value for key, value in (headers or {}).items()},
+        }
+
+    @property
+    def raw_headers(self) -> list[tuple[bytes, bytes]]:
+        return [
+            (key.encode("latin-1"), value.encode("latin-1"))
+            for key, value in self.headers.items()
+        ]
+
+    def _compressor_for(self, scope: Scope) -> SSECompressor | None:
+        if self.compression is None:
+            return None
+        if self.compression != "auto":
+            return SSECompressor(self.compression)
+        accept_encoding = ""
+        for key, value in scope.get("headers", []):
+            if key.lower() == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = negotiate_encoding(accept_encoding)
+        return SSECompressor(encoding) if encoding else None
+
+    async def _produce(self, queue: asyncio.Queue[tuple[str, bytes] | None]) -> None:
+        iterator = aiter(self.events)
+        try:
+            async for event in iterator:
+                event_type = event_type_of(event)
+                if isinstance(event, BaseSSE) and event.has_spilled_payloads():
+                    # Spilled payloads are streamed from their files, through
+                    # the bounded queue, instead of being read back whole.
+                    for chunk in event.encode_chunks(self.max_batch_bytes):
+                        await queue.put((event_type, chunk))
+                else:
+                    await queue.put((event_type, encode_event(event)))
+        except Exception:
+            # Still signal the end of the stream, so that the error is raised
+            # from the response once the queued events have been sent.
+            await queue.put(None)
+            raise
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+        await queue.put(None)
+
+    def _drain(
+        self,
+        queue: asyncio.Queue[tuple[str, bytes] | None],
+        first: tuple[str, bytes],
+    ) -> list[tuple[str, bytes]]:
+        parts = [first]
+        size = len(first[1])
+        while size < self.max_batch_bytes and not queue.empty():
+            item = queue.get_nowait()
+            if item is None:
+                # Put the sentinel back so the main loop sees the end of stream.
+                queue.put_nowait(None)
+                break
+            parts.append(item)
+            size += len(item[1])
+        return parts
+
+    @staticmethod
+    def _body(
+        parts: list[tuple[str, bytes]], compressor: SSECompressor | None
+    ) -> bytes:
+        if compressor is None:
+            return b"".join(data for _, data in parts)
+        return compressor.compress_batch(parts)
+
+    @staticmethod
+    def _ping(compressor: SSECompressor | None) -> bytes:
+        if compressor is None:
+            return PING_MESSAGE
+        # Pings also flush any artifacts still pending, so that they reach the
+        # client within `ping_interval` even if no other event follows them.
+        return compressor.compress_batch([("", PING_MESSAGE)]) + compressor.flush()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        queue: asyncio.Queue[tuple[str, bytes] | None] = asyncio.Queue(
+            self.max_queue_size
+        )
+        compressor = self._compressor_for(scope)
+        headers = self.raw_headers
+        if compressor is not None:
+            headers += [
+                (b"content-encoding", compressor.encoding.encode()),
+                (b"vary", b"accept-encoding"),
+            ]
+        producer = asyncio.ensure_future(self._produce(queue))
+        disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+        get: asyncio.Future | None = None
+
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": self.status_code,
+                    "headers": headers,
+                }
+            )
+            while True:
+                get = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {get, disconnect},
+                    timeout=self.ping_interval,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    break
+                if not done:
+                    get.cancel()
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": self._ping(compressor),
+                            "more_body": True,
+                        }
+                    )
+                    continue
+
+                item = get.result()
+                if item is None:
+                    await asyncio.wait({producer})
+                    if exc := producer.exception():
+                        raise exc
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": compressor.finish() if compressor else b"",
+                            "more_body": False,
+                        }
+                    )
+                    break
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": self._body(self._drain(queue, item), compressor),
+                        "more_body": True,
+                    }
+                )
+        except OSError:
+            # Raised by ASGI servers when writing to a closed connection.
+            pass
+        finally:
+            for task in (get, producer, disconnect):
+                if task is not None and not task.done():
+                    task.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
+            # Retrieve the watcher's outcome, so that an error from `receive`
+            # isn't reported as never retrieved once the response is done.
+            await asyncio.wait({disconnect})
+            if not disconnect.cancelled():
+                disconnect.exception()
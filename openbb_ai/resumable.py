@@ -0,0 +1,246 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import suppress
+from typing import AsyncGenerator, AsyncIterable
+
+from .models import BaseSSE
+from .responses import encode_event
+
+
+def parse_last_event_id(value: str | bytes | None) -> int | None:
+    """Parse the value of a `Last-Event-ID` header into an event ID."""
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    try:
+        return int(value.strip())
+    except ValueError:
+        return None
+
+
+class _ResumableStream:
+    def __init__(self, max_events: int, max_bytes: int):
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.events: deque[tuple[int, bytes]] = deque()
+        self.size = 0
+        self.last_id = 0
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.last_active = time.monotonic()
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    @property
+    def first_id(self) -> int:
+        return self.events[0][0] if self.events else self.last_id + 1
+
+    def append(self, event: BaseSSE | dict | bytes) -> None:
+        self.last_id += 1
+        if isinstance(event, BaseSSE):
+            # The caller's event is left untouched, as it may be shared.
+            data = event.model_copy(update={"id": self.last_id}).encode()
+        elif isinstance(event, dict):
+            data = encode_event({**event, "id": self.last_id})
+        else:
+            data = f"id: {self.last_id}\r\n".encode() + event
+        self.events.append((self.last_id, data))
+        self.size += len(data)
+        while len(self.events) > self.max_events or (
+            self.size > self.max_bytes and len(self.events) > 1
+        ):
+            _, evicted = self.events.popleft()
+            self.size -= len(evicted)
+        self._notify()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def pump(self, events: AsyncIterable[BaseSSE | dict | bytes]) -> None:
+        iterator = aiter(events)
+        error: BaseException | None = None
+        try:
+            async for event in iterator:
+                self.append(event)
+        except asyncio.CancelledError as exc:
+            # The stream was discarded before its end: subscribers must not
+            # take it for a complete turn.
+            error = exc
+            raise
+        except Exception as exc:
+            error = exc
+        finally:
+            self.finish(error)
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    async def subscribe(self, after: int) -> AsyncGenerator[bytes, None]:
+        self.subscribers += 1
+        cursor = after
+        try:
+            while True:
+                while cursor < self.last_id:
+                    if cursor + 1 < self.first_id:
+                        # This subscriber fell behind the ring buffer and
+                        # missed events, so the stream can't continue
+                        # consistently.  The client will reconnect, and fail
+                        # to resume.
+                        return
+                    cursor, data = self.events[cursor + 1 - self.first_id]
+                    yield data
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            self.last_active = time.monotonic()
+
+
+class ResumableStreams:
+    """A registry of resumable agent event streams.
+
+    Each stream is identified by a stream ID chosen by the caller (eg. derived
+    from the request). Events are assigned monotonically increasing IDs (sent
+    as the SSE `id:` field) and kept, encoded, in a bounded ring buffer. The
+    agent's event generator runs in a background task that is decoupled from
+    the client connection, so that when a client reconnects with a
+    `Last-Event-ID` header, the missed events can be replayed from the buffer
+    and the client reattached to the live generator, instead of running the
+    whole agent turn again.
+
+    Streams are evicted once they have had no subscriber for `ttl` seconds (in
+    which case a still-running generator is cancelled), or when more than
+    `max_streams` streams are registered. Subscribers of a stream whose
+    generator was cancelled this way get an `asyncio.CancelledError`, rather
+    than a stream that looks complete.
+
+    Parameters
+    ----------
+    max_events: int
+        The maximum number of events kept per stream.
+        Default is 1024.
+    max_bytes: int
+        The maximum size, in bytes, of the encoded events kept per stream.
+        Default is 4 MiB.
+    max_streams: int
+        The maximum number of streams kept at once.
+        Default is 1000.
+    ttl: float
+        The time, in seconds, that a stream without subscribers is kept.
+        Default is 300.0.
+
+    Examples
+    --------
+    >>> streams = ResumableStreams()
+    >>> @app.post("/query")
+    ... async def query(request: QueryRequest, raw_request: Request):
+    ...     stream_id = ...  # eg. a conversation or trace ID
+    ...     last_event_id = raw_request.headers.get("last-event-id")
+    ...     events = streams.resume(stream_id, last_event_id)
+    ...     if events is None:
+    ...         events = streams.start(stream_id, event_generator(request))
+    ...     return SSEResponse(events)
+    """
+
+    def __init__(
+        self,
+        max_events: int = 1024,
+        max_bytes: int = 4 * 1024 * 1024,
+        max_streams: int = 1000,
+        ttl: float = 300.0,
+    ):
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.max_streams = max_streams
+        self.ttl = ttl
+        self._streams: dict[str, _ResumableStream] = {}
+
+    def __contains__(self, stream_id: str) -> bool:
+        return stream_id in self._streams
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def start(
+        self, stream_id: str, events: AsyncIterable[BaseSSE | dict | bytes]
+    ) -> AsyncGenerator[bytes, None]:
+        """Start a new resumable stream, and subscribe to it from the start.
+
+        Any existing stream with the same ID is discarded.
+        """
+        self.evict()
+        self.discard(stream_id)
+        stream = _ResumableStream(self.max_events, self.max_bytes)
+        stream.task = asyncio.ensure_future(stream.pump(events))
+        self._streams[stream_id] = stream
+        self._enforce_max_streams()
+        return stream.subscribe(0)
+
+    def resume(
+        self, stream_id: str, last_event_id: int | str | bytes | None
+    ) -> AsyncGenerator[bytes, None] | None:
+        """Resume a stream after `last_event_id`.
+
+        Returns None if the stream is unknown (or expired), or if the events
+        after `last_event_id` are no longer buffered, in which case the agent
+        turn must be run again.
+        """
+        self.evict()
+        if not isinstance(last_event_id, int):
+            last_event_id = parse_last_event_id(last_event_id)
+        stream = self._streams.get(stream_id)
+        if stream is None or last_event_id is None:
+            return None
+        if not 0 <= last_event_id <= stream.last_id:
+            return None
+        if last_event_id + 1 < stream.first_id:
+            return None
+        stream.last_active = time.monotonic()
+        return stream.subscribe(last_event_id)
+
+    def discard(self, stream_id: str) -> None:
+        """Remove a stream, cancelling its generator if it is still running."""
+        stream = self._streams.pop(stream_id, None)
+        if stream is not None and stream.task is not None:
+            stream.task.cancel()
+
+    def evict(self) -> None:
+        """Remove streams that have had no subscribers for longer than `ttl`."""
+        deadline = time.monotonic() - self.ttl
+        for stream_id, stream in list(self._streams.items()):
+            if stream.subscribers == 0 and stream.last_active < deadline:
+                self.discard(stream_id)
+
+    def _enforce_max_streams(self) -> None:
+        while len(self._streams) > self.max_streams:
+            # Prefer evicting finished streams, then the least recently active.
+            stream_id = min(
+                self._streams,
+                key=lambda key: (
+                    not self._streams[key].done,
+                    self._streams[key].subscribers > 0,
+                    self._streams[key].last_active,
+                ),
+            )
+            self.discard(stream_id)
+
+    async def aclose(self) -> None:
+        """Cancel all running generators and clear the registry."""
+        tasks = [s.task for s in self._streams.values() if s.task is not None]
+        self._streams.clear()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
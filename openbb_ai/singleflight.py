@@ -0,0 +1,180 @@
+import asyncio
+from typing import AsyncIterable, Callable
+
+import xxhash
+
+from .models import BaseSSE, QueryRequest
+from .responses import encode_event
+
+
+def request_key(request: QueryRequest, scope: str) -> str:
+    """A key identifying identical requests, for `SingleFlight.stream`.
+
+    The key is derived from the request's fingerprint (see
+    `QueryRequest.fingerprint`), and from `scope`, which should identify
+    whoever the request is from (eg. a user ID), so that the identical requests
+    of different users aren't coalesced.
+    """
+    hasher = xxhash.xxh3_128(scope.encode() + b"\0")
+    hasher.update(request.fingerprint().digest.encode())
+    return hasher.hexdigest()
+
+
+class _Flight:
+    def __init__(self, key: str, flights: dict[str, "_Flight"]):
+        self.key = key
+        self.flights = flights
+        self.events: list[bytes] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def append(self, event: BaseSSE | dict | bytes) -> None:
+        self.events.append(encode_event(event))
+        self._notify()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        if self.done:
+            return
+        self.done = True
+        self.error = error
+        self._notify()
+        # Requests arriving from now on run the agent again.
+        if self.flights.get(self.key) is self:
+            del self.flights[self.key]
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def pump(self, events: AsyncIterable[BaseSSE | dict | bytes]) -> None:
+        iterator = aiter(events)
+        error: BaseException | None = None
+        try:
+            async for event in iterator:
+                self.append(event)
+        except Exception as exc:
+            error = exc
+        finally:
+            self.finish(error)
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    def unsubscribe(self) -> None:
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done:
+            # Nobody is listening anymore: stop the agent.
+            self.finish(asyncio.CancelledError())
+            if self.task is not None:
+                self.task.cancel()
+
+
+class Subscription:
+    """A subscriber's view of a coalesced event stream, from its first event.
+
+    Iterate over it to receive the encoded events, and close it (or iterate
+    until the end) to release it. The agent's generator is cancelled once all
+    of its subscriptions have been released before the end of the stream.
+    """
+
+    def __init__(self, flight: _Flight):
+        self._flight = flight
+        self._cursor = 0
+        self._released = False
+        flight.subscribers += 1
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> bytes:
+        flight = self._flight
+        while not self._released:
+            if self._cursor < len(flight.events):
+                self._cursor += 1
+                return flight.events[self._cursor - 1]
+            if flight.done:
+                self._release()
+                if flight.error is not None:
+                    raise flight.error
+                break
+            await flight._changed.wait()
+        raise StopAsyncIteration
+
+    async def aclose(self) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._flight.unsubscribe()
+
+    def __del__(self) -> None:
+        # Release subscriptions that were dropped without being closed (eg.
+        # never iterated), so they don't keep the generator running.
+        if not self._released:
+            self._release()
+
+
+class SingleFlight:
+    """Coalesce identical in-flight agent requests into a single agent run.
+
+    The first request with a given key runs the agent's event generator, in a
+    background task. Requests with the same key that arrive while it is still
+    running (eg. double clicks, client retries and reconnects) don't run the
+    agent again: they subscribe to the same stream, and receive every event,
+    including those emitted before they arrived. The generator is cancelled if
+    every subscriber disconnects before the end of the stream.
+
+    Events are encoded once, and shared by all subscribers.
+
+    Examples
+    --------
+    >>> flights = SingleFlight()
+    >>> @app.post("/query")
+    ... async def query(request: QueryRequest, user: User = Depends(get_user)):
+    ...     key = request_key(request, user.id)
+    ...     return SSEResponse(flights.stream(key, lambda: event_generator(request)))
+    """
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def subscribers(self, key: str) -> int:
+        """The number of subscribers of the stream running for `key`, if any."""
+        flight = self._flights.get(key)
+        return flight.subscribers if flight is not None else 0
+
+    def stream(
+        self,
+        key: str,
+        events: Callable[[], AsyncIterable[BaseSSE | dict | bytes]],
+    ) -> Subscription:
+        """Subscribe to the stream running for `key`, or start it with `events`.
+
+        Parameters
+        ----------
+        key: str
+            Identifies identical requests, eg. from `request_key`.
+        events: Callable[[], AsyncIterable[BaseSSE | dict | bytes]]
+            Starts the agent's event generator. Only called if no stream is
+            running for `key`.
+
+        Returns
+        -------
+        Subscription
+            The encoded events of the stream, from its first event.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(key, self._flights)
+            self._flights[key] = flight
+            flight.task = asyncio.ensure_future(flight.pump(events()))
+        return Subscription(flight)
@@ -0,0 +1,288 @@
+"""Move oversized payloads out of memory, into temporary files.
+
+Multi-MB payloads (eg. PDFs, the data content of widgets, or large table
+artifacts) otherwise stay in memory for the whole stream, which sets the
+memory ceiling of a worker under concurrency. A `SpillStore` moves payloads
+larger than its threshold into temporary files, replacing them with a
+`SpilledPayload`: a lightweight handle that reads the file lazily, through a
+memory map.
+
+The models that can hold large payloads (`SingleDataContent`, `DataContent`,
+`LlmClientFunctionCallResultMessage`, `QueryRequest`, `ClientArtifact` and
+`Pdf`) have a `spill` method, which spills their payloads to a store. Spilled
+payloads are read back when models are dumped, but SSEs encoded in chunks
+(see `BaseSSE.encode_chunks`, used by `SSEResponse`) stream them from their
+files instead. The files are deleted when the store is closed, eg. at the end
+of the stream with `SpillStore.stream`.
+"""
+
+import codecs
+import json
+import mmap
+import re
+import tempfile
+import uuid
+from typing import (
+    Annotated,
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Iterator,
+    Literal,
+    TypeVar,
+    Union,
+    get_args,
+)
+
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema, from_json, to_json
+
+T = TypeVar("T")
+
+PayloadKind = Literal["bytes", "str", "json"]
+
+# The serialization context key under which payloads are collected, instead
+# of being read back, when encoding SSEs in chunks.
+SPILL_CONTEXT = "openbb_ai.spill"
+
+# Stands for a collected payload in serialized JSON, followed by its index.
+_PLACEHOLDER = f"\x00{uuid.uuid4().hex}:"
+PLACEHOLDER_PATTERN = re.compile(
+    '"' + re.escape(json.dumps(_PLACEHOLDER)[1:-1]) + r'(\d+)\\u0000"'
+)
+
+_WRITE_CHUNK = 1024**2
+
+
+class SpilledPayload:
+    """A payload moved to a temporary file by a `SpillStore`, and read lazily.
+
+    Parameters
+    ----------
+    value: bytes | str | Any
+        The payload: bytes, a string, or a JSON-serializable value (eg. a table,
+        as a list of dicts).
+    directory: str | None
+        The directory of the temporary file. If None, the default temporary
+        directory.
+        Default is None.
+    serialized: bool
+        Whether `value` is the bytes of an already serialized JSON value.
+        Default is False.
+    """
+
+    def __init__(
+        self,
+        value: bytes | str | Any,
+        directory: str | None = None,
+        serialized: bool = False,
+    ):
+        self.kind: PayloadKind
+        self._file = tempfile.TemporaryFile(dir=directory)
+        if isinstance(value, bytes):
+            self.kind = "json" if serialized else "bytes"
+            self._file.write(value)
+        elif isinstance(value, str):
+            self.kind = "str"
+            # In slices, so that the whole string isn't copied at once.
+            for start in range(0, len(value), _WRITE_CHUNK):
+                self._file.write(value[start : start + _WRITE_CHUNK].encode())
+        else:
+            self.kind = "json"
+            self._file.write(to_json(value))
+        self._file.flush()
+        self.size = self._file.tell()
+        self._map: mmap.mmap | None = None
+        self.closed = False
+
+    def __repr__(self) -> str:
+        return f"SpilledPayload(kind='{self.kind}', size={self.size})"
+
+    def buffer(self) -> memoryview:
+        """The stored bytes, memory mapped from the file (utf-8 for strings)."""
+        if self.closed:
+            raise ValueError("The spilled payload has been closed.")
+        if self.size == 0:
+            return memoryview(b"")
+        if self._map is None:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._map)
+
+    def read(self) -> Any:
+        """Read the whole payload back into memory, as it was spilled."""
+        with self.buffer() as buffer:
+            data = bytes(buffer)
+        if self.kind == "str":
+            return data.decode()
+        if self.kind == "json":
+            return from_json(data)
+        return data
+
+    def iter_bytes(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """The stored bytes, in chunks."""
+        with self.buffer() as buffer:
+            for start in range(0, len(buffer), chunk_size):
+                yield bytes(buffer[start : start + chunk_size])
+
+    def iter_json(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """The payload serialized to JSON, as pydantic would, in chunks.
+
+        Bytes are serialized as utf-8 strings (pydantic's default).
+        """
+        if self.kind == "json":
+            yield from self.iter_bytes(chunk_size)
+            return
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        yield b'"'
+        for chunk in self.iter_bytes(chunk_size):
+            yield json.dumps(decoder.decode(chunk), ensure_ascii=False)[1:-1].encode()
+        decoder.decode(b"", final=True)
+        yield b'"'
+
+    def close(self) -> None:
+        """Delete the file. The payload can't be read anymore."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Still exported (eg. by a decoded buffer): closed when collected.
+                pass
+            self._map = None
+        self._file.close()
+
+    def _serialize(self, info: core_schema.SerializationInfo) -> Any:
+        context = info.context
+        if isinstance(context, dict) and SPILL_CONTEXT in context:
+            payloads = context[SPILL_CONTEXT]
+            payloads.append(self)
+            return f"{_PLACEHOLDER}{len(payloads) - 1}\x00"
+        return self.read()
+
+
+def _validate(value: Any, handler: core_schema.ValidatorFunctionWrapHandler) -> Any:
+    if isinstance(value, SpilledPayload):
+        return value
+    return handler(value)
+
+
+def _serialize(
+    value: Any,
+    handler: core_schema.SerializerFunctionWrapHandler,
+    info: core_schema.SerializationInfo,
+) -> Any:
+    if isinstance(value, SpilledPayload):
+        return value._serialize(info)
+    return handler(value)
+
+
+class _SpillableSchema:
+    def __get_pydantic_core_schema__(
+        self, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        types = tuple(
+            type_ for type_ in get_args(source) if type_ is not SpilledPayload
+        )
+        schema = handler.generate_schema(Union[types])  # type: ignore[valid-type]
+        return core_schema.no_info_wrap_validator_function(
+            _validate,
+            schema,
+            serialization=core_schema.wrap_serializer_function_ser_schema(
+                _serialize, info_arg=True, schema=schema
+            ),
+        )
+
+
+# A field that can hold a payload of type T, or its `SpilledPayload`. Other
+# values are validated (and described in JSON schemas) as T.
+Spillable = Annotated[Union[T, SpilledPayload], _SpillableSchema()]
+
+
+class SpillStore:
+    """Spill payloads larger than a threshold to temporary files.
+
+    A store is meant for the lifetime of a request: closing it deletes the
+    files of its payloads. Models whose payloads are spilled must not be
+    shared with other requests (`openbb_ai.cache.ValidationCache` copies the
+    models it shares that have payloads).
+
+    Parameters
+    ----------
+    threshold: int
+        The size, in bytes, of the smallest payload that is spilled. Strings
+        are measured in characters, and tables by the size of their JSON.
+        Default is 4 MiB.
+    directory: str | None
+        The directory of the temporary files. If None, the default temporary
+        directory.
+        Default is None.
+
+    Examples
+    --------
+    >>> @app.post("/query")
+    ... async def query(request: QueryRequest):
+    ...     store = SpillStore()
+    ...     request.spill(store)
+    ...     return SSEResponse(store.stream(agent(request)))
+    """
+
+    def __init__(self, threshold: int = 4 * 1024**2, directory: str | None = None):
+        self.threshold = threshold
+        self.directory = directory
+        self._payloads: list[SpilledPayload] = []
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    def __enter__(self) -> "SpillStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def size(self) -> int:
+        """The total size of the spilled payloads, in bytes."""
+        return sum(payload.size for payload in self._payloads)
+
+    def spill(self, value: T) -> T | SpilledPayload:
+        """Spill `value` to a temporary file if it is larger than the threshold.
+
+        Returns
+        -------
+        T | SpilledPayload
+            The handle of the spilled payload, or `value` if it is smaller than
+            the threshold (or already spilled).
+        """
+        if isinstance(value, SpilledPayload):
+            return value
+        if isinstance(value, (bytes, str)):
+            if len(value) < self.threshold:
+                return value
+            payload = SpilledPayload(value, self.directory)
+        else:
+            data = to_json(value)
+            if len(data) < self.threshold:
+                return value
+            payload = SpilledPayload(data, self.directory, serialized=True)
+        self._payloads.append(payload)
+        return payload
+
+    def close(self) -> None:
+        """Delete the files of every spilled payload."""
+        for payload in self._payloads:
+            payload.close()
+        self._payloads.clear()
+
+    async def stream(self, events: AsyncIterable[T]) -> AsyncGenerator[T, None]:
+        """Forward `events`, and close the store once the stream ends."""
+        iterator = aiter(events)
+        try:
+            async for event in iterator:
+                yield event
+        finally:
+            self.close()
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
@@ -0,0 +1,324 @@
+import asyncio
+from collections import deque
+from contextlib import suppress
+from typing import Any, AsyncGenerator, AsyncIterable, AsyncIterator, Literal
+
+from pydantic import BaseModel, Field
+
+from .helpers import message_chunk
+from .models import MessageChunkSSE, StatusUpdateSSE
+
+
+async def coalesce_message_chunks(
+    events: AsyncIterator[Any],
+    max_delay: float = 0.05,
+    max_bytes: int = 4096,
+) -> AsyncGenerator[Any, None]:
+    """Merge consecutive message chunk SSEs into fewer, larger chunks.
+
+    LLM providers typically stream token-level deltas, each of which would
+    otherwise become its own `MessageChunkSSE` (and its own network write).
+    This wrapper buffers consecutive `copilotMessageChunk` events and emits them
+    as a single chunk once the buffer is older than `max_delay` seconds or
+    larger than `max_bytes`.
+
+    Any other event (eg. an artifact, citation, status update or function call)
+    immediately flushes the buffer before being passed through unchanged, so
+    the relative order of events is always preserved.
+
+    Parameters
+    ----------
+    events: AsyncIterator[Any]
+        The agent's event stream, typically an async generator of SSEs.
+    max_delay: float
+        The maximum time, in seconds, that a delta is held back before being
+        flushed to the client.
+        Default is 0.05.
+    max_bytes: int
+        The maximum size, in UTF-8 bytes, of buffered deltas before they are
+        flushed to the client.
+        Default is 4096.
+
+    Examples
+    --------
+    >>> async def execution_loop():
+    ...     async for event in coalesce_message_chunks(event_generator()):
+    ...         yield event.model_dump()
+
+    Returns
+    -------
+    AsyncGenerator[Any, None]
+        The event stream, with consecutive message chunks merged.
+    """
+    iterator = aiter(events)
+    parts: list[str] = []
+    size = 0
+    deadline = 0.0
+    loop = asyncio.get_running_loop()
+    pending: asyncio.Future | None = None
+
+    try:
+        while True:
+            if parts:
+                # Only race upstream against the deadline while chunks are
+                # buffered, keeping the pending `anext` across windows.
+                if pending is None:
+                    pending = asyncio.ensure_future(anext(iterator))
+                timeout = max(deadline - loop.time(), 0.0)
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    # The window elapsed while waiting for upstream, so
+                    # release what we have without waiting for the next event.
+                    yield message_chunk("".join(parts))
+                    parts, size = [], 0
+                    continue
+
+            try:
+                if pending is None:
+                    event = await anext(iterator)
+                else:
+                    event = await pending
+            except StopAsyncIteration:
+                break
+            finally:
+                pending = None
+
+            if isinstance(event, MessageChunkSSE):
+                if not parts:
+                    deadline = loop.time() + max_delay
+                parts.append(event.data.delta)
+                size += len(event.data.delta.encode())
+                if size >= max_bytes:
+                    yield message_chunk("".join(parts))
+                    parts, size = [], 0
+                continue
+
+            if parts:
+                yield message_chunk("".join(parts))
+                parts, size = [], 0
+            yield event
+
+        if parts:
+            yield message_chunk("".join(parts))
+    finally:
+        if pending is not None:
+            pending.cancel()
+            with suppress(asyncio.CancelledError, StopAsyncIteration):
+                await pending
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+
+BufferPolicy = Literal["merge", "supersede", "keep"]
+
+DEFAULT_BUFFER_POLICIES: dict[str, BufferPolicy] = {
+    "copilotMessageChunk": "merge",
+    "copilotStatusUpdate": "supersede",
+}
+
+
+class StreamBufferMetrics(BaseModel):
+    depth: int = Field(default=0, description="Number of events queued.")
+    max_depth: int = Field(default=0, description="Highest number of events queued.")
+    merged: dict[str, int] = Field(
+        default_factory=dict,
+        description="Number of events merged into a queued event, by event type.",
+    )
+    dropped: dict[str, int] = Field(
+        default_factory=dict,
+        description="Number of events dropped, by event type.",
+    )
+
+
+class StreamBuffer:
+    """A bounded buffer of agent events, for clients that read slowly.
+
+    Each event type has a policy that decides what happens to it while it is
+    waiting to be sent:
+
+    - "merge": consecutive queued events are merged into a single event.
+      Message chunks are merged by default, which never loses any text.
+    - "supersede": when the buffer is full, the oldest queued event of this
+      kind that a newer one supersedes is dropped. A newer event of the same
+      type supersedes it (for status updates, one with the same event type,
+      eg. an "INFO" update supersedes an older "INFO" update, but not a
+      "WARNING"), whether it is queued or being put. Status updates are
+      superseded by default, except for "ERROR" status updates, which are
+      always kept.
+    - "keep": the event is never dropped. If the buffer is full and nothing
+      can be dropped, the producer waits for the client to catch up. This is
+      the policy of every event type without an explicit policy (eg.
+      artifacts, citations and function calls).
+
+    Parameters
+    ----------
+    max_size: int
+        The maximum number of queued events.
+        Default is 64.
+    policies: dict[str, Literal["merge", "supersede", "keep"]] | None
+        The policy for each event type. If None, message chunks are merged
+        and status updates are superseded.
+        Default is None.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 64,
+        policies: dict[str, BufferPolicy] | None = None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self.max_size = max_size
+        self.policies = DEFAULT_BUFFER_POLICIES if policies is None else policies
+        self.metrics = StreamBufferMetrics()
+        # Merged message chunks are queued as a list of deltas, and are only
+        # joined when they are taken out of the buffer.
+        self._queue: deque[Any] = deque()
+        self._closed = False
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def _policy(self, event: Any) -> BufferPolicy:
+        if isinstance(event, list):
+            return "merge"
+        policy = self.policies.get(getattr(event, "event", None) or "", "keep")
+        if (
+            policy == "supersede"
+            and isinstance(event, StatusUpdateSSE)
+            and event.data.eventType == "ERROR"
+        ):
+            return "keep"
+        return policy
+
+    def _count(self, counter: dict[str, int], event: Any) -> None:
+        event_type = getattr(event, "event", None) or "copilotMessageChunk"
+        counter[event_type] = counter.get(event_type, 0) + 1
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _try_merge(self, event: Any) -> bool:
+        if not self._queue or not isinstance(event, MessageChunkSSE):
+            return False
+        tail = self._queue[-1]
+        if isinstance(tail, MessageChunkSSE):
+            self._queue[-1] = [tail.data.delta, event.data.delta]
+        elif isinstance(tail, list):
+            tail.append(event.data.delta)
+        else:
+            return False
+        self._count(self.metrics.merged, event)
+        return True
+
+    def _supersede_key(self, event: Any) -> Any:
+        if isinstance(event, StatusUpdateSSE):
+            return event.event, event.data.eventType
+        return event.event
+
+    def _drop_superseded(self, incoming: Any) -> bool:
+        # Walk back from the newest event, remembering the keys seen so far:
+        # the last match is the oldest queued event that a later one
+        # supersedes.
+        later = set()
+        if self._policy(incoming) == "supersede":
+            later.add(self._supersede_key(incoming))
+        superseded = None
+        for index in range(len(self._queue) - 1, -1, -1):
+            queued = self._queue[index]
+            if self._policy(queued) != "supersede":
+                continue
+            key = self._supersede_key(queued)
+            if key in later:
+                superseded = index
+            else:
+                later.add(key)
+        if superseded is None:
+            return False
+        self._count(self.metrics.dropped, self._queue[superseded])
+        del self._queue[superseded]
+        return True
+
+    async def put(self, event: Any) -> None:
+        """Queue an event, waiting for space if nothing can be dropped."""
+        if self._closed:
+            raise RuntimeError("Cannot put events into a closed StreamBuffer.")
+        if self._policy(event) == "merge" and self._try_merge(event):
+            return
+        while len(self._queue) >= self.max_size and not self._drop_superseded(event):
+            changed = self._changed
+            await changed.wait()
+        self._queue.append(event)
+        self.metrics.depth = len(self._queue)
+        self.metrics.max_depth = max(self.metrics.max_depth, self.metrics.depth)
+        self._notify()
+
+    def close(self) -> None:
+        """Mark the end of the stream. Queued events can still be taken."""
+        self._closed = True
+        self._notify()
+
+    async def get(self) -> Any | None:
+        """Take the next event, or None once the buffer is closed and empty."""
+        while not self._queue:
+            if self._closed:
+                return None
+            changed = self._changed
+            await changed.wait()
+        event = self._queue.popleft()
+        self.metrics.depth = len(self._queue)
+        self._notify()
+        if isinstance(event, list):
+            return message_chunk("".join(event))
+        return event
+
+
+async def buffer_events(
+    events: AsyncIterable[Any],
+    buffer: StreamBuffer | None = None,
+) -> AsyncGenerator[Any, None]:
+    """Decouple an agent's event stream from a slow client with a `StreamBuffer`.
+
+    The agent's generator runs in a background task and keeps producing events
+    into the buffer, where the buffer's policies keep its size bounded, while
+    events are yielded as fast as the client reads them.
+
+    Parameters
+    ----------
+    events: AsyncIterable[Any]
+        The agent's event stream, typically an async generator of SSEs.
+    buffer: StreamBuffer | None
+        The buffer to use. Pass your own buffer to configure its policies or to
+        read its `metrics`. If None, a `StreamBuffer` with the default policies
+        is used.
+        Default is None.
+
+    Returns
+    -------
+    AsyncGenerator[Any, None]
+        The buffered event stream.
+    """
+    buffer = StreamBuffer() if buffer is None else buffer
+
+    async def produce() -> None:
+        iterator = aiter(events)
+        try:
+            async for event in iterator:
+                await buffer.put(event)
+        finally:
+            buffer.close()
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while (event := await buffer.get()) is not None:
+            yield event
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
@@ -1,8 +1,117 @@
+import codecs
 import json
+import re
 from ast import literal_eval
+from typing import AsyncIterable, Iterable
 
 from pydantic import BaseModel
 
+# Per the SSE spec, lines end with CRLF, LF or CR (and nothing else, unlike
+# `str.splitlines`).
+_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+_EVENT_TYPES = frozenset(
+    {
+        "copilotMessageArtifact",
+        "copilotFunctionCall",
+        "copilotStatusUpdate",
+        "copilotPromptSuggestions",
+        "copilotCitationCollection",
+    }
+)
+
+
+class SSEParser:
+    """An incremental parser of Server-Sent Event streams.
+
+    Chunks of the stream (`bytes` or `str`) are fed as they arrive, and may
+    split lines, fields or UTF-8 sequences anywhere. Multi-line `data:` fields
+    are joined with newlines, as per the SSE spec. Parsing is linear in the
+    size of the stream.
+
+    Examples
+    --------
+    >>> parser = SSEParser()
+    >>> parser.feed(b'event: copilotMessageChunk\\r\\ndata: {"del')
+    []
+    >>> parser.feed(b'ta": "Hi"}\\r\\n\\r\\n')
+    [('copilotMessageChunk', '{"delta": "Hi"}')]
+    """
+
+    def __init__(self):
+        self.last_event_id: str | None = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        # The current, incomplete line, kept as parts so that long lines
+        # arriving in many chunks are only joined once.
+        self._partial: list[str] = []
+        self._skip_lf = False
+        self._event_type = ""
+        self._data: list[str] = []
+
+    def feed(self, chunk: bytes | str) -> list[tuple[str, str]]:
+        """Parse a chunk, and return the events it completes as (type, data)."""
+        text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        if self._skip_lf and text:
+            # A CRLF was split across chunks.
+            self._skip_lf = False
+            if text[0] == "\n":
+                text = text[1:]
+        events: list[tuple[str, str]] = []
+        lines = _LINE_BREAK.split(text)
+        if len(lines) == 1:
+            if text:
+                self._partial.append(text)
+            return events
+        if self._partial:
+            lines[0] = "".join(self._partial) + lines[0]
+            self._partial = []
+        if tail := lines.pop():
+            self._partial.append(tail)
+        self._skip_lf = text.endswith("\r")
+        for line in lines:
+            self._process_line(line, events)
+        return events
+
+    def close(self) -> list[tuple[str, str]]:
+        """End the stream, and return any event that wasn't terminated."""
+        events: list[tuple[str, str]] = []
+        if tail := self._decoder.decode(b"", final=True):
+            self._partial.append(tail)
+        if self._partial:
+            self._process_line("".join(self._partial), events)
+            self._partial = []
+        # Be lenient with streams that don't end with a blank line.
+        self._process_line("", events)
+        return events
+
+    def _process_line(self, line: str, events: list[tuple[str, str]]) -> None:
+        if not line:
+            if self._data:
+                events.append((self._event_type or "message", "\n".join(self._data)))
+            self._event_type = ""
+            self._data = []
+            return
+        if line[0] == ":":
+            # A comment, eg. a keep-alive ping.
+            return
+        field, _, value = line.partition(":")
+        if value[:1] == " ":
+            value = value[1:]
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event_type = value
+        elif field == "id":
+            self.last_event_id = value
+
+
+def _decode_payload(data: str) -> dict:
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError:
+        # Older streams used Python reprs for some payloads.
+        return literal_eval(data)
+
 
 class CopilotEvent(BaseModel):
     event_type: str
@@ -10,96 +119,114 @@ class CopilotEvent(BaseModel):
 
 
 class CopilotResponse:
-    def __init__(self, event_stream: str):
-        self.events: list = []
+    """A parsed agent response, with fluent assertions on its events.
+
+    Consecutive message chunks are merged into a single "copilotMessage"
+    event. The response can be parsed from a whole stream, or incrementally
+    with `feed` (and `close`), `from_chunks` or `from_async_chunks`.
+    """
+
+    def __init__(self, event_stream: str | bytes = ""):
         self.index = 0
         self.event_stream = event_stream
-        self.parse_event_stream()
+        self._parser = SSEParser()
+        self._events: list[CopilotEvent] = []
+        self._events_by_type: dict[str, list[CopilotEvent]] = {}
+        # The message being streamed, with its deltas not joined yet.
+        self._message: CopilotEvent | None = None
+        self._message_parts: list[str] = []
+        self._text_parts: list[str] = []
+        if event_stream:
+            self.parse_event_stream()
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[bytes | str]) -> "CopilotResponse":
+        """Parse a response from an iterable of stream chunks."""
+        response = cls()
+        for chunk in chunks:
+            response.feed(chunk)
+        response.close()
+        return response
+
+    @classmethod
+    async def from_async_chunks(
+        cls, chunks: AsyncIterable[bytes | str]
+    ) -> "CopilotResponse":
+        """Parse a response from an async iterable of stream chunks."""
+        response = cls()
+        async for chunk in chunks:
+            response.feed(chunk)
+        response.close()
+        return response
 
     def parse_event_stream(self):
-        event_name = ""
-        lines = self.event_stream.split("\n")
-        copilot_message_event_index = None
-        for line in lines:
-            if line.startswith("event:"):
-                event_type = line.split("event:")[1].strip()
-            if event_type == "copilotMessageChunk" and line.startswith("data:"):
-                if (
-                    copilot_message_event_index is None
-                    or copilot_message_event_index < len(self.events) - 1
-                ):
-                    self.events.append(
-                        CopilotEvent(event_type="copilotMessage", content="")
-                    )
-                    copilot_message_event_index = len(self.events) - 1
-                data_payload = line.split("data:")[1].strip()
-                data_dict_ = literal_eval(data_payload)
-                self.events[copilot_message_event_index].content += data_dict_["delta"]
-            elif event_type == "copilotMessageArtifact" and line.startswith("data:"):
-                event_name = "copilotMessageArtifact"
-                data_payload = line.split("data:")[1].strip()
-                data_dict_ = json.loads(data_payload)
-                self.events.append(
-                    CopilotEvent(event_type=event_name, content=data_dict_)
-                )
-            elif event_type == "copilotFunctionCall" and line.startswith("data:"):
-                event_name = "copilotFunctionCall"
-                data_payload = line.split("data:")[1].strip()
-                data_dict_ = literal_eval(data_payload)
-                self.events.append(
-                    CopilotEvent(event_type=event_name, content=data_dict_)
-                )
-            elif event_type == "copilotStatusUpdate" and line.startswith("data:"):
-                event_name = "copilotStatusUpdate"
-                data_payload = line.split("data:")[1].strip()
-                data_dict_ = json.loads(data_payload)
-                self.events.append(
-                    CopilotEvent(event_type=event_name, content=data_dict_)
-                )
-            elif event_type == "copilotPromptSuggestions" and line.startswith("data:"):
-                event_name = "copilotPromptSuggestions"
-                data_payload = line.split("data:")[1].strip()
-                data_dict_ = json.loads(data_payload)
-                self.events.append(
-                    CopilotEvent(event_type=event_name, content=data_dict_)
-                )
-            elif event_type == "copilotCitationCollection" and line.startswith("data:"):
-                event_name = "copilotCitationCollection"
-                data_payload = line.split("data:")[1].strip()
-                data_dict_ = json.loads(data_payload)
-                self.events.append(
-                    CopilotEvent(event_type=event_name, content=data_dict_)
-                )
+        self.feed(self.event_stream)
+        self.close()
+
+    def feed(self, chunk: bytes | str) -> None:
+        """Parse a chunk of the stream."""
+        for event_type, data in self._parser.feed(chunk):
+            self._handle(event_type, data)
+
+    def close(self) -> None:
+        """Parse the end of the stream."""
+        for event_type, data in self._parser.close():
+            self._handle(event_type, data)
+        self._close_message()
+
+    def _handle(self, event_type: str, data: str) -> None:
+        if event_type == "copilotMessageChunk":
+            delta = _decode_payload(data)["delta"]
+            if self._message is None:
+                self._message = CopilotEvent(event_type="copilotMessage", content="")
+                self._append(self._message)
+            self._message_parts.append(delta)
+            self._text_parts.append(delta)
+        elif event_type in _EVENT_TYPES:
+            self._close_message()
+            self._append(
+                CopilotEvent(event_type=event_type, content=_decode_payload(data))
+            )
+
+    def _append(self, event: CopilotEvent) -> None:
+        self._events.append(event)
+        self._events_by_type.setdefault(event.event_type, []).append(event)
+
+    def _sync_message(self) -> None:
+        if self._message is not None and self._message_parts:
+            self._message_parts = ["".join(self._message_parts)]
+            self._message.content = self._message_parts[0]
+
+    def _close_message(self) -> None:
+        self._sync_message()
+        self._message = None
+        self._message_parts = []
+
+    def _of_type(self, event_type: str) -> list[CopilotEvent]:
+        return self._events_by_type.get(event_type, [])
+
+    @property
+    def events(self) -> list[CopilotEvent]:
+        self._sync_message()
+        return self._events
 
     @property
     def text(self) -> str:
-        return "".join(
-            str(event.content)
-            for event in self.events
-            if event.event_type == "copilotMessage"
-        )
+        if len(self._text_parts) > 1:
+            self._text_parts = ["".join(self._text_parts)]
+        return self._text_parts[0] if self._text_parts else ""
 
     @property
     def function_calls(self) -> list[CopilotEvent]:
-        return [
-            event for event in self.events if event.event_type == "copilotFunctionCall"
-        ]
+        return self._of_type("copilotFunctionCall")
 
     @property
     def citations(self) -> list[CopilotEvent]:
-        return [
-            event
-            for event in self.events
-            if event.event_type == "copilotCitationCollection"
-        ]
+        return self._of_type("copilotCitationCollection")
 
     @property
     def prompt_suggestions(self) -> list[CopilotEvent]:
-        return [
-            event
-            for event in self.events
-            if event.event_type == "copilotPromptSuggestions"
-        ]
+        return self._of_type("copilotPromptSuggestions")
 
     def __iter__(self):
         return self
@@ -189,16 +316,10 @@ def capture_stream_response(event_stream: str) -> tuple[str, str]:
         data_payload = lines[1].split("data:")[-1].strip()
         return event_name, data_payload
 
-    captured_stream = ""
-    event_name = ""
-    event_type = ""  # Initialize event_type
-    lines = event_stream.split("\n")
-    for line in lines:
-        if line.startswith("event:"):
-            event_type = line.split("event:")[1].strip()
-        if event_type == "copilotMessageChunk" and line.startswith("data:"):
-            event_name = "copilotMessageChunk"
-            data_payload = line.split("data:")[1].strip()
-            data_dict_ = literal_eval(data_payload)
-            captured_stream += data_dict_["delta"]
-    return event_name, captured_stream
+    parser = SSEParser()
+    deltas = [
+        _decode_payload(data)["delta"]
+        for event_type, data in [*parser.feed(event_stream), *parser.close()]
+        if event_type == "copilotMessageChunk"
+    ]
+    return ("copilotMessageChunk" if deltas else ""), "".join(deltas)
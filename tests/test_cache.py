@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from openbb_ai.cache import ValidationCache
+from openbb_ai.models import QueryRequest
+from openbb_ai.spill import SpilledPayload, SpillStore
+
+
+def _body(n_turns: int) -> dict:
+    messages: list[dict] = []
+    for i in range(n_turns):
+        messages.append({"role": "human", "content": f"Question {i}"})
+        messages.append(
+            {
+                "role": "ai",
+                "content": json.dumps(
+                    {"function": "get_widget_data", "input_arguments": {}}
+                ),
+            }
+        )
+        messages.append(
+            {
+                "role": "tool",
+                "function": "get_widget_data",
+                "input_arguments": {},
+                "data": [{"items": [{"content": json.dumps([{"close": i}])}]}],
+            }
+        )
+    return {
+        "messages": messages,
+        "context": [
+            {
+                "uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+                "name": "Prices",
+                "description": "Daily prices.",
+                "data": {"items": [{"content": "[]"}]},
+            }
+        ],
+    }
+
+
+def test_validate_request_reuses_previous_turns():
+    cache = ValidationCache()
+    first = cache.validate_request(json.dumps(_body(1)))
+    assert cache.info().misses == 4
+
+    body = json.dumps(_body(2))
+    second = cache.validate_request(body)
+
+    assert second == QueryRequest.model_validate_json(body)
+    info = cache.info()
+    # The second turn's AI message is the same as the first one's.
+    assert (info.hits, info.misses, info.currsize) == (5, 6, 6)
+    # Plain messages are shared, and items with state are copied.
+    assert second.messages[0] is first.messages[0]
+    assert second.context[0] == first.context[0]  # type: ignore[index]
+    assert second.context[0] is not first.context[0]  # type: ignore[index]
+
+
+def test_cached_items_with_state_are_not_shared():
+    cache = ValidationCache()
+    first = cache.validate_request(_body(1))
+    first_item = first.context[0].data.items[0]  # type: ignore[index]
+    first_item.decoded()
+    with SpillStore(threshold=0) as store:
+        first.spill(store)
+        assert isinstance(first_item.content, SpilledPayload)
+
+        second = cache.validate_request(_body(1))
+        second_item = second.context[0].data.items[0]  # type: ignore[index]
+        assert second_item.content == "[]"
+        assert second_item._decoded is None
+        assert second.messages[2] is not first.messages[2]
+
+
+def test_validate_request_errors():
+    cache = ValidationCache()
+    body = _body(1)
+    body["messages"][2]["data"] = "not a list"
+
+    with pytest.raises(ValidationError) as error:
+        cache.validate_request(body)
+    assert error.value.errors()[0]["loc"][:2] == ("messages", 2)
+
+    with pytest.raises(ValidationError, match="messages list cannot be empty"):
+        cache.validate_request({"messages": []})
+
+
+def test_cache_is_bounded():
+    cache = ValidationCache(maxsize=2)
+    cache.validate_request(_body(1))
+
+    assert cache.info().currsize == 2
+    # The oldest items were evicted.
+    cache.validate_request(_body(1))
+    assert cache.info().hits == 0
+    cache.clear()
+    assert cache.info() == (0, 0, 2, 0)
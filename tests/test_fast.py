@@ -0,0 +1,153 @@
+import json
+import uuid
+
+import pytest
+
+from openbb_ai.helpers import (
+    chart,
+    citations,
+    cite,
+    message_chunk,
+    reasoning_step,
+    table,
+)
+from openbb_ai.models import QueryRequest, Widget, WidgetParam
+
+msgspec = pytest.importorskip("msgspec")
+fast = pytest.importorskip("openbb_ai.fast")
+
+
+def _request_body() -> dict:
+    return {
+        "messages": [
+            {"role": "human", "content": "What is the price of AAPL?"},
+            {
+                "role": "ai",
+                "content": json.dumps(
+                    {"function": "get_widget_data", "input_arguments": {"a": 1}}
+                ),
+            },
+            {
+                "role": "tool",
+                "function": "get_widget_data",
+                "input_arguments": {},
+                "data": [
+                    {
+                        "items": [
+                            {
+                                "content": "[]",
+                                "data_format": {
+                                    "data_type": "object",
+                                    "parse_as": "table",
+                                },
+                            }
+                        ]
+                    },
+                    {
+                        "items": [
+                            {
+                                "url": "https://example.com/report.pdf",
+                                "data_format": {
+                                    "data_type": "pdf",
+                                    "filename": "report.pdf",
+                                },
+                            }
+                        ]
+                    },
+                    {"error_type": "not_found", "content": "Not found."},
+                    {"status": "success"},
+                ],
+            },
+        ],
+        "context": [
+            {
+                "uuid": str(uuid.UUID(int=1)),
+                "name": "Context",
+                "description": "Raw context.",
+                "data": {"items": [{"content": "text"}]},
+            }
+        ],
+        "widgets": {
+            "primary": [
+                {
+                    "origin": "OpenBB API",
+                    "widget_id": "eod_price",
+                    "name": "Price",
+                    "description": "Price data.",
+                    "params": [
+                        {"name": "symbol", "type": "ticker", "description": "Ticker"}
+                    ],
+                }
+            ]
+        },
+        "workspace_state": {
+            "agents": [
+                {"id": "a", "name": "A", "features": {"x": True, "y": {"label": "Y"}}}
+            ]
+        },
+    }
+
+
+def test_decode_query_request_matches_pydantic():
+    body = json.dumps(_request_body())
+
+    decoded = fast.decode_query_request(body)
+    expected = QueryRequest.model_validate_json(body)
+
+    assert isinstance(decoded.messages[1].content, fast.LlmClientFunctionCall)
+    assert [type(item).__name__ for item in decoded.messages[2].data] == [
+        "DataContent",
+        "DataFileReferences",
+        "ClientFunctionCallError",
+        "ClientCommandResult",
+    ]
+    assert decoded.widgets.primary[0].uuid == expected.widgets.primary[0].uuid
+    assert fast.to_pydantic(decoded).model_dump_json() == expected.model_dump_json()
+
+
+def test_from_pydantic_round_trip():
+    request = QueryRequest.model_validate(_request_body())
+
+    struct = fast.from_pydantic(request)
+
+    assert fast.to_pydantic(struct).model_dump_json() == request.model_dump_json()
+
+
+def test_decode_query_request_applies_validators():
+    with pytest.raises(msgspec.ValidationError, match="cannot be empty"):
+        fast.decode_query_request(b'{"messages": []}')
+    with pytest.raises(msgspec.ValidationError, match="more than 4"):
+        fast.decode_query_request(
+            json.dumps(
+                {"messages": [{"role": "human", "content": "hi"}], "urls": ["u"] * 5}
+            )
+        )
+
+
+def test_sse_encode_matches_pydantic():
+    widget = Widget(
+        uuid=uuid.UUID(int=1),
+        origin="OpenBB API",
+        widget_id="eod_price",
+        name="Price",
+        description="Price data.",
+        params=[WidgetParam(name="symbol", type="ticker", description="Ticker")],
+    )
+    events = [
+        message_chunk("Hello\nworld"),
+        reasoning_step("Fetching", details={"ticker": "AAPL", "empty": None}),
+        table([{"a": 1, "b": None}], name="Table", description="A table."),
+        chart(
+            type="line",
+            data=[{"x": 1, "y": 2}],
+            x_key="x",
+            y_keys=["y"],
+            name="Chart",
+            description="A chart.",
+        ),
+        citations([cite(widget, {"symbol": "AAPL"})]),
+    ]
+    events[0].id = 7
+
+    for event in events:
+        assert fast.from_pydantic(event).encode() == event.encode()
@@ -0,0 +1,134 @@
+import json
+
+from openbb_ai.fingerprint import canonical_json
+from openbb_ai.helpers import cite
+from openbb_ai.models import QueryRequest, RawContext, Widget
+
+UUID = "3fa85f64-5717-4562-b3fc-2c963f66afa6"
+
+WIDGET = {
+    "origin": "OpenBB API",
+    "widget_id": "eod_price",
+    "name": "Price",
+    "description": "Price data.",
+    "params": [],
+}
+
+
+def _context(**overrides) -> RawContext:
+    return RawContext.model_validate(
+        {
+            "uuid": UUID,
+            "name": "Prices",
+            "description": "Daily prices.",
+            "data": {"items": [{"content": "[]"}]},
+            "metadata": {"symbol": "AAPL", "interval": "1d"},
+            **overrides,
+        }
+    )
+
+
+def _request(n_messages: int, **overrides) -> QueryRequest:
+    return QueryRequest.model_validate(
+        {
+            "messages": [
+                {"role": "human" if i % 2 == 0 else "ai", "content": f"Message {i}"}
+                for i in range(n_messages)
+            ],
+            "widgets": {"primary": [dict(WIDGET)]},
+            **overrides,
+        }
+    )
+
+
+def test_canonical_json():
+    context = _context(uuid=UUID.upper())
+
+    # Keys are sorted, UUIDs normalized, and defaults filled in.
+    assert canonical_json(context) == (
+        b'{"data":{"extra_citations":[],"items":[{"citable":true,"content":"[]",'
+        b'"data_format":{"data_type":"object","parse_as":"table"}}]},'
+        b'"description":"Daily prices.","metadata":{"interval":"1d",'
+        b'"symbol":"AAPL"},"name":"Prices",'
+        b'"uuid":"3fa85f64-5717-4562-b3fc-2c963f66afa6"}'
+    )
+
+
+def test_model_fingerprints():
+    assert _context().fingerprint() == _context(uuid=UUID.upper()).fingerprint()
+    assert (
+        _context().fingerprint()
+        == _context(metadata={"interval": "1d", "symbol": "AAPL"}).fingerprint()
+    )
+    assert _context().fingerprint() != _context(name="Other").fingerprint()
+    assert (
+        _context(metadata=None).fingerprint()
+        == RawContext.model_validate(
+            json.loads(_context().model_dump_json(exclude={"metadata"}))
+        ).fingerprint()
+    )
+
+    widget = Widget.model_validate(WIDGET)
+    assert len(widget.fingerprint()) == 32
+    assert widget.fingerprint() == Widget.model_validate(WIDGET).fingerprint()
+
+    # The random ID of citations isn't part of their fingerprint.
+    first, second = cite(widget, {}), cite(widget, {})
+    assert first.id != second.id
+    assert first.fingerprint() == second.fingerprint()
+
+
+def test_request_fingerprint_chains_messages():
+    previous = _request(4).fingerprint()
+    current = _request(6).fingerprint()
+
+    assert current.messages[:4] == previous.messages
+    assert current.extends(previous)
+    assert not previous.extends(current)
+    assert current.shared_prefix(previous) == 4
+    assert (current.widgets, current.other) == (previous.widgets, previous.other)
+    assert current.digest != previous.digest
+    assert _request(6).fingerprint() == current
+
+    edited = _request(6)
+    edited.messages[2] = edited.messages[3]
+    assert edited.fingerprint().shared_prefix(current) == 2
+
+
+def test_request_fingerprint_parts():
+    request = _request(2)
+    with_context = _request(2, context=[_context().model_dump()])
+    in_other_timezone = _request(2, timezone="Europe/London")
+
+    assert with_context.fingerprint().messages == request.fingerprint().messages
+    assert with_context.fingerprint().context != request.fingerprint().context
+    assert in_other_timezone.fingerprint().other != request.fingerprint().other
+    assert in_other_timezone.fingerprint().digest != request.fingerprint().digest
+
+
+def test_nested_citation_ids_are_not_fingerprinted():
+    citation = {"source_info": {"type": "widget", "name": "Price"}}
+    data = {"items": [{"content": "[]"}], "extra_citations": [citation]}
+    body = json.dumps(
+        {
+            "messages": [
+                {"role": "human", "content": "Hi"},
+                {
+                    "role": "tool",
+                    "function": "get_widget_data",
+                    "input_arguments": {},
+                    "data": [data],
+                },
+            ],
+            "context": [
+                {"uuid": UUID, "name": "Prices", "description": "", "data": data}
+            ],
+        }
+    )
+
+    first = QueryRequest.model_validate_json(body)
+    second = QueryRequest.model_validate_json(body)
+    assert first.context[0].data.extra_citations[0].id != (
+        second.context[0].data.extra_citations[0].id
+    )
+    assert first.fingerprint() == second.fingerprint()
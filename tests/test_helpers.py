@@ -1,8 +1,23 @@
-from openbb_ai.helpers import chart, prompt_suggestions, reasoning_step, table
+import uuid
+
+import pytest
+from pydantic import ValidationError
+
+from openbb_ai.helpers import (
+    chart,
+    citations,
+    message_chunk,
+    prompt_suggestions,
+    reasoning_step,
+    table,
+    trusted_mode,
+)
 from openbb_ai.models import (
+    Citation,
     ClientArtifact,
     MessageArtifactSSE,
     PromptSuggestionsSSE,
+    SourceInfo,
     StatusUpdateSSE,
 )
 
@@ -159,3 +174,41 @@ def test_table():
     assert result.data.type == "table"
     assert result.data.name == "My Table"
     assert result.data.description == "This is a table of the data"
+
+
+def test_trusted_mode_matches_validated_events():
+    data = [{"x": 1, "y": 2}, {"x": 2, "y": 3}]
+    builders = [
+        lambda: reasoning_step("Step", details={"ticker": "AAPL", "uuid": "1"}),
+        lambda: message_chunk("Hello"),
+        lambda: citations(
+            [Citation(id=uuid.UUID(int=1), source_info=SourceInfo(type="web"))]
+        ),
+        lambda: table(data=data, name="Table", description="A table"),
+        lambda: chart(type="line", data=data, x_key="x", y_keys=["y"], name="Chart"),
+    ]
+
+    for build in builders:
+        validated = build()
+        with trusted_mode():
+            trusted = build()
+        if isinstance(validated, MessageArtifactSSE):
+            trusted.data.uuid = validated.data.uuid
+        assert type(trusted) is type(validated)
+        assert trusted.encode() == validated.encode()
+
+
+def test_trusted_mode_is_scoped():
+    with trusted_mode():
+        with trusted_mode(enabled=False):
+            with pytest.raises(ValidationError):
+                table(data=[1, 2, 3])  # type: ignore[list-item]
+        trusted = table(data=[1, 2, 3])  # type: ignore[list-item]
+
+    assert trusted.data.content == [1, 2, 3]
+
+
+def test_trusted_mode_validates_sampled_events():
+    with trusted_mode(validate_every=1):
+        with pytest.raises(ValidationError):
+            table(data=[1, 2, 3])  # type: ignore[list-item]
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+
+def _self_import_times_us(statement: str) -> dict[str, int]:
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, module = line.removeprefix("import time:").split("|")
+        times[module.strip()] = int(self_us)
+    return times
+
+
+def test_import_is_lazy():
+    times = _self_import_times_us("import openbb_ai")
+
+    assert "openbb_ai" in times
+    assert "openbb_ai.models" not in times
+    assert "pydantic" not in times
+
+
+def _imported_modules(statement: str) -> set[str]:
+    result = subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-c",
+            f"{statement}\nimport sys\nprint('\\n'.join(sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.splitlines())
+
+
+def test_helpers_import_only_what_they_need():
+    modules = _imported_modules("from openbb_ai import message_chunk, QueryRequest")
+
+    assert {"openbb_ai.helpers", "openbb_ai.models"} <= modules
+    # Only needed to hash requests.
+    assert "openbb_ai.fingerprint" not in modules
+    assert "xxhash" not in modules
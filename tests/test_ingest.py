@@ -0,0 +1,190 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from openbb_ai.ingest import JsonScanner, RequestReader
+from openbb_ai.models import QueryRequest
+
+WIDGET = {
+    "origin": "OpenBB API",
+    "widget_id": "eod_price",
+    "name": "Price",
+    "description": "Price data.",
+    "params": [],
+}
+
+CONTEXT = [
+    {
+        "uuid": f"3fa85f64-5717-4562-b3fc-2c963f66afa{i}",
+        "name": f"Prices {i}",
+        "description": "Daily prices.",
+        "data": {"items": [{"content": json.dumps([{"close": 1.0}] * 100)}]},
+    }
+    for i in range(3)
+]
+
+BODY = json.dumps(
+    {
+        "messages": [
+            {"role": "human", "content": 'What is the "price"?'},
+            {"role": "ai", "content": "Let me check."},
+        ],
+        "widgets": {"primary": [WIDGET]},
+        "timezone": "Europe/London",
+        "context": CONTEXT,
+    }
+).encode()
+
+
+def _chunks(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 1000])
+def test_scanner_finds_values_across_chunks(size):
+    document = {"a": [1, {"b": None}, 'c\\"d'], "e": -1.5e3, "f": {}, "g": "é"}
+    raw = json.dumps(document, ensure_ascii=False).encode()
+
+    scanner = JsonScanner(depth=2)
+    values = [value for chunk in _chunks(raw, size) for value in scanner.feed(chunk)]
+
+    assert scanner.done
+    found = {
+        value.path: json.loads(scanner.buffer[value.start : value.end])
+        for value in values
+    }
+    assert found == {
+        ("a", 0): 1,
+        ("a", 1): {"b": None},
+        ("a", 2): 'c\\"d',
+        ("a",): document["a"],
+        ("e",): -1500.0,
+        ("f",): {},
+        ("g",): "é",
+        (): document,
+    }
+
+
+@pytest.mark.parametrize(
+    "raw", [b'{"a" 1}', b'{"a": 1,}', b"[1 2]", b"[,1]", b'{"a": 1]', b"{} {}", b"1,"]
+)
+def test_scanner_rejects_invalid_json(raw):
+    with pytest.raises(ValueError):
+        JsonScanner().feed(raw)
+
+
+def test_fields_are_available_before_the_end_of_the_body():
+    context_start = BODY.index(b'"context"')
+
+    async def run():
+        reader = RequestReader()
+        for chunk in _chunks(BODY[:context_start], 50):
+            reader.feed(chunk)
+
+        messages = await reader.field("messages")
+        assert [message.content for message in messages][-1] == "Let me check."
+        assert (await reader.field("widgets")).primary[0].widget_id == "eod_price"
+        assert await reader.field("timezone") == "Europe/London"
+
+        async def feed_rest():
+            for chunk in _chunks(BODY[context_start:], 1000):
+                await asyncio.sleep(0)
+                reader.feed(chunk)
+            reader.close()
+
+        task = asyncio.create_task(feed_rest())
+        names = [context.name async for context in reader.context()]
+        await task
+        assert names == ["Prices 0", "Prices 1", "Prices 2"]
+        # Missing fields have their default value, once the body is read.
+        assert await reader.field("workspace_options") == {}
+        with pytest.raises(IndexError):
+            await reader.context_item(3)
+        return await reader.request()
+
+    assert asyncio.run(run()) == QueryRequest.model_validate_json(BODY)
+
+
+def test_read_from_stream():
+    async def stream():
+        for chunk in _chunks(BODY, 100):
+            yield chunk
+
+    async def run():
+        return await RequestReader().read(stream())
+
+    assert asyncio.run(run()) == QueryRequest.model_validate_json(BODY)
+
+
+def _summary(error: ValidationError) -> list[tuple]:
+    return [(error["type"], error["loc"], error["msg"]) for error in error.errors()]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        BODY.replace(b'"human"', b'"robot"'),
+        BODY.replace(b'"Prices 1"', b"1"),
+        BODY.replace(b'"messages": [', b'"messages": []+['),
+        BODY[:-10],
+        b'{"messages": []}',
+        b'{"messages": "Hi", "context": {}}',
+    ],
+    ids=["message", "context", "json", "truncated", "empty", "types"],
+)
+def test_errors_match_full_validation(body):
+    with pytest.raises(ValidationError) as expected:
+        QueryRequest.model_validate_json(body)
+
+    async def run():
+        reader = RequestReader()
+        for chunk in _chunks(body, 100):
+            reader.feed(chunk)
+        reader.close()
+        return await reader.request()
+
+    with pytest.raises(ValidationError) as raised:
+        asyncio.run(run())
+    # Invalid JSON is detected (and reported) before the end of the body.
+    assert _summary(raised.value) == _summary(expected.value)
+
+
+@pytest.mark.parametrize(
+    "name, body",
+    [
+        ("messages", b'{"messages": [], "timezone": "UTC", '),
+        ("urls", b'{"urls": ["a", "b", "c", "d", "e"], "timezone": "UTC", '),
+    ],
+    ids=["empty_messages", "too_many_urls"],
+)
+def test_fields_are_validated_like_the_request(name, body):
+    async def run():
+        reader = RequestReader()
+        reader.feed(body)
+        # The field is complete, but invalid: it isn't returned.
+        field = asyncio.ensure_future(reader.field(name))
+        timezone = await reader.field("timezone")
+        assert timezone == "UTC"
+        assert not field.done()
+        reader.feed(b'"force_web_search": true}')
+        await asyncio.wait([field])
+        return field.result()
+
+    with pytest.raises(ValidationError) as raised:
+        asyncio.run(run())
+    assert name in {error["loc"][0] for error in raised.value.errors()}
+
+
+def test_fields_raise_the_error_of_the_request():
+    async def run():
+        reader = RequestReader()
+        reader.feed(b'{"timezone": "UTC", "messages": "Hi"}')
+        with pytest.raises(ValidationError):
+            await reader.request()
+        # The field is valid, but the request isn't.
+        return await reader.field("timezone")
+
+    with pytest.raises(ValidationError):
+        asyncio.run(run())
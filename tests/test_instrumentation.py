@@ -0,0 +1,220 @@
+import asyncio
+
+import pytest
+
+from openbb_ai import instrumentation
+from openbb_ai.helpers import get_widget_data, message_chunk, reasoning_step, table
+from openbb_ai.instrumentation import (
+    CallbackSink,
+    InMemorySink,
+    PrometheusSink,
+    SpanSink,
+    instrument,
+    set_sink,
+)
+from openbb_ai.models import Widget, WidgetRequest
+from openbb_ai.responses import encode_event
+
+WIDGET = Widget(
+    origin="OpenBB API",
+    widget_id="eod_price",
+    name="Price",
+    description="Price data.",
+    params=[],
+)
+
+
+EVENTS = [
+    reasoning_step("Fetching data"),
+    message_chunk("The price "),
+    table([{"date": "2024-01-01", "close": 1.0}], name="Prices"),
+    message_chunk("is up."),
+    get_widget_data([WidgetRequest(widget=WIDGET, input_arguments={})]),
+]
+
+
+async def _generate(fail: bool = False):
+    for event in EVENTS:
+        await asyncio.sleep(0.001)
+        yield event
+    if fail:
+        raise RuntimeError("boom")
+
+
+def _consume(events) -> list:
+    async def run():
+        return [event async for event in events]
+
+    return asyncio.run(run())
+
+
+def test_instrument_without_sink_is_a_no_op():
+    events = _generate()
+    assert instrument(events) is events
+    _consume(events)
+
+
+def test_instrument_records_stream_stats():
+    sink = InMemorySink()
+    passed_through = _consume(instrument(_generate(), sink, stream_id="abc"))
+
+    assert passed_through == EVENTS
+    (stats,) = sink.streams
+    assert stats.stream_id == "abc"
+    assert stats.completed and stats.error is None
+    assert stats.events == {
+        "copilotStatusUpdate": 1,
+        "copilotMessageChunk": 2,
+        "copilotMessageArtifact": 1,
+        "copilotFunctionCall": 1,
+    }
+    # SSE models aren't encoded again just to be measured.
+    assert stats.bytes == {}
+    assert (
+        0
+        < stats.time_to_first_event
+        < stats.time_to_first_chunk
+        < stats.time_to_first_artifact
+        < stats.time_to_last_function_call
+        <= stats.duration
+    )
+    assert stats.max_gap > 0
+    assert [event.event_type for event in sink.events] == [
+        "copilotStatusUpdate",
+        "copilotMessageChunk",
+        "copilotMessageArtifact",
+        "copilotMessageChunk",
+        "copilotFunctionCall",
+    ]
+    assert [event.first for event in sink.events] == [True] + [False] * 4
+    assert [event.first_of_type for event in sink.events] == [
+        True,
+        True,
+        True,
+        False,
+        True,
+    ]
+
+
+def test_instrument_measures_dict_events_in_bytes():
+    sink = InMemorySink()
+    event = {"event": "copilotMessageChunk", "data": '{"delta":"€"}'}
+
+    async def generate():
+        yield event
+
+    _consume(instrument(generate(), sink))
+
+    assert sink.events[0].size == len(event["data"].encode()) == 15
+
+
+def test_instrument_encode_and_default_sink():
+    received = []
+    set_sink(CallbackSink(received.append))
+    try:
+        passed_through = _consume(instrument(_generate(), encode=True))
+    finally:
+        set_sink(None)
+
+    assert passed_through == [encode_event(event) for event in EVENTS]
+    assert sum(received[0].bytes.values()) == sum(map(len, passed_through))
+    assert received[0].bytes["copilotMessageChunk"] == sum(
+        len(encode_event(event)) for event in EVENTS[1:4:2]
+    )
+
+
+def test_instrument_records_errors():
+    sink = InMemorySink()
+    with pytest.raises(RuntimeError):
+        _consume(instrument(_generate(fail=True), sink))
+
+    (stats,) = sink.streams
+    assert not stats.completed
+    assert stats.error == "RuntimeError: boom"
+
+
+class _Metric:
+    def __init__(self):
+        self.values: dict[str, list[float]] = {}
+        self._label = ""
+
+    def labels(self, **labels):
+        self._label = ",".join(labels.values())
+        return self
+
+    def observe(self, value=1.0):
+        self.values.setdefault(self._label, []).append(value)
+
+    inc = observe
+
+
+def test_prometheus_sink():
+    latency, events, size, gaps = _Metric(), _Metric(), _Metric(), _Metric()
+    _consume(instrument(_generate(), PrometheusSink(latency, events, size, gaps)))
+
+    assert set(latency.values) == {
+        "first_event",
+        "first_chunk",
+        "first_artifact",
+        "last_function_call",
+        "duration",
+    }
+    assert len(events.values["copilotMessageChunk"]) == 2
+    assert len(gaps.values[""]) == 4
+
+
+class _Span:
+    def __init__(self):
+        self.events: list[str] = []
+        self.attributes: dict = {}
+        self.ended = False
+
+    def add_event(self, name, attributes):
+        self.events.append(name)
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self):
+        self.ended = True
+
+
+class _Tracer:
+    def __init__(self):
+        self.spans: list[_Span] = []
+
+    def start_span(self, name, attributes):
+        self.spans.append(_Span())
+        return self.spans[-1]
+
+
+def test_sinks_do_not_compare_times(monkeypatch):
+    # Every event at the same time, as with a coarse clock.
+    monkeypatch.setattr(instrumentation.time, "perf_counter", lambda: 1.0)
+    tracer, gaps = _Tracer(), _Metric()
+    _consume(instrument(_generate(), SpanSink(tracer)))
+    _consume(instrument(_generate(), PrometheusSink(_Metric(), gaps=gaps)))
+
+    assert tracer.spans[0].events == [
+        "first_event",
+        "first_chunk",
+        "first_artifact",
+        "function_call",
+    ]
+    assert len(gaps.values[""]) == 4
+
+
+def test_span_sink():
+    tracer = _Tracer()
+    _consume(instrument(_generate(), SpanSink(tracer)))
+
+    (span,) = tracer.spans
+    assert span.ended
+    assert span.events == [
+        "first_event",
+        "first_chunk",
+        "first_artifact",
+        "function_call",
+    ]
+    assert span.attributes["openbb_ai.events.copilotMessageChunk"] == 2
+    assert span.attributes["openbb_ai.completed"] is True
@@ -0,0 +1,163 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from openbb_ai.ingest import RequestReader, check_request, validate_request
+from openbb_ai.limits import RequestLimits
+from openbb_ai.models import LlmClientFunctionCall, LlmClientMessage, QueryRequest
+
+MESSAGES = [
+    {"role": "human", "content": "Summarize the report. " * 1000},
+    {
+        "role": "tool",
+        "function": "get_widget_data",
+        "input_arguments": {"data_sources": [{"input_args": {"symbol": "AAPL"}}]},
+        "data": [{"items": [{"content": json.dumps([{"close": 1.0}] * 1000)}]}],
+    },
+]
+BODY = json.dumps({"messages": MESSAGES, "timezone": "Europe/London"}).encode()
+
+
+def _read(body: bytes, limits: RequestLimits) -> QueryRequest:
+    async def stream():
+        yield body
+
+    return asyncio.run(RequestReader(limits).read(stream()))
+
+
+# The ways of enforcing limits, which must agree.
+CHECKS = [check_request, validate_request, _read]
+
+
+def _error(body: bytes, check=check_request, **limits) -> tuple:
+    with pytest.raises(ValidationError) as raised:
+        check(body, RequestLimits(**limits))
+    (error,) = raised.value.errors()
+    return error["type"], error["loc"], error["ctx"]
+
+
+def test_normal_requests_pass_the_default_limits():
+    check_request(BODY, RequestLimits())
+    # Invalid JSON is left to validation.
+    check_request(BODY[:-10], RequestLimits())
+
+
+def test_validate_request():
+    assert validate_request(BODY, RequestLimits()) == (
+        QueryRequest.model_validate_json(BODY)
+    )
+    with pytest.raises(ValidationError) as expected:
+        QueryRequest.model_validate_json(BODY[:-10])
+    with pytest.raises(ValidationError) as raised:
+        validate_request(BODY[:-10], RequestLimits())
+    assert raised.value.errors() == expected.value.errors()
+
+
+@pytest.mark.parametrize(
+    "limits, expected",
+    [
+        ({"max_body_bytes": 1000}, ("body_too_large", (), {"max_bytes": 1000})),
+        ({"max_messages": 1}, ("too_long", ("messages",), {"max_length": 1})),
+        (
+            {"max_depth": 6},
+            (
+                "too_deep",
+                ("messages", 1, "input_arguments", "data_sources", 0, "input_args"),
+                {"max_depth": 6},
+            ),
+        ),
+        (
+            {"max_string_length": 14},
+            ("string_too_long", ("messages", 1, "function"), {"max_length": 14}),
+        ),
+        (
+            {"max_string_lengths": {"messages.*.content": None, "timezone": 5}},
+            ("string_too_long", ("timezone",), {"max_length": 5}),
+        ),
+        (
+            {"max_string_lengths": {"messages.*.content": 100}},
+            ("string_too_long", ("messages", 0, "content"), {"max_length": 100}),
+        ),
+        (
+            {"max_string_lengths": {"messages.*.data.*.items.*.content": 100}},
+            (
+                "string_too_long",
+                ("messages", 1, "data", 0, "items", 0, "content"),
+                {"max_length": 100},
+            ),
+        ),
+    ],
+    ids=["body", "messages", "depth", "string", "path", "content", "data"],
+)
+@pytest.mark.parametrize("check", CHECKS)
+def test_limits(check, limits, expected):
+    assert _error(BODY, check, **limits) == expected
+
+
+@pytest.mark.parametrize("check", CHECKS)
+def test_strings_are_measured_once_decoded(check):
+    # 3 characters, 18 bytes of JSON and 6 bytes of UTF-8.
+    body = json.dumps({"messages": MESSAGES, "timezone": "\u00e9" * 3}).encode()
+
+    check(body, RequestLimits(max_string_lengths={"timezone": 6}))
+    assert _error(body, check, max_string_lengths={"timezone": 5}) == (
+        "string_too_long",
+        ("timezone",),
+        {"max_length": 5},
+    )
+
+
+def test_content_is_only_exempt_at_known_paths():
+    arguments = {"content": "x" * 200, "items": [{"content": "x" * 200}]}
+    message = {**MESSAGES[1], "input_arguments": arguments}
+    body = json.dumps({"messages": [MESSAGES[0], message]}).encode()
+
+    assert _error(body, max_string_length=100) == (
+        "string_too_long",
+        ("messages", 1, "input_arguments", "content"),
+        {"max_length": 100},
+    )
+    check_request(body, RequestLimits(max_string_length=200))
+
+
+def test_context_items_limit():
+    context = {"uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6", "name": "", "data": {}}
+    body = json.dumps({"messages": MESSAGES, "context": [context] * 3}).encode()
+
+    assert _error(body, max_context_items=2) == (
+        "too_long",
+        ("context",),
+        {"max_length": 2},
+    )
+
+
+def test_reader_rejects_requests_as_soon_as_a_limit_is_exceeded():
+    chunks_read = 0
+
+    async def stream():
+        nonlocal chunks_read
+        for start in range(0, len(BODY), 100):
+            chunks_read += 1
+            yield BODY[start : start + 100]
+
+    async def run():
+        return await RequestReader(RequestLimits(max_depth=4)).read(stream())
+
+    with pytest.raises(ValidationError) as raised:
+        asyncio.run(run())
+    (error,) = raised.value.errors()
+    assert error["type"] == "too_deep"
+    assert error["loc"] == ("messages", 1, "input_arguments", "data_sources")
+    assert chunks_read < len(BODY) // 100
+
+
+def test_parse_content():
+    call = {"function": "get_widget_data", "input_arguments": {}}
+
+    for content in (json.dumps(call), json.dumps(json.dumps(call))):
+        message = LlmClientMessage(role="ai", content=content)
+        assert isinstance(message.content, LlmClientFunctionCall)
+    for content in ("Hello", '"Hello"', "[1]", "{not json"):
+        assert LlmClientMessage(role="ai", content=content).content == content
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+from openbb_ai.helpers import get_widget_data, message_chunk, reasoning_step
+from openbb_ai.loadtest import Percentiles, run_load_test
+from openbb_ai.models import (
+    LlmClientFunctionCallResultMessage,
+    QueryRequest,
+    WidgetRequest,
+)
+from openbb_ai.responses import SSEResponse
+
+
+async def agent_app(scope, receive, send):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    request = QueryRequest.model_validate_json(body)
+
+    async def events():
+        last_message = request.messages[-1]
+        if isinstance(last_message, LlmClientFunctionCallResultMessage):
+            assert last_message.data[0].items[0].content.startswith("[")
+            for word in ("The ", "price ", "is ", "up."):
+                await asyncio.sleep(0.001)
+                yield message_chunk(word)
+        else:
+            yield reasoning_step("Fetching data")
+            widget = request.widgets.primary[0]
+            yield get_widget_data([WidgetRequest(widget=widget, input_arguments={})])
+
+    await SSEResponse(events())(scope, receive, send)
+
+
+def _request(i: int) -> dict:
+    return {
+        "messages": [{"role": "human", "content": f"Question {i}"}],
+        "widgets": {
+            "primary": [
+                {
+                    "origin": "OpenBB API",
+                    "widget_id": "eod_price",
+                    "name": "Price",
+                    "description": "Price data.",
+                    "params": [],
+                }
+            ]
+        },
+    }
+
+
+def test_run_load_test_answers_widget_data_round_trips():
+    report = asyncio.run(
+        run_load_test(
+            agent_app, [_request(i) for i in range(3)], concurrency=2, turns=5
+        )
+    )
+
+    assert report.turns == 5
+    assert report.errors == 0
+    assert all(result.round_trips == 1 for result in report.results)
+    assert report.time_to_first_chunk.count == 5
+    assert report.time_to_first_event.p50 <= report.time_to_first_chunk.p50
+    assert report.chunk_inter_arrival.count == 5 * 3
+    assert set(report.bytes_by_event_type) == {
+        "copilotStatusUpdate",
+        "copilotFunctionCall",
+        "copilotMessageChunk",
+    }
+    assert report.total_bytes == sum(report.bytes_by_event_type.values())
+    assert report.events_per_second > 0
+    json.loads(report.model_dump_json())
+
+
+def test_run_load_test_records_errors():
+    report = asyncio.run(run_load_test(agent_app, [{"messages": []}]))
+
+    assert report.errors == 1
+    assert report.results[0].error is not None
+
+
+def test_percentiles():
+    percentiles = Percentiles.of([float(i) for i in range(1, 101)])
+
+    assert (percentiles.p50, percentiles.p90, percentiles.max) == (51.0, 91.0, 100.0)
+    assert Percentiles.of([]).count == 0
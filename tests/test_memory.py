@@ -0,0 +1,118 @@
+import json
+import logging
+
+from openbb_ai.memory import log_memory_report, memory_report
+from openbb_ai.models import QueryRequest
+from openbb_ai.spill import SpilledPayload, SpillStore
+
+WIDGET = {
+    "origin": "OpenBB API",
+    "widget_id": "eod_price",
+    "name": "Price",
+    "description": "Price data.",
+    "params": [],
+}
+
+ROWS = json.dumps(
+    [{"date": f"2024-01-{i % 28 + 1:02d}", "close": i} for i in range(5000)]
+)
+
+REQUEST = {
+    "messages": [
+        {"role": "human", "content": "What is the price of AAPL?"},
+        {
+            "role": "ai",
+            "content": json.dumps(
+                {"function": "get_widget_data", "input_arguments": {}}
+            ),
+        },
+        {
+            "role": "tool",
+            "function": "get_widget_data",
+            "input_arguments": {},
+            "data": [{"items": [{"content": "[]"}]}],
+        },
+    ],
+    "context": [
+        {
+            "uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+            "name": "Prices",
+            "description": "Daily prices.",
+            "data": {"items": [{"content": ROWS}]},
+        }
+    ],
+    "widgets": {"primary": [WIDGET], "secondary": [WIDGET, WIDGET]},
+    "tools": [{"name": "search", "url": "http://localhost/search"}],
+    "urls": ["https://openbb.co"],
+}
+
+BODY = json.dumps(REQUEST)
+
+
+def test_memory_report_by_field_path():
+    for request in (QueryRequest.model_validate_json(BODY), BODY):
+        report = memory_report(request)
+
+        entries = {entry.path: entry for entry in report.entries}
+        assert set(entries) >= {
+            "messages[human]",
+            "messages[ai]",
+            "messages[tool:get_widget_data]",
+            "context[Prices]",
+            "widgets.primary",
+            "widgets.secondary",
+            "tools[search]",
+            "urls",
+        }
+        assert entries["widgets.secondary"].count == 2
+        assert report.top(1)[0].path == "context[Prices]"
+        assert entries["context[Prices]"].bytes > len(ROWS)
+        assert report.total > sum(entry.bytes for entry in report.entries)
+        assert "context[Prices]" in report.format()
+
+    assert report.body_bytes == len(BODY)
+
+
+def test_log_memory_report(caplog):
+    body = BODY.encode()
+
+    with caplog.at_level(logging.WARNING, logger="openbb_ai.memory"):
+        assert log_memory_report(body, threshold=len(body) + 1) is None
+        assert caplog.records == []
+        report = log_memory_report(body, threshold=len(body))
+
+    assert report is not None
+    assert "context[Prices]" in caplog.text
+    parsed = QueryRequest.model_validate_json(BODY)
+    assert log_memory_report(parsed, threshold=10**9) is None
+    assert log_memory_report(REQUEST, threshold=len(body) // 2) is not None
+    assert log_memory_report(parsed, threshold=len(body) // 2) is not None
+    report = log_memory_report(parsed, threshold=len(body), body_bytes=len(body))
+    assert report is not None
+    assert report.body_bytes == len(body)
+
+
+def test_log_memory_report_does_not_read_spilled_payloads(monkeypatch):
+    request = QueryRequest.model_validate_json(BODY)
+    with SpillStore(threshold=1024) as store:
+        request.spill(store)
+        assert len(store) == 1
+
+        def read(self):
+            raise AssertionError("Spilled payloads must not be read.")
+
+        monkeypatch.setattr(SpilledPayload, "read", read)
+        assert log_memory_report(request, threshold=len(ROWS)) is not None
+        assert log_memory_report(request, threshold=len(BODY) + 1) is None
+
+
+def test_memory_report_counts_decoded_content():
+    request = QueryRequest.model_validate_json(BODY)
+    before = memory_report(request).top(1)[0]
+
+    assert request.context is not None
+    request.context[0].data.decoded()
+    after = memory_report(request).top(1)[0]
+
+    assert after.path == before.path == "context[Prices]"
+    assert after.bytes > before.bytes + len(ROWS)
@@ -1,12 +1,26 @@
+import base64
 import uuid
 
+import pytest
+
 from openbb_ai.models import (
     AgentFeatureOption,
     Citation,
     CitationHighlightBoundingBox,
+    DataContent,
+    LlmClientFunctionCallResultMessage,
+    MessageChunkSSE,
+    MessageChunkSSEData,
+    PdfDataFormat,
+    SingleDataContent,
     SourceInfo,
+    StatusUpdateSSE,
+    StatusUpdateSSEData,
     WorkspaceAgent,
+    _sse_data_lines,
 )
+from openbb_ai.responses import encode_event
+from openbb_ai.testing import SSEParser
 
 
 def test_workspace_agent_supports_feature_option_metadata():
@@ -98,3 +112,94 @@ def test_citation_eq():
 
     # Different type
     assert citation_1 != "not a citation"
+
+
+def test_sse_encode_wire_format():
+    event = MessageChunkSSE(data=MessageChunkSSEData(delta="Hello,\nworld!"))
+
+    assert event.encode() == (
+        b'event: copilotMessageChunk\r\ndata: {"delta":"Hello,\\nworld!"}\r\n\r\n'
+    )
+    assert MessageChunkSSE._sse_header == b"event: copilotMessageChunk\r\n"
+
+
+def test_sse_encode_matches_model_dump():
+    event = StatusUpdateSSE(
+        data=StatusUpdateSSEData(eventType="INFO", message="Fetching data")
+    )
+    dumped = event.model_dump()
+
+    assert event.encode() == (
+        f"event: {dumped['event']}\r\ndata: {dumped['data']}\r\n\r\n".encode()
+    )
+
+
+def test_sse_data_lines_splits_multiline_payloads():
+    assert _sse_data_lines("line one\nline two\r\nline three") == (
+        b"data: line one\r\ndata: line two\r\ndata: line three\r\n"
+    )
+
+
+def test_sse_data_lines_round_trip():
+    payload = "line one\u2028still one\x0c\x85\nline two\n"
+    parser = SSEParser()
+    data = encode_event({"event": "copilotMessageChunk", "data": payload})
+
+    assert parser.feed(data) == [("copilotMessageChunk", payload)]
+
+
+def test_sse_event_id():
+    event = MessageChunkSSE(id=3, data=MessageChunkSSEData(delta="Hello"))
+
+    assert event.encode().startswith(b"id: 3\r\nevent: copilotMessageChunk\r\n")
+    assert event.model_dump()["id"] == "3"
+    assert "id" not in MessageChunkSSE(data=event.data).model_dump()
+
+
+def test_data_content_is_decoded_lazily():
+    table = SingleDataContent(content='[{"close": 1.0}]')
+    text = SingleDataContent(content="Not JSON")
+    pdf = SingleDataContent(
+        content=base64.b64encode(b"%PDF-1.7").decode(),
+        data_format=PdfDataFormat(data_type="pdf", filename="report.pdf"),
+    )
+
+    assert table.decoded() == [{"close": 1.0}]
+    assert table.decoded() is table.decoded()
+    assert table == SingleDataContent(content='[{"close": 1.0}]')
+    assert text.decoded() == "Not JSON"
+    assert pdf.decoded() == b"%PDF-1.7"
+    assert pdf.buffer()[:4] == b"%PDF"
+    with pytest.raises(ValueError):
+        table.buffer()
+
+    # Decoded again if the content is replaced, and after being released.
+    first = table.decoded()
+    table.content = "[]"
+    assert table.decoded() == []
+    table.release()
+    assert table._decoded is None
+    assert "_decoded" not in table.model_dump()
+    assert first == [{"close": 1.0}]
+
+
+def test_function_call_result_is_decoded_lazily():
+    message = LlmClientFunctionCallResultMessage.model_validate(
+        {
+            "function": "get_widget_data",
+            "input_arguments": {},
+            "data": [
+                {"items": [{"content": '{"a": 1}'}, {"content": "[1, 2]"}]},
+                {"status": "error", "message": "Widget not found."},
+            ],
+        }
+    )
+
+    decoded = message.decoded()
+    assert decoded[0] == [{"a": 1}, [1, 2]]
+    assert decoded[1] is message.data[1]
+
+    content = message.data[0]
+    assert isinstance(content, DataContent)
+    message.release()
+    assert all(item._decoded is None for item in content.items)
@@ -0,0 +1,96 @@
+import asyncio
+import base64
+import json
+import os
+
+import pytest
+from pydantic import ValidationError
+
+from openbb_ai.models import LlmClientFunctionCallResultMessage, QueryRequest
+from openbb_ai.offload import OffloadPool
+
+TABLE = json.dumps([{"date": "2024-01-01", "close": 180.0}] * 50)
+PDF = base64.b64encode(b"%PDF-1.7" * 100).decode()
+
+BODY = json.dumps(
+    {
+        "messages": [
+            {"role": "human", "content": "Summarize the report."},
+            {
+                "role": "tool",
+                "function": "get_widget_data",
+                "input_arguments": {},
+                "data": [
+                    {
+                        "items": [
+                            {"content": TABLE},
+                            {"content": "[]"},
+                            {
+                                "content": PDF,
+                                "data_format": {
+                                    "data_type": "pdf",
+                                    "filename": "report.pdf",
+                                },
+                            },
+                        ]
+                    }
+                ],
+            },
+        ],
+        "context": [
+            {
+                "uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+                "name": "Prices",
+                "description": "Daily prices.",
+                "data": {"items": [{"content": TABLE}]},
+            }
+        ],
+    }
+).encode()
+
+
+SHM = "/dev/shm"  # noqa: S108
+
+
+def _shared_memory() -> set[str]:
+    return set(os.listdir(SHM)) if os.path.isdir(SHM) else set()
+
+
+def test_small_requests_stay_in_process():
+    with OffloadPool(threshold=len(BODY) + 1) as pool:
+        request = asyncio.run(pool.validate_request(BODY))
+        asyncio.run(pool.decode(request))
+        assert pool._executor is None
+
+    assert request == QueryRequest.model_validate_json(BODY)
+    assert request.context is not None
+    assert request.context[0].data.items[0]._decoded is not None
+
+
+def test_large_requests_are_validated_and_decoded_in_the_pool():
+    before = _shared_memory()
+
+    with OffloadPool(max_workers=1, threshold=1000) as pool:
+        request = asyncio.run(pool.validate_request(BODY, decode=True))
+        assert pool._executor is not None
+
+        assert request == QueryRequest.model_validate_json(BODY)
+        message = request.messages[1]
+        assert isinstance(message, LlmClientFunctionCallResultMessage)
+        table, empty, pdf = message.data[0].items  # type: ignore[union-attr]
+        # Large items come back decoded, small ones are left as they are.
+        assert table._decoded is not None and empty._decoded is None
+        assert table.decoded() == json.loads(TABLE)
+        assert pdf._decoded is not None
+
+        for item in (table, pdf):
+            item.release()
+        asyncio.run(pool.decode(request))
+        assert table.decoded() == json.loads(TABLE)
+        assert empty.decoded() == []
+        assert pdf.decoded() == b"%PDF-1.7" * 100
+
+        with pytest.raises(ValidationError):
+            asyncio.run(pool.validate_request(BODY.replace(b'"human"', b'"robot"')))
+
+    assert _shared_memory() == before
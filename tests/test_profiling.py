@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+from openbb_ai.helpers import citations, cite, message_chunk, reasoning_step, table
+from openbb_ai.models import QueryRequest, Widget
+from openbb_ai.profiling import get_profile, profile
+
+WIDGET = {
+    "origin": "OpenBB API",
+    "widget_id": "eod_price",
+    "name": "Price",
+    "description": "Price data.",
+    "params": [],
+}
+
+REQUEST = {
+    "messages": [{"role": "human", "content": "What is the price of AAPL?"}],
+    "widgets": {"primary": [WIDGET, {**WIDGET, "widget_id": "news"}]},
+}
+
+
+def test_profile_records_validation_encoding_and_helpers():
+    with profile() as p:
+        QueryRequest.model_validate(REQUEST)
+        widget = Widget.model_validate(WIDGET)
+        citations([cite(widget, {}, extra_details={"uuid": "x", "page": 1})]).encode()
+        table([{"x": 1}]).model_dump()
+
+    assert p is not None
+    report = p.report()
+    counts = {(e.phase, e.name): e.count for e in report.entries}
+    assert counts[("validate", "QueryRequest")] == 1
+    # The widgets of the request are timed as part of it.
+    assert counts[("validate", "Widget")] == 1
+    assert counts[("validate", "Citation.exclude_fields")] == 1
+    assert counts[("encode", "CitationCollectionSSE")] == 1
+    assert counts[("encode", "MessageArtifactSSE")] == 1
+    assert counts[("helper", "table")] == 1
+
+    (query_request,) = report.top("validate", n=1)
+    assert query_request.name == "QueryRequest"
+    assert report.profiled == sum(entry.own for entry in report.entries)
+    assert report.profiled + report.other >= report.duration * 0.999
+    assert "QueryRequest" in report.format()
+
+
+def test_validators_are_timed_under_their_own_model():
+    with profile() as p:
+        cite(Widget.model_validate(WIDGET), {}, extra_details={"page": 1})
+        reasoning_step("Fetching", details={"uuid": "x", "page": 1})
+
+    assert p is not None
+    names = {e.name for e in p.report().entries if e.phase == "validate"}
+    assert {
+        "Citation.exclude_fields",
+        "StatusUpdateSSEData.exclude_fields",
+    } <= names
+
+
+def test_profile_is_disabled_by_default():
+    assert get_profile() is None
+    with profile() as p:
+        assert get_profile() is p
+    assert get_profile() is None
+    message_chunk("Hello").encode()
+    assert p is not None and p.report().entries == []
+
+
+def test_validation_has_no_hook_without_a_profile():
+    for model in (QueryRequest, Widget):
+        validators = model.__pydantic_decorators__.model_validators.values()
+        assert all(validator.info.mode != "wrap" for validator in validators)
+
+    # Without the uuid that validating `WIDGET` added to it.
+    widget = {key: value for key, value in WIDGET.items() if key != "uuid"}
+    with profile() as p:
+        Widget.model_validate_json(json.dumps(widget))
+        Widget.model_validate_strings(widget)
+    assert p is not None
+    assert {(e.name, e.count) for e in p.report().entries} == {("Widget", 2)}
+
+
+def test_profile_sample_rate():
+    with profile(sample_rate=0.0) as p:
+        assert p is None
+        assert get_profile() is None
+
+
+def test_profile_is_per_task():
+    async def request(n: int):
+        with profile() as p:
+            for _ in range(n):
+                QueryRequest.model_validate(REQUEST)
+                await asyncio.sleep(0)
+        assert p is not None
+        return p.report()
+
+    async def run():
+        return await asyncio.gather(request(1), request(3))
+
+    first, second = asyncio.run(run())
+    assert first.top("validate", n=1)[0].count == 1
+    assert second.top("validate", n=1)[0].count == 3
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from openbb_ai.helpers import message_chunk, reasoning_step, table
+from openbb_ai.models import QueryRequest
+from openbb_ai.recording import StreamRecorder, StreamRecording, record
+from openbb_ai.testing import CopilotResponse
+
+
+def _request() -> QueryRequest:
+    return QueryRequest.model_validate(
+        {"messages": [{"role": "human", "content": "What is the price of AAPL?"}]}
+    )
+
+
+def _events() -> list:
+    rows = [{"date": f"2024-01-{i % 28 + 1:02d}", "close": 1.0} for i in range(200)]
+    return [
+        reasoning_step("Fetching data"),
+        message_chunk("The price "),
+        table(rows, name="Prices"),
+        message_chunk("is up."),
+    ]
+
+
+def _record(path) -> list:
+    async def generate():
+        for event in _events():
+            await asyncio.sleep(0.01)
+            yield event
+
+    async def run():
+        return [event async for event in record(generate(), path, _request())]
+
+    return asyncio.run(run())
+
+
+def test_record_and_read(tmp_path):
+    path = tmp_path / "stream.obbrec"
+    passed_through = _record(path)
+
+    with StreamRecording(path) as recording:
+        assert len(recording) == 4
+        assert recording.request == _request()
+        assert [event.data for event in recording] == [
+            event.encode() for event in passed_through
+        ]
+        assert recording[2].event_type == "copilotMessageArtifact"
+        assert recording[-1].data == message_chunk("is up.").encode()
+        times = [recording.time(i) for i in range(len(recording))]
+        assert times == sorted(times)
+        assert recording.seek(times[2]) == 2
+        assert recording.seek(times[-1] + 1) == 4
+        assert recording.response().text == "The price is up."
+
+    # The table is compressed in the log.
+    assert path.stat().st_size < sum(len(e.encode()) for e in passed_through)
+
+
+def test_replay_timing(tmp_path):
+    path = tmp_path / "stream.obbrec"
+    _record(path)
+
+    async def replay(speed):
+        start = time.perf_counter()
+        response = await CopilotResponse.from_async_chunks(
+            recording.replay(speed=speed, start=1)
+        )
+        return response, time.perf_counter() - start
+
+    with StreamRecording(path) as recording:
+        recorded = recording.time(3) - recording.time(1)
+        response, elapsed = asyncio.run(replay(1.0))
+        assert elapsed >= recorded * 0.9
+        assert response.text == "The price is up."
+        _, accelerated = asyncio.run(replay(None))
+        assert accelerated < recorded
+
+
+def test_read_unclosed_recording(tmp_path):
+    path = tmp_path / "stream.obbrec"
+    recorder = StreamRecorder(path, _request())
+    for event in _events():
+        recorder.write(event)
+    recorder._file.flush()
+    # Simulate a partially written record at the end of the log.
+    recorder._file.write(b"E\xff\xff")
+    recorder._file.flush()
+
+    with StreamRecording(path) as recording:
+        assert len(recording) == 4
+        assert recording[3].data == message_chunk("is up.").encode()
+    recorder.close()
+
+
+def test_invalid_recording(tmp_path):
+    path = tmp_path / "stream.obbrec"
+    path.write_bytes(b"not a recording")
+
+    with pytest.raises(ValueError, match="not a stream recording"):
+        StreamRecording(path)
@@ -0,0 +1,154 @@
+import asyncio
+import time
+
+from openbb_ai.helpers import get_widget_data, message_chunk, reasoning_step
+from openbb_ai.models import QueryRequest, Widget, WidgetRequest
+from openbb_ai.response_cache import (
+    CacheRule,
+    ResponseCache,
+    _Recording,
+    turn_kind,
+)
+from openbb_ai.responses import encode_event
+
+WIDGET = Widget(
+    origin="OpenBB API",
+    widget_id="eod_price",
+    name="Price",
+    description="Price data.",
+    params=[],
+)
+
+
+def _request(question: str = "What is the price?") -> QueryRequest:
+    return QueryRequest.model_validate(
+        {
+            "messages": [{"role": "human", "content": question}],
+            "widgets": {"primary": [WIDGET.model_dump()]},
+        }
+    )
+
+
+class Agent:
+    def __init__(self, answer: bool = False, error: bool = False, encode=None):
+        self.answer = answer
+        self.error = error
+        self.encode = encode
+        self.runs = 0
+
+    async def events(self):
+        self.runs += 1
+        step = reasoning_step("Fetching data", "ERROR" if self.error else "INFO")
+        yield step if self.encode is None else self.encode(step)
+        await asyncio.sleep(0.02)
+        if self.answer:
+            yield message_chunk("The price is up.")
+        else:
+            yield get_widget_data([WidgetRequest(widget=WIDGET, input_arguments={})])
+
+
+def _run(
+    cache: ResponseCache,
+    agent: Agent,
+    request: QueryRequest,
+    scope: str = "user-1",
+    **kwargs,
+):
+    async def run():
+        stream = cache.stream(request, "agent", agent.events, scope, **kwargs)
+        return [event async for event in stream]
+
+    return asyncio.run(run())
+
+
+def test_function_call_turns_are_replayed():
+    cache = ResponseCache(rules={"agent": CacheRule()})
+    agent = Agent()
+
+    first = _run(cache, agent, _request())
+    start = time.perf_counter()
+    second = _run(cache, agent, _request())
+    assert time.perf_counter() - start < 0.02
+    assert second == first
+    assert (agent.runs, cache.hits, cache.misses) == (1, 1, 1)
+
+    # Replaying with (compressed) timing.
+    start = time.perf_counter()
+    assert _run(cache, agent, _request(), speed=2.0) == first
+    assert time.perf_counter() - start >= 0.009
+
+    # Another question is another turn.
+    _run(cache, agent, _request("What is the volume?"))
+    assert agent.runs == 2
+
+
+def test_turns_are_only_replayed_within_their_scope():
+    cache = ResponseCache(rules={"agent": CacheRule()})
+    agent = Agent()
+
+    _run(cache, agent, _request(), "user-1")
+    _run(cache, agent, _request(), "user-2")
+    _run(cache, agent, _request(), "user-1")
+
+    assert (agent.runs, cache.hits) == (2, 1)
+
+
+def test_rules_are_opt_in():
+    answer = Agent(answer=True)
+
+    cache = ResponseCache(rules={"agent": CacheRule()})
+    _run(cache, answer, _request())
+    _run(cache, answer, _request())
+    assert answer.runs == 2
+
+    cache = ResponseCache(rules={"agent": CacheRule(kinds={"answer"})})
+    _run(cache, answer, _request())
+    _run(cache, answer, _request())
+    assert answer.runs == 3
+
+    cache = ResponseCache(rules={"other-agent": CacheRule()})
+    agent = Agent()
+    _run(cache, agent, _request())
+    _run(cache, agent, _request())
+    assert agent.runs == 2 and len(cache) == 0
+
+
+def test_errors_are_not_cached():
+    for encode in (None, encode_event, lambda event: event.model_dump()):
+        cache = ResponseCache(rules={"agent": CacheRule()})
+        _run(cache, Agent(error=True, encode=encode), _request())
+        assert len(cache) == 0
+
+    assert turn_kind([]) is None
+
+
+def test_turns_are_only_recorded_while_they_can_be_cached():
+    step = reasoning_step("Fetching data")
+    chunk = message_chunk("The price is up.")
+
+    recording = _Recording(CacheRule(), max_bytes=1000)
+    assert recording.add(step, encode_event(step))
+    assert not recording.add(chunk, encode_event(chunk))
+
+    recording = _Recording(CacheRule(kinds={"answer"}), max_bytes=1000)
+    assert recording.add(chunk, encode_event(chunk))
+    assert not recording.add(chunk, b"x" * 1000)
+
+    error = reasoning_step("Failed", "ERROR")
+    assert not recording.add(error, encode_event(error))
+
+
+def test_eviction():
+    cache = ResponseCache(rules={"agent": CacheRule(ttl=0.0)})
+    _run(cache, Agent(), _request())
+    assert cache.get(ResponseCache.key(_request(), "agent", "user-1")) is None
+    assert len(cache) == 0
+
+    cache = ResponseCache(rules={"agent": CacheRule()}, max_bytes=1000)
+    for question in ("One", "Two", "Three"):
+        _run(cache, Agent(), _request(question))
+    assert len(cache) < 3
+    assert cache.size <= 1000
+    assert (
+        cache.get(ResponseCache.key(_request("Three"), "agent", "user-1")) is not None
+    )
@@ -0,0 +1,262 @@
+import asyncio
+import gc
+import zlib
+
+import pytest
+
+from openbb_ai import responses
+from openbb_ai.helpers import message_chunk, reasoning_step, table
+from openbb_ai.responses import (
+    SSECompressor,
+    SSEResponse,
+    encode_event,
+    negotiate_encoding,
+)
+
+
+def _scope() -> dict:
+    return {"type": "http", "method": "POST", "path": "/query", "headers": []}
+
+
+async def _run(response: SSEResponse, disconnect_after: float | None = None):
+    messages: list[dict] = []
+
+    async def receive():
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await response(_scope(), receive, send)
+    return messages
+
+
+def test_sse_response_streams_encoded_events():
+    events = [reasoning_step("Starting"), message_chunk("Hello")]
+
+    async def generate():
+        for event in events:
+            yield event
+
+    messages = asyncio.run(_run(SSEResponse(generate())))
+
+    assert messages[0]["type"] == "http.response.start"
+    assert messages[0]["status"] == 200
+    assert (b"content-type", b"text/event-stream; charset=utf-8") in messages[0][
+        "headers"
+    ]
+    body = b"".join(message["body"] for message in messages[1:])
+    assert body == b"".join(event.encode() for event in events)
+    assert messages[-1] == {
+        "type": "http.response.body",
+        "body": b"",
+        "more_body": False,
+    }
+
+
+def test_sse_response_batches_queued_events():
+    async def generate():
+        for token in ["a", "b", "c"]:
+            yield message_chunk(token)
+
+    messages = asyncio.run(_run(SSEResponse(generate())))
+
+    bodies = [m["body"] for m in messages if m["type"] == "http.response.body"]
+    assert bodies == [
+        b"".join(message_chunk(token).encode() for token in ["a", "b", "c"]),
+        b"",
+    ]
+
+
+def test_sse_response_stops_generator_on_disconnect():
+    closed = []
+
+    async def generate():
+        try:
+            while True:
+                yield message_chunk("token")
+                await asyncio.sleep(0.01)
+        finally:
+            closed.append(True)
+
+    messages = asyncio.run(_run(SSEResponse(generate()), disconnect_after=0.05))
+
+    assert closed == [True]
+    assert messages[-1]["more_body"] is True
+
+
+def test_sse_response_sends_pings_when_idle():
+    async def generate():
+        await asyncio.sleep(0.05)
+        yield message_chunk("Hello")
+
+    messages = asyncio.run(_run(SSEResponse(generate(), ping_interval=0.01)))
+
+    bodies = [m["body"] for m in messages if m["type"] == "http.response.body"]
+    assert b": ping\r\n\r\n" in bodies
+    assert message_chunk("Hello").encode() in bodies
+
+
+def test_encode_event_accepts_model_dump_dicts():
+    event = message_chunk("Hello")
+
+    assert encode_event(event.model_dump()) == event.encode()
+    assert encode_event(event.encode()) == event.encode()
+
+
+def test_sse_response_raises_generator_errors_after_queued_events():
+    async def generate():
+        yield message_chunk("Hello")
+        raise RuntimeError("Agent failed")
+
+    messages: list[dict] = []
+
+    async def run():
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        await SSEResponse(generate())(_scope(), receive, send)
+
+    with pytest.raises(RuntimeError, match="Agent failed"):
+        asyncio.run(run())
+    assert messages[-1]["body"] == message_chunk("Hello").encode()
+
+
+def test_sse_response_retrieves_disconnect_watcher_errors():
+    errors: list[dict] = []
+
+    async def generate():
+        yield message_chunk("Hello")
+
+    async def receive():
+        raise RuntimeError("Connection lost.")
+
+    async def send(message):
+        pass
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        await SSEResponse(generate())(_scope(), receive, send)
+        gc.collect()
+
+    asyncio.run(run())
+
+    assert errors == []
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_sse_compressor_sync_flushes_message_chunks(encoding):
+    compressor = SSECompressor(encoding)
+    decompressor = zlib.decompressobj(31 if encoding == "gzip" else 15)
+    chunk = message_chunk("Hello").encode()
+
+    output = compressor.compress("copilotMessageChunk", chunk)
+
+    assert decompressor.decompress(output) == chunk
+
+
+def test_sse_compressor_defers_artifacts_until_flush():
+    compressor = SSECompressor("gzip")
+    decompressor = zlib.decompressobj(31)
+    artifact = table(data=[{"x": i, "y": i * 2} for i in range(1000)]).encode()
+
+    output = compressor.compress("copilotMessageArtifact", artifact)
+    output += compressor.flush()
+
+    assert decompressor.decompress(output) == artifact
+    assert len(output) < len(artifact) / 3
+    assert compressor.flush() == b""
+
+
+def test_sse_compressor_flushes_each_batch_once():
+    compressor = SSECompressor("deflate", level=0)
+    decompressor = zlib.decompressobj(15)
+    chunks = [message_chunk(word).encode() for word in ("Hello", " ", "world")]
+    artifact = table(data=[{"x": 1}]).encode()
+
+    output = compressor.compress_batch(
+        [("copilotMessageArtifact", artifact)]
+        + [("copilotMessageChunk", chunk) for chunk in chunks]
+    )
+
+    # A sync flush ends with an empty stored block.
+    assert output.count(b"\x00\x00\xff\xff") == 1
+    assert decompressor.decompress(output) == artifact + b"".join(chunks)
+    assert compressor.flush() == b""
+
+    # Artifacts that no latency-sensitive event follows are left pending.
+    output = compressor.compress_batch(
+        [("copilotMessageChunk", chunks[0]), ("copilotMessageArtifact", artifact)]
+    )
+    assert decompressor.decompress(output) == chunks[0]
+    assert decompressor.decompress(compressor.flush()) == artifact
+
+
+def test_sse_compressor_zstd():
+    zstandard = pytest.importorskip("zstandard")
+    compressor = SSECompressor("zstd")
+    chunk = message_chunk("Hello").encode()
+
+    output = compressor.compress("copilotMessageChunk", chunk) + compressor.finish()
+
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(output) == chunk
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("deflate") == "deflate"
+    assert negotiate_encoding("gzip;q=0, deflate") == "deflate"
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("") is None
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip;q=0, *", "deflate"),
+        ("gzip; q=0.000, deflate;q=0", None),
+        ("*;q=0, deflate;q=0.5", "deflate"),
+        ("identity", None),
+        ("identity, *;q=0", None),
+        ("GZIP;Q=1.0", "gzip"),
+    ],
+)
+def test_negotiate_encoding_never_picks_refused_codings(
+    monkeypatch, accept_encoding, expected
+):
+    monkeypatch.setattr(responses, "zstandard", None)
+    assert negotiate_encoding(accept_encoding) == expected
+
+
+def test_sse_response_compresses_negotiated_encoding():
+    events = [message_chunk("Hello"), table(data=[{"x": 1}]), reasoning_step("Done")]
+
+    async def generate():
+        for event in events:
+            yield event
+
+    async def run():
+        messages: list[dict] = []
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {**_scope(), "headers": [(b"accept-encoding", b"gzip")]}
+        await SSEResponse(generate(), compression="auto")(scope, receive, send)
+        return messages
+
+    messages = asyncio.run(run())
+
+    assert (b"content-encoding", b"gzip") in messages[0]["headers"]
+    body = b"".join(message["body"] for message in messages[1:])
+    assert zlib.decompress(body, 31) == b"".join(event.encode() for event in events)
@@ -0,0 +1,152 @@
+import asyncio
+
+from openbb_ai.helpers import message_chunk
+from openbb_ai.resumable import ResumableStreams, parse_last_event_id
+
+
+async def _generate(n: int, release: asyncio.Event | None = None):
+    for i in range(n):
+        if release is not None and i == n // 2:
+            await release.wait()
+        yield message_chunk(f"chunk {i}")
+
+
+def test_resumable_stream_assigns_event_ids():
+    async def run():
+        streams = ResumableStreams()
+        return [data async for data in streams.start("stream", _generate(3))]
+
+    result = asyncio.run(run())
+
+    assert result == [
+        b'id: 1\r\nevent: copilotMessageChunk\r\ndata: {"delta":"chunk 0"}\r\n\r\n',
+        b'id: 2\r\nevent: copilotMessageChunk\r\ndata: {"delta":"chunk 1"}\r\n\r\n',
+        b'id: 3\r\nevent: copilotMessageChunk\r\ndata: {"delta":"chunk 2"}\r\n\r\n',
+    ]
+
+
+def test_resumable_stream_does_not_modify_events():
+    event = message_chunk("Hello")
+
+    async def agent():
+        yield event
+
+    async def run():
+        streams = ResumableStreams()
+        return [data async for data in streams.start("stream", agent())]
+
+    result = asyncio.run(run())
+
+    assert result[0].startswith(b"id: 1\r\n")
+    assert event.id is None
+
+
+def test_resumable_stream_replays_and_reattaches_to_live_generator():
+    async def run():
+        streams = ResumableStreams()
+        release = asyncio.Event()
+        calls = []
+
+        async def agent():
+            calls.append(True)
+            async for event in _generate(6, release):
+                yield event
+
+        # The first connection drops after receiving two events.
+        first = streams.start("stream", agent())
+        received = [await anext(first), await anext(first)]
+        await first.aclose()
+
+        resumed = streams.resume("stream", "2")
+        assert resumed is not None
+        received.append(await anext(resumed))
+        release.set()
+        received += [data async for data in resumed]
+        return calls, received
+
+    calls, received = asyncio.run(run())
+
+    assert calls == [True]
+    assert [data.split(b"\r\n")[0] for data in received] == [
+        b"id: 1",
+        b"id: 2",
+        b"id: 3",
+        b"id: 4",
+        b"id: 5",
+        b"id: 6",
+    ]
+
+
+def test_resumable_stream_cannot_resume_evicted_events():
+    async def run():
+        streams = ResumableStreams(max_events=2)
+        async for _ in streams.start("stream", _generate(5)):
+            pass
+        return (
+            streams.resume("stream", 1),
+            streams.resume("stream", 3) is not None,
+            streams.resume("stream", 99),
+            streams.resume("other", 1),
+            streams.resume("stream", "not-an-id"),
+        )
+
+    evicted, buffered, future, unknown, invalid = asyncio.run(run())
+
+    assert evicted is None
+    assert buffered is True
+    assert future is None
+    assert unknown is None
+    assert invalid is None
+
+
+def test_resumable_streams_evict_idle_streams_after_ttl():
+    async def run():
+        streams = ResumableStreams(ttl=0)
+        closed = []
+
+        async def agent():
+            try:
+                yield message_chunk("Hello")
+                await asyncio.Event().wait()
+            finally:
+                closed.append(True)
+
+        stream = streams.start("stream", agent())
+        await anext(stream)
+        await stream.aclose()
+        streams.evict()
+        await asyncio.sleep(0)
+        return "stream" in streams, closed
+
+    registered, closed = asyncio.run(run())
+
+    assert registered is False
+    assert closed == [True]
+
+
+def test_discarded_streams_are_not_complete():
+    async def run():
+        streams = ResumableStreams()
+
+        async def agent():
+            yield message_chunk("Hello")
+            await asyncio.Event().wait()
+
+        stream = streams.start("stream", agent())
+        await anext(stream)
+        streams.discard("stream")
+        try:
+            await anext(stream)
+        except asyncio.CancelledError:
+            return "cancelled"
+        except StopAsyncIteration:
+            return "complete"
+
+    assert asyncio.run(run()) == "cancelled"
+
+
+def test_parse_last_event_id():
+    assert parse_last_event_id("42") == 42
+    assert parse_last_event_id(b" 7 ") == 7
+    assert parse_last_event_id("abc") is None
+    assert parse_last_event_id(None) is None
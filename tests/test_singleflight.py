@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from openbb_ai.helpers import message_chunk
+from openbb_ai.models import QueryRequest
+from openbb_ai.singleflight import SingleFlight, request_key
+from openbb_ai.testing import CopilotResponse
+
+
+class Agent:
+    def __init__(self, words: list[str], fail: bool = False):
+        self.words = words
+        self.fail = fail
+        self.runs = 0
+        self.closed = False
+
+    async def events(self):
+        self.runs += 1
+        try:
+            for word in self.words:
+                await asyncio.sleep(0.01)
+                yield message_chunk(word)
+            if self.fail:
+                raise RuntimeError("boom")
+        finally:
+            self.closed = True
+
+
+async def _text(events) -> str:
+    return (await CopilotResponse.from_async_chunks(events)).text
+
+
+def test_identical_requests_share_one_run():
+    agent = Agent(["The ", "price ", "is ", "up."])
+    flights = SingleFlight()
+
+    async def late_subscriber():
+        await asyncio.sleep(0.025)
+        assert flights.subscribers("key") == 1
+        return await _text(flights.stream("key", agent.events))
+
+    async def run():
+        return await asyncio.gather(
+            _text(flights.stream("key", agent.events)), late_subscriber()
+        )
+
+    first, second = asyncio.run(run())
+
+    assert first == second == "The price is up."
+    assert agent.runs == 1
+    assert "key" not in flights
+
+    async def rerun():
+        return await _text(flights.stream("key", agent.events))
+
+    # Once finished, the same request runs the agent again.
+    assert asyncio.run(rerun()) == first
+    assert agent.runs == 2
+
+
+def test_generator_is_cancelled_when_every_subscriber_leaves():
+    agent = Agent(["word "] * 100)
+    flights = SingleFlight()
+
+    async def leave_after(subscription, n: int):
+        async for _ in subscription:
+            n -= 1
+            if n == 0:
+                await subscription.aclose()
+                return
+
+    async def run():
+        await asyncio.gather(
+            leave_after(flights.stream("key", agent.events), 2),
+            leave_after(flights.stream("key", agent.events), 5),
+        )
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+
+    assert agent.runs == 1
+    assert agent.closed
+    assert len(flights) == 0
+
+
+def test_generator_keeps_running_while_a_subscriber_remains():
+    agent = Agent(["word "] * 5)
+    flights = SingleFlight()
+
+    async def leave_early():
+        subscription = flights.stream("key", agent.events)
+        await anext(subscription)
+        await subscription.aclose()
+
+    async def run():
+        _, text = await asyncio.gather(
+            leave_early(), _text(flights.stream("key", agent.events))
+        )
+        return text
+
+    assert asyncio.run(run()) == "word " * 5
+    assert agent.runs == 1
+
+
+def test_errors_are_raised_to_every_subscriber():
+    agent = Agent(["The "], fail=True)
+    flights = SingleFlight()
+
+    async def consume():
+        return [event async for event in flights.stream("key", agent.events)]
+
+    async def run():
+        return await asyncio.gather(consume(), consume(), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    with pytest.raises(RuntimeError):
+        raise results[0]
+
+
+def test_request_key():
+    request = QueryRequest.model_validate(
+        {"messages": [{"role": "human", "content": "Hi"}]}
+    )
+    same = QueryRequest.model_validate(request.model_dump())
+
+    assert request_key(request, "user-1") == request_key(same, "user-1")
+    assert request_key(request, "user-1") != request_key(request, "user-2")
@@ -0,0 +1,149 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from openbb_ai.helpers import reasoning_step, table
+from openbb_ai.models import (
+    DataContent,
+    MessageArtifactSSE,
+    QueryRequest,
+    SingleDataContent,
+)
+from openbb_ai.responses import SSEResponse
+from openbb_ai.spill import Spillable, SpilledPayload, SpillStore
+
+ROWS = [{"date": "2024-01-01", "close": 180.0, "note": 'é "quoted"\n'}] * 200
+TABLE = json.dumps(ROWS)
+PDF = b"%PDF-1.7" * 1000
+
+
+class Plain(BaseModel):
+    content: str | list[dict]
+
+
+class Spilled(BaseModel):
+    content: Spillable[str | list[dict]]
+
+
+def test_spillable_fields_behave_like_their_type():
+    schema = Plain.model_json_schema()["properties"]
+    assert Spilled.model_json_schema()["properties"] == schema
+    with pytest.raises(ValidationError) as expected:
+        Plain(content=1)  # type: ignore[arg-type]
+    with pytest.raises(ValidationError) as raised:
+        Spilled(content=1)  # type: ignore[arg-type]
+    assert raised.value.errors() == expected.value.errors()
+
+    with SpillStore(threshold=0) as store:
+        model = Spilled(content=store.spill(ROWS))
+        assert isinstance(model.content, SpilledPayload)
+        assert model.model_dump() == {"content": ROWS}
+        assert model.model_dump_json() == Plain(content=ROWS).model_dump_json()
+
+
+def test_data_content_is_spilled_above_the_threshold():
+    data = DataContent(
+        items=[
+            SingleDataContent(content=TABLE),
+            SingleDataContent(content="[]"),
+            SingleDataContent(
+                content=base64.b64encode(PDF).decode(),
+                data_format={"data_type": "pdf", "filename": "report.pdf"},
+            ),
+        ]
+    )
+    expected = data.model_dump_json()
+
+    with SpillStore(threshold=1000) as store:
+        data.decoded()
+        data.spill(store)
+        spilled, small, pdf = data.items
+        assert isinstance(spilled.content, SpilledPayload)
+        assert small.content == "[]"
+        assert len(store) == 2
+        # The decoded content is dropped, and decoded again from the files.
+        assert spilled._decoded is None
+        assert data.decoded() == [ROWS, [], PDF]
+        assert data.model_dump_json() == expected
+
+    assert spilled.content.closed and pdf.content.closed
+    with pytest.raises(ValueError):
+        spilled.content.read()
+
+
+def test_query_request_spill():
+    request = QueryRequest(
+        messages=[{"role": "human", "content": "Hi"}],
+        context=[
+            {
+                "uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+                "name": "Prices",
+                "description": "Daily prices.",
+                "data": {"items": [{"content": TABLE}]},
+            }
+        ],
+    )
+    with SpillStore(threshold=1000) as store:
+        request.spill(store)
+        assert store.size == len(TABLE.encode())
+        assert request.context is not None
+        assert request.context[0].data.decoded() == [ROWS]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 65536])
+def test_encode_chunks_matches_encode(chunk_size):
+    text = 'é\\"\n\U0001f600' * 300
+    for content in (ROWS, text):
+        artifact = MessageArtifactSSE(
+            data={"type": "text", "name": "a", "description": "", "content": content},
+            id=3,
+        )
+        expected = artifact.encode()
+        with SpillStore(threshold=0) as store:
+            artifact.data.spill(store)
+            chunks = list(artifact.encode_chunks(chunk_size))
+            assert len(chunks) > 2
+            assert b"".join(chunks) == expected
+            assert artifact.encode() == expected
+
+
+def test_sse_response_streams_spilled_payloads():
+    event = table(ROWS)
+    expected = event.encode()
+    store = SpillStore(threshold=1000)
+
+    async def generate():
+        event.data.spill(store)
+        yield event
+
+    sent: list[bytes] = []
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message.get("body", b""))
+
+    response = SSEResponse(store.stream(generate()), max_batch_bytes=1000)
+    asyncio.run(response({"type": "http", "headers": []}, receive, send))
+
+    assert b"".join(sent) == expected
+    assert max(len(body) for body in sent) < len(expected)
+    assert len(store) == 0
+
+
+def test_only_events_with_spilled_payloads_are_encoded_in_chunks():
+    with SpillStore(threshold=1000) as store:
+        spilled = table(ROWS)
+        spilled.data.spill(store)
+        status = reasoning_step("Done")
+        status.data.artifacts = [spilled.data]
+
+        assert spilled.has_spilled_payloads()
+        assert status.has_spilled_payloads()
+        # Other events are encoded whole, even while payloads are spilled.
+        assert not table(ROWS).has_spilled_payloads()
+        assert not reasoning_step("Done").has_spilled_payloads()
@@ -0,0 +1,238 @@
+import asyncio
+
+from openbb_ai.helpers import message_chunk, reasoning_step, table
+from openbb_ai.models import MessageArtifactSSE, MessageChunkSSE, StatusUpdateSSE
+from openbb_ai.streaming import (
+    StreamBuffer,
+    buffer_events,
+    coalesce_message_chunks,
+)
+
+
+async def _collect(events):
+    return [event async for event in events]
+
+
+async def _drain(buffer: StreamBuffer):
+    while (event := await buffer.get()) is not None:
+        yield event
+
+
+async def _generate(*events, delay: float = 0.0):
+    for event in events:
+        if delay:
+            await asyncio.sleep(delay)
+        yield event
+
+
+def test_coalesce_message_chunks_merges_consecutive_chunks():
+    events = _generate(
+        *(message_chunk(token) for token in ["Hel", "lo", ", ", "world"])
+    )
+
+    result = asyncio.run(_collect(coalesce_message_chunks(events, max_delay=10)))
+
+    assert len(result) == 1
+    assert isinstance(result[0], MessageChunkSSE)
+    assert result[0].data.delta == "Hello, world"
+
+
+def test_coalesce_message_chunks_flushes_on_other_events():
+    events = _generate(
+        message_chunk("Here is "),
+        message_chunk("a table:"),
+        table(data=[{"x": 1}], name="Table"),
+        message_chunk("Done"),
+        reasoning_step("Finished"),
+    )
+
+    result = asyncio.run(_collect(coalesce_message_chunks(events, max_delay=10)))
+
+    assert [type(event) for event in result] == [
+        MessageChunkSSE,
+        MessageArtifactSSE,
+        MessageChunkSSE,
+        StatusUpdateSSE,
+    ]
+    assert result[0].data.delta == "Here is a table:"
+    assert result[2].data.delta == "Done"
+
+
+def test_coalesce_message_chunks_respects_byte_budget():
+    events = _generate(*(message_chunk("ab") for _ in range(5)))
+
+    result = asyncio.run(
+        _collect(coalesce_message_chunks(events, max_delay=10, max_bytes=4))
+    )
+
+    assert [event.data.delta for event in result] == ["abab", "abab", "ab"]
+
+
+def test_coalesce_message_chunks_flushes_after_time_window():
+    events = _generate(message_chunk("a"), message_chunk("b"), delay=0.2)
+
+    result = asyncio.run(
+        _collect(coalesce_message_chunks(events, max_delay=0.01, max_bytes=1024))
+    )
+
+    assert [event.data.delta for event in result] == ["a", "b"]
+
+
+def test_coalesce_message_chunks_only_uses_tasks_while_buffering():
+    tasks = set()
+
+    async def generate():
+        for event in (reasoning_step("Fetching"), message_chunk("a"), table([])):
+            tasks.add(asyncio.current_task())
+            yield event
+
+    async def consume():
+        result = await _collect(coalesce_message_chunks(generate(), max_delay=10))
+        return result, asyncio.current_task()
+
+    result, consumer = asyncio.run(consume())
+
+    assert len(result) == 3
+    # Upstream is awaited directly, except after the buffered chunk.
+    assert len(tasks) == 2
+    assert consumer in tasks
+
+
+def test_coalesce_message_chunks_closes_upstream():
+    closed = []
+
+    async def generate():
+        try:
+            while True:
+                yield message_chunk("token")
+                await asyncio.sleep(0)
+        finally:
+            closed.append(True)
+
+    async def consume():
+        stream = coalesce_message_chunks(generate(), max_delay=10, max_bytes=10)
+        first = await anext(stream)
+        await stream.aclose()
+        return first
+
+    first = asyncio.run(consume())
+
+    assert first.data.delta == "tokentoken"
+    assert closed == [True]
+
+
+def test_stream_buffer_merges_queued_chunks():
+    async def run():
+        buffer = StreamBuffer(max_size=2)
+        for token in ["a", "b", "c"]:
+            await buffer.put(message_chunk(token))
+        buffer.close()
+        return buffer, [event async for event in _drain(buffer)]
+
+    buffer, result = asyncio.run(run())
+
+    assert [event.data.delta for event in result] == ["abc"]
+    assert buffer.metrics.merged == {"copilotMessageChunk": 2}
+    assert buffer.metrics.max_depth == 1
+
+
+def test_stream_buffer_drops_superseded_status_updates():
+    async def run():
+        buffer = StreamBuffer(max_size=2)
+        await buffer.put(reasoning_step("Step 1"))
+        await buffer.put(reasoning_step("Failed", event_type="ERROR"))
+        await buffer.put(reasoning_step("Step 2"))
+        await buffer.put(reasoning_step("Step 3"))
+        buffer.close()
+        return buffer, [event async for event in _drain(buffer)]
+
+    buffer, result = asyncio.run(run())
+
+    assert [event.data.message for event in result] == ["Failed", "Step 3"]
+    assert buffer.metrics.dropped == {"copilotStatusUpdate": 2}
+
+
+def test_stream_buffer_only_drops_status_updates_that_are_superseded():
+    async def run():
+        buffer = StreamBuffer(max_size=2)
+        await buffer.put(reasoning_step("Step 1"))
+        await buffer.put(reasoning_step("Low coverage", event_type="WARNING"))
+        put = asyncio.ensure_future(buffer.put(table(data=[{"x": 1}], name="Table")))
+        await asyncio.sleep(0.01)
+        blocked = not put.done()
+        first = await buffer.get()
+        await put
+        buffer.close()
+        rest = [event async for event in _drain(buffer)]
+        return blocked, [first, *rest], buffer.metrics
+
+    blocked, result, metrics = asyncio.run(run())
+
+    assert blocked is True
+    assert [type(event) for event in result] == [
+        StatusUpdateSSE,
+        StatusUpdateSSE,
+        MessageArtifactSSE,
+    ]
+    assert metrics.dropped == {}
+
+
+def test_stream_buffer_drops_status_updates_superseded_by_queued_ones():
+    async def run():
+        buffer = StreamBuffer(max_size=2)
+        await buffer.put(reasoning_step("Step 1"))
+        await buffer.put(reasoning_step("Step 2"))
+        await buffer.put(table(data=[{"x": 1}], name="Table"))
+        buffer.close()
+        return buffer, [event async for event in _drain(buffer)]
+
+    buffer, result = asyncio.run(run())
+
+    assert [type(event) for event in result] == [StatusUpdateSSE, MessageArtifactSSE]
+    assert result[0].data.message == "Step 2"
+    assert buffer.metrics.dropped == {"copilotStatusUpdate": 1}
+
+
+def test_stream_buffer_never_drops_artifacts():
+    async def run():
+        buffer = StreamBuffer(max_size=1)
+        await buffer.put(table(data=[{"x": 1}], name="First"))
+        put = asyncio.ensure_future(buffer.put(table(data=[{"x": 2}], name="Second")))
+        await asyncio.sleep(0.01)
+        blocked = not put.done()
+        first = await buffer.get()
+        await put
+        second = await buffer.get()
+        return blocked, first, second, buffer.metrics
+
+    blocked, first, second, metrics = asyncio.run(run())
+
+    assert blocked is True
+    assert (first.data.name, second.data.name) == ("First", "Second")
+    assert metrics.dropped == {}
+
+
+def test_buffer_events_with_slow_consumer():
+    async def agent():
+        yield reasoning_step("Step 1")
+        for token in ["Hel", "lo"]:
+            yield message_chunk(token)
+        yield table(data=[{"x": 1}], name="Table")
+
+    async def run():
+        buffer = StreamBuffer(max_size=8)
+        result = []
+        async for event in buffer_events(agent(), buffer):
+            await asyncio.sleep(0.01)
+            result.append(event)
+        return result, buffer.metrics
+
+    result, metrics = asyncio.run(run())
+
+    assert [type(event) for event in result] == [
+        StatusUpdateSSE,
+        MessageChunkSSE,
+        MessageArtifactSSE,
+    ]
+    assert result[1].data.delta == "Hello"
+    assert metrics.depth == 0
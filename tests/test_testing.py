@@ -0,0 +1,123 @@
+import asyncio
+
+from openbb_ai.helpers import (
+    citations,
+    cite,
+    get_widget_data,
+    message_chunk,
+    reasoning_step,
+    table,
+)
+from openbb_ai.models import Widget, WidgetParam, WidgetRequest
+from openbb_ai.testing import CopilotResponse, SSEParser, capture_stream_response
+
+
+def _widget() -> Widget:
+    return Widget(
+        origin="OpenBB API",
+        widget_id="eod_price",
+        name="Price",
+        description="Price data.",
+        params=[WidgetParam(name="symbol", type="ticker", description="Ticker")],
+    )
+
+
+def _stream() -> bytes:
+    widget = _widget()
+    events = [
+        reasoning_step("Fetching data"),
+        message_chunk("Héllo "),
+        message_chunk("wörld"),
+        table([{"a": 1}], name="Table"),
+        message_chunk("!"),
+        get_widget_data([WidgetRequest(widget=widget, input_arguments={})]),
+        citations([cite(widget, {"symbol": "AAPL"})]),
+    ]
+    return b"".join(event.encode() for event in events)
+
+
+def test_sse_parser_handles_arbitrary_chunk_boundaries():
+    stream = _stream()
+    expected = SSEParser().feed(stream)
+
+    for size in (1, 2, 7):
+        parser = SSEParser()
+        events = []
+        for i in range(0, len(stream), size):
+            events += parser.feed(stream[i : i + size])
+        events += parser.close()
+        assert events == expected
+
+
+def test_sse_parser_handles_multiline_data_and_line_endings():
+    parser = SSEParser()
+
+    events = parser.feed("id: 3\revent: x\ndata: a\r\ndata:b\r")
+    events += parser.feed("\n: ping\n\ndata: c")
+    events += parser.close()
+
+    assert events == [("x", "a\nb"), ("message", "c")]
+    assert parser.last_event_id == "3"
+
+
+def test_copilot_response_from_chunks():
+    stream = _stream()
+    chunks = [stream[i : i + 5] for i in range(0, len(stream), 5)]
+
+    response = CopilotResponse.from_chunks(chunks)
+
+    assert [event.event_type for event in response.events] == [
+        "copilotStatusUpdate",
+        "copilotMessage",
+        "copilotMessageArtifact",
+        "copilotMessage",
+        "copilotFunctionCall",
+        "copilotCitationCollection",
+    ]
+    assert response.text == "Héllo wörld!"
+    assert response.events[1].content == "Héllo wörld"
+    assert len(response.function_calls) == 1
+    assert len(response.citations) == 1
+    assert response.prompt_suggestions == []
+
+
+def test_copilot_response_from_async_chunks():
+    async def chunks():
+        stream = _stream()
+        for i in range(0, len(stream), 64):
+            yield stream[i : i + 64]
+
+    response = asyncio.run(CopilotResponse.from_async_chunks(chunks()))
+
+    assert response.text == "Héllo wörld!"
+    response.starts("copilotStatusUpdate").then("copilotMessage").with_("héllo")
+
+
+def test_copilot_response_accepts_legacy_python_payloads():
+    stream = (
+        "event: copilotMessageChunk\ndata: {'delta': 'Hi'}\n\n"
+        "event: copilotFunctionCall\n"
+        "data: {'function': 'get_widget_data', 'input_arguments': {}}\n\n"
+    )
+
+    response = CopilotResponse(stream)
+
+    assert response.text == "Hi"
+    assert response.function_calls[0].content["function"] == "get_widget_data"
+    assert capture_stream_response(stream.split("copilotFunctionCall")[0]) == (
+        "copilotMessageChunk",
+        "Hi",
+    )
+
+
+def test_copilot_response_incremental_text():
+    response = CopilotResponse()
+
+    response.feed(message_chunk("a").encode())
+    assert response.text == "a"
+    assert response.events[0].content == "a"
+    response.feed(message_chunk("b").encode())
+    response.close()
+
+    assert response.text == "ab"
+    assert response.events[0].content == "ab"